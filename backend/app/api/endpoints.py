@@ -86,6 +86,12 @@ async def get_bot_status():
         "start_time": start_time
     } 
 
+@router.get("/bot/pipeline")
+async def get_pipeline_metrics():
+    """Live ingestion stages per stream: queue depth, dropped / coalesced messages, lag and service time (ms)."""
+    from app.services.market_data import market_data_service
+    return market_data_service.pipeline_metrics()
+
 # --- Wallet Helper ---
 
 @router.get("/account/balance")
@@ -372,35 +378,98 @@ async def get_trade_history(limit: int = 50, offset: int = 0):
     return history
 
 # --- Backtesting ---
-from app.schemas.market_data import BacktestRequest, BacktestResponse
+from typing import List
+from app.schemas.market_data import BacktestJobResponse, BacktestRequest
 
-@router.post("/backtest/run", response_model=BacktestResponse)
+@router.post("/backtest/run", responses={200: {"model": BacktestJobResponse}})
 async def run_backtest(req: BacktestRequest):
-    from app.backtest.engine import BacktestEngine
-    from app.strategy.implementations.lstm_strategy import LSTMStrategy
+    """
+    Submits the backtest as a background job and returns immediately.
+    Progress is broadcast over /ws as BACKTEST_JOB messages; the report is at /backtest/jobs/{job_id}.
+    """
+    from app.services.backtest_jobs import backtest_jobs
     
-    # 1. Fetch Bulk History
-    print(f"Fetching bulk history for {req.symbol} ({req.interval}) from {req.start_str}...")
-    klines = binance_adapter.get_bulk_history(req.symbol, req.interval, req.start_str)
+    try:
+        job = backtest_jobs.submit(req.model_dump())
+    except ValueError as e:
+        return {"error": str(e)}
     
-    if not klines:
-        return {"error": "Failed to fetch historical data"}
-
-    # 2. Setup Engine
-    # Load some config from current system if needed, or use defaults
-    config = {
-        "symbol": req.symbol,
-        "interval": req.interval,
-        "sl_percent": 2.0,
-        "tp_percent": 4.0
-    }
+    return job.to_dict()
+
+@router.get("/backtest/jobs", response_model=List[BacktestJobResponse])
+async def list_backtest_jobs():
+    from app.services.backtest_jobs import backtest_jobs
+    return [job.to_dict() for job in backtest_jobs.list_jobs()]
+
+@router.get("/backtest/jobs/{job_id}", responses={200: {"model": BacktestJobResponse}})
+async def get_backtest_job(job_id: str):
+    from app.services.backtest_jobs import backtest_jobs
+    job = backtest_jobs.get(job_id)
+    if not job:
+        return {"error": "Job not found"}
+    return job.to_dict(include_result=True)
+
+@router.delete("/backtest/jobs/{job_id}", responses={200: {"model": BacktestJobResponse}})
+async def cancel_backtest_job(job_id: str):
+    from app.services.backtest_jobs import backtest_jobs
+    job = backtest_jobs.cancel(job_id)
+    if not job:
+        return {"error": "Job not found"}
+    return job.to_dict()
+
+# --- Live model refresh ---
+
+@router.get("/model/refresh")
+async def get_model_refresh():
+    """Fine-tuning schedule and recent attempts (newest first) with their validation gate results."""
+    from app.services.model_refresh import model_refresher
+    return model_refresher.status()
+
+@router.post("/model/refresh")
+async def trigger_model_refresh():
+    """
+    Fine-tunes the live strategies now, in the background; accepted models are swapped in
+    without restarting the bot. Results are broadcast as LOG messages and listed by GET.
+    """
+    import asyncio
+    from app.services.model_refresh import model_refresher
+    if model_refresher.running:
+        return {"error": "A model refresh is already running"}
+    asyncio.create_task(model_refresher.refresh_all())
+    return {"status": "started"}
+
+@router.get("/inference/metrics")
+async def get_inference_metrics():
+    """Live inference batching: requests per forward pass, queue wait and forward time percentiles."""
+    from app.ml.batching import inference_batcher
+    return inference_batcher.metrics()
+
+from app.schemas.market_data import SweepRequest
+
+@router.post("/backtest/sweep", responses={200: {"model": BacktestJobResponse}})
+async def run_sweep(req: SweepRequest):
+    """
+    Submits a parameter sweep as a background job (same queue and worker limits as
+    /backtest/run). The ranked table is the job's result at /backtest/jobs/{job_id}.
+    """
+    from app.backtest.sweep import METRICS, grid_space, random_space
+    from app.services.backtest_jobs import backtest_jobs
     
-    # For now support LSTM only or map names to classes
-    engine = BacktestEngine(LSTMStrategy, config)
+    # 1. Build Parameter Space
+    try:
+        if req.n_samples > 0:
+            space = random_space(req.random_spec, req.n_samples, seed=req.seed)
+        else:
+            space = grid_space(req.grid)
+    except (ValueError, KeyError) as e:
+        return {"error": f"Invalid sweep spec: {e}"}
+    if req.rank_by not in METRICS:
+        return {"error": f"rank_by must be one of {METRICS}"}
     
-    # 3. Run
-    import pandas as pd
-    df = pd.DataFrame(klines)
-    result = await engine.run(df)
+    # 2. Queue it: history fetch, batch inference and the runs all happen off the API process
+    try:
+        job = backtest_jobs.submit(req.model_dump(), space=space)
+    except ValueError as e:
+        return {"error": str(e)}
     
-    return result
+    return job.to_dict()
@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta
+from typing import Sequence
+import numpy as np
+import pandas as pd
+from app.schemas.market_data import KlineData
+
+_EPOCH = datetime(1970, 1, 1)
+
+def ms_to_datetime(ms: int) -> datetime:
+    """Epoch milliseconds -> naive UTC datetime (same as pd.to_datetime(ms, unit='ms'))."""
+    return _EPOCH + timedelta(milliseconds=int(ms))
+
+def _to_epoch_ms(col: pd.Series) -> np.ndarray:
+    if pd.api.types.is_numeric_dtype(col):
+        return col.to_numpy(dtype=np.int64)
+    # CSVs written by download_data.py store the times as date strings
+    return pd.to_datetime(col).to_numpy(dtype="datetime64[ms]").astype(np.int64)
+
+class KlineArrays:
+    """
+    Columnar view of a kline series.
+    Every field is a contiguous NumPy array (float64 prices, int64 epoch-ms times)
+    so the backtester and vectorised strategies never touch per-bar objects.
+    """
+    __slots__ = ("open_time", "open", "high", "low", "close", "volume", "close_time")
+
+    def __init__(self, open_time, open, high, low, close, volume, close_time):
+        self.open_time = np.ascontiguousarray(open_time, dtype=np.int64)
+        self.open = np.ascontiguousarray(open, dtype=np.float64)
+        self.high = np.ascontiguousarray(high, dtype=np.float64)
+        self.low = np.ascontiguousarray(low, dtype=np.float64)
+        self.close = np.ascontiguousarray(close, dtype=np.float64)
+        self.volume = np.ascontiguousarray(volume, dtype=np.float64)
+        self.close_time = np.ascontiguousarray(close_time, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.close)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "KlineArrays":
+        """
+        Build from a DataFrame in Binance kline column order:
+        [open_time, open, high, low, close, volume, close_time, ...]
+        Works for both raw API frames (integer labels, string prices)
+        and the CSVs saved by scripts/download_data.py.
+        """
+        cols = [df.iloc[:, i] for i in range(7)]
+        return cls(
+            open_time=_to_epoch_ms(cols[0]),
+            open=cols[1].to_numpy(dtype=np.float64),
+            high=cols[2].to_numpy(dtype=np.float64),
+            low=cols[3].to_numpy(dtype=np.float64),
+            close=cols[4].to_numpy(dtype=np.float64),
+            volume=cols[5].to_numpy(dtype=np.float64),
+            close_time=_to_epoch_ms(cols[6]),
+        )
+
+    @classmethod
+    def from_klines(cls, klines: Sequence[Sequence]) -> "KlineArrays":
+        """Build from raw Binance kline lists (as returned by get_klines / get_historical_klines)."""
+        if not klines:
+            return cls(*([] for _ in range(7)))
+        raw = np.asarray([k[:7] for k in klines], dtype=object)
+        return cls(
+            open_time=raw[:, 0].astype(np.int64),
+            open=raw[:, 1].astype(np.float64),
+            high=raw[:, 2].astype(np.float64),
+            low=raw[:, 3].astype(np.float64),
+            close=raw[:, 4].astype(np.float64),
+            volume=raw[:, 5].astype(np.float64),
+            close_time=raw[:, 6].astype(np.int64),
+        )
+
+    def slice(self, start: int, stop: int) -> "KlineArrays":
+        """Zero-copy sub-range of the series."""
+        return KlineArrays(*(getattr(self, f)[start:stop] for f in self.__slots__))
+
+    def kline(self, i: int, symbol: str, interval: str) -> KlineData:
+        """
+        Materialise bar i as a KlineData for strategies that only implement on_tick.
+        Values are already typed, so validation is skipped.
+        """
+        return KlineData.model_construct(
+            symbol=symbol,
+            interval=interval,
+            open_time=ms_to_datetime(self.open_time[i]),
+            open_price=float(self.open[i]),
+            high_price=float(self.high[i]),
+            low_price=float(self.low[i]),
+            close_price=float(self.close[i]),
+            volume=float(self.volume[i]),
+            close_time=ms_to_datetime(self.close_time[i]),
+            is_closed=True,
+        )
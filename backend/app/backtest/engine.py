@@ -1,8 +1,18 @@
-from typing import Dict, List, Type
+from collections import deque
+from typing import Callable, Dict, List, Optional, Type
+import numpy as np
 import pandas as pd
 from datetime import datetime
+from app.backtest.arrays import KlineArrays, ms_to_datetime
+from app.backtest.metrics import StreamingMetrics
 from app.strategy.base import BaseStrategy
-from app.schemas.market_data import KlineData, TradeSignal
+
+# Bars between progress callbacks
+PROGRESS_EVERY = 2048
+
+class BacktestCancelled(Exception):
+    """Raised from a progress callback to abort a running backtest."""
+    pass
 
 class BacktestEngine:
     def __init__(self, strategy_class: Type[BaseStrategy], config: Dict, initial_capital: float = 10000.0):
@@ -16,8 +26,19 @@ class BacktestEngine:
         self.avg_entry = 0.0
         
         self.portfolio_value = initial_capital
-        self.trades: List[Dict] = []
-        self.history: List[Dict] = [] 
+        self.num_trades = 0
+        self.trades: deque = deque(maxlen=10) # Last trades only; the report shows 10
+        self.metrics = StreamingMetrics(initial_capital)
+        self._times = np.empty(0, dtype=np.int64)
+        
+        # Full per-bar equity/position arrays are opt-in; reports only need the
+        # streaming metrics, so memory stays constant for long runs.
+        self.record_equity = config.get("record_equity", False)
+        self.equity = np.empty(0)
+        self.positions = np.empty(0)
+        
+        # Optional progress(stage, fraction) callback; may raise BacktestCancelled
+        self.progress: Optional[Callable[[str, float], None]] = None
         
         # Risk Params
         self.sl_pct = config.get("sl_percent", 2.0) / 100
@@ -25,55 +46,104 @@ class BacktestEngine:
 
     async def run(self, data: pd.DataFrame):
         """
-        Runs the backtest on the provided DataFrame.
+        Runs the backtest on the provided DataFrame (Binance kline column order).
+        """
+        return await self.run_arrays(KlineArrays.from_frame(data))
+
+    async def run_arrays(self, bars: KlineArrays):
+        """
+        Columnar backtest loop.
+        Equity and position are written into preallocated arrays; per-bar KlineData
+        objects are only built for strategies without a generate_signals() fast path.
         """
         print(f"Starting Backtest ({self.config.get('symbol')}) with ${self.initial_capital:.2f}...")
         
-        strategy = self.strategy_class(strategy_id="backtest_v1", config=self.config)
-        
-        for index, row in data.iterrows():
-            # Create KlineData
-            kline = KlineData(
-                symbol=self.config.get("symbol", "BTCUSDT"),
-                interval=self.config.get("interval", "1m"),
-                open_time=pd.to_datetime(row[0], unit='ms'), # Open time
-                open_price=float(row[1]),
-                high_price=float(row[2]),
-                low_price=float(row[3]),
-                close_price=float(row[4]),
-                volume=float(row[5]),
-                close_time=pd.to_datetime(row[6], unit='ms'), # Close time
-                is_closed=True
-            )
+        # Backtests must not warm strategy buffers with live exchange data
+        strategy = self.strategy_class(strategy_id="backtest_v1", config={"preload": False, **self.config})
+        
+        if self.progress:
+            self.progress("signals", 0.0)
+        signals = strategy.generate_signals(bars)
+        if signals is not None:
+            self.simulate(bars.close, bars.close_time, signals, strategy.describe_signal)
+            return self._generate_report()
+        
+        symbol = self.config.get("symbol", "BTCUSDT")
+        interval = self.config.get("interval", "1m")
+        self._allocate(bars.close, bars.close_time)
+        closes = bars.close.tolist() # Python floats are faster to index than numpy scalars
+        progress = self.progress
+        
+        for i in range(len(bars)):
+            if progress and i % PROGRESS_EVERY == 0:
+                progress("simulating", i / len(bars))
             
-            current_price = kline.close_price
+            # 1. Mark to Market, 2. Risk Management (Check SL/TP)
+            risk_signal = self._step(i, closes[i])
             
-            # 1. Update Portfolio Value (Mark to Market)
-            # Long: Value = balance + (pos * current)
-            # Short: Value = balance - abs(pos)*current (but cash increased on sell)
-            # Replay-style: Equity = balance + position_value
-            # Position Value = pos * current
-            # If pos is negative (short), it correctly reduces value as current price increases.
-            self.portfolio_value = self.balance + (self.position * current_price)
+            # 3. Strategy Signal via on_tick. The strategy sees every bar so its
+            # buffer matches the vectorised path; the signal is dropped on risk bars.
+            kline = bars.kline(i, symbol, interval)
+            signal = await strategy.on_tick(kline)
+            if signal and not risk_signal:
+                self._execute_trade(signal, kline.close_time, "STRATEGY")
+        
+        return self._generate_report()
+    
+    def simulate(self, close: np.ndarray, close_time: np.ndarray, signals: np.ndarray,
+                 describe: Optional[Callable[[int, int], str]] = None) -> Dict:
+        """
+        Risk/fill simulation over precomputed signals (+1 BUY, -1 SELL, 0 none).
+        Synchronous and strategy-free, so it can run in worker processes.
+        """
+        self._allocate(close, close_time)
+        actions = signals.tolist()
+        closes = close.tolist()
+        progress = self.progress
+        
+        for i in range(len(closes)):
+            if progress and i % PROGRESS_EVERY == 0:
+                progress("simulating", i / len(closes))
             
-            self.history.append({
-                "time": kline.close_time,
-                "value": self.portfolio_value,
-                "price": current_price
-            })
+            current_price = closes[i]
+            risk_signal = self._step(i, current_price)
             
-            # 2. Risk Management (Check SL/TP)
-            risk_signal = self._check_risk(current_price)
-            if risk_signal:
-                self._execute_trade(risk_signal, kline.close_time, "RISK_ENGINE")
-            else:
-                # 3. Strategy Signal (only if no risk action)
-                signal = await strategy.on_tick(kline)
-                if signal:
-                    self._execute_trade(signal, kline.close_time, "STRATEGY")
-                
+            # 3. Precomputed Strategy Signal (only if no risk action)
+            action = actions[i]
+            if action and not risk_signal:
+                signal = {
+                    "action": "BUY" if action > 0 else "SELL",
+                    "price": current_price,
+                    "reason": describe(i, action) if describe else "PRECOMPUTED"
+                }
+                self._execute_trade(signal, ms_to_datetime(close_time[i]), "STRATEGY")
+        
         return self._generate_report()
     
+    def _allocate(self, close: np.ndarray, close_time: np.ndarray):
+        n = len(close)
+        self.metrics = StreamingMetrics(self.initial_capital)
+        self._times = close_time
+        if self.record_equity:
+            self.equity = np.empty(n, dtype=np.float64)
+            self.positions = np.empty(n, dtype=np.float64)
+    
+    def _step(self, i: int, current_price: float) -> Optional[Dict]:
+        # 1. Update Portfolio Value (Mark to Market)
+        # Equity = balance + position_value, position_value = pos * current
+        # If pos is negative (short), it correctly reduces value as current price increases.
+        self.portfolio_value = self.balance + (self.position * current_price)
+        self.metrics.update(self._times[i], self.portfolio_value, current_price, self.position)
+        if self.record_equity:
+            self.equity[i] = self.portfolio_value
+            self.positions[i] = self.position
+        
+        # 2. Risk Management (Check SL/TP)
+        risk_signal = self._check_risk(current_price)
+        if risk_signal:
+            self._execute_trade(risk_signal, ms_to_datetime(self._times[i]), "RISK_ENGINE")
+        return risk_signal
+    
     def _check_risk(self, current_price: float) -> Optional[Dict]:
         if abs(self.position) < 0.000001:
             return None
@@ -146,6 +216,7 @@ class BacktestEngine:
                 self.avg_entry = price
 
         if qty > 0:
+            self.num_trades += 1
             self.trades.append({
                 "time": timestamp,
                 "action": action,
@@ -159,15 +230,9 @@ class BacktestEngine:
         pnl = self.portfolio_value - self.initial_capital
         pnl_pct = (pnl / self.initial_capital) * 100
         
-        # Drawdown
-        df = pd.DataFrame(self.history)
-        df['cummax'] = df['value'].cummax()
-        df['drawdown'] = (df['value'] - df['cummax']) / df['cummax']
-        max_dd = df['drawdown'].min() * 100
-        
-        # Volatility & Sharpe
-        df['ret'] = df['value'].pct_change()
-        sharpe = (df['ret'].mean() / df['ret'].std()) * (525600 ** 0.5) if df['ret'].std() != 0 else 0
+        # Drawdown, Sharpe, Sortino, Calmar, Exposure (accumulated bar by bar)
+        stats = self.metrics.summary()
+        max_dd = stats["max_drawdown"]
         
         report = {
             "initial_capital": self.initial_capital,
@@ -175,10 +240,13 @@ class BacktestEngine:
             "total_pnl": pnl,
             "pnl_pct": pnl_pct,
             "max_drawdown": max_dd,
-            "sharpe": sharpe,
-            "num_trades": len(self.trades),
-            "trades": self.trades[-10:], # Last 10 trades for info
-            "history": self.history[::max(1, len(self.history)//100)] # Downsampled history (100 pts)
+            "sharpe": stats["sharpe"],
+            "sortino": stats["sortino"],
+            "calmar": stats["calmar"],
+            "exposure": stats["exposure"],
+            "num_trades": self.num_trades,
+            "trades": list(self.trades), # Last 10 trades for info
+            "history": self.metrics.curve() # Downsampled equity curve (100-200 pts)
         }
         
         print(f"Backtest Completed. PnL: {pnl_pct:.2f}% | Drawdown: {max_dd:.2f}%")
@@ -0,0 +1,117 @@
+import math
+from typing import Dict, List
+from app.backtest.arrays import ms_to_datetime
+
+# Annualisation factor used by the backtest reports (1m bars per year)
+PERIODS_PER_YEAR = 525600
+
+class StreamingMetrics:
+    """
+    Online equity-curve statistics with O(1) memory.
+
+    Updated once per bar with the marked-to-market portfolio value. Tracks the running
+    peak and max drawdown, Welford mean/variance of per-bar returns, downside deviation
+    (Sortino), exposure, and a decimated equity curve of at most 2 * max_points points
+    for the chart, no matter how many bars are fed in.
+    """
+    def __init__(self, initial_value: float, max_points: int = 100, periods_per_year: int = PERIODS_PER_YEAR):
+        self.initial_value = initial_value
+        self.max_points = max_points
+        self.periods_per_year = periods_per_year
+
+        self.bars = 0
+        self.last_value = None
+        self.peak = -math.inf
+        self.max_drawdown = 0.0 # Fraction, <= 0
+
+        # Welford accumulators over returns
+        self.n_returns = 0
+        self.mean_return = 0.0
+        self._m2 = 0.0
+        self._downside_sq = 0.0
+
+        self.bars_in_market = 0
+
+        # Decimated curve: keep every `stride`-th bar, halve when full
+        self._stride = 1
+        self._points: List[tuple] = []
+        self._last_point: tuple = ()
+
+    def update(self, time_ms: int, value: float, price: float, position: float):
+        last = self.last_value
+        if last is not None and last != 0:
+            ret = value / last - 1.0
+            self.n_returns += 1
+            delta = ret - self.mean_return
+            self.mean_return += delta / self.n_returns
+            self._m2 += delta * (ret - self.mean_return)
+            if ret < 0:
+                self._downside_sq += ret * ret
+        self.last_value = value
+
+        if value > self.peak:
+            self.peak = value
+        elif self.peak > 0:
+            drawdown = (value - self.peak) / self.peak
+            if drawdown < self.max_drawdown:
+                self.max_drawdown = drawdown
+
+        if position > 0.000001 or position < -0.000001:
+            self.bars_in_market += 1
+
+        point = (time_ms, value, price)
+        if self.bars % self._stride == 0:
+            self._points.append(point)
+            if len(self._points) >= 2 * self.max_points:
+                self._points = self._points[::2]
+                self._stride *= 2
+        self._last_point = point
+        self.bars += 1
+
+    @property
+    def std_return(self) -> float:
+        return math.sqrt(self._m2 / (self.n_returns - 1)) if self.n_returns > 1 else 0.0
+
+    @property
+    def sharpe(self) -> float:
+        std = self.std_return
+        return (self.mean_return / std) * math.sqrt(self.periods_per_year) if std != 0 else 0.0
+
+    @property
+    def sortino(self) -> float:
+        if self.n_returns == 0 or self._downside_sq == 0:
+            return 0.0
+        downside = math.sqrt(self._downside_sq / self.n_returns)
+        return (self.mean_return / downside) * math.sqrt(self.periods_per_year)
+
+    @property
+    def calmar(self) -> float:
+        if self.bars == 0 or self.max_drawdown == 0 or self.last_value is None or self.initial_value <= 0:
+            return 0.0
+        growth = self.last_value / self.initial_value
+        if growth <= 0:
+            annual_return = -1.0 # Account wiped out
+        else:
+            # Log space, capped so short runs with large gains stay finite (JSON-safe)
+            annual_return = math.exp(min(math.log(growth) * self.periods_per_year / self.bars, 700.0)) - 1
+        return annual_return / abs(self.max_drawdown)
+
+    @property
+    def exposure(self) -> float:
+        return self.bars_in_market / self.bars if self.bars else 0.0
+
+    def curve(self) -> List[Dict]:
+        """Downsampled equity curve for the chart (always ends at the last bar)."""
+        points = list(self._points)
+        if self._last_point and (not points or points[-1] is not self._last_point):
+            points.append(self._last_point)
+        return [{"time": ms_to_datetime(t), "value": v, "price": p} for t, v, p in points]
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "max_drawdown": self.max_drawdown * 100,
+            "sharpe": self.sharpe,
+            "sortino": self.sortino,
+            "calmar": self.calmar,
+            "exposure": self.exposure * 100,
+        }
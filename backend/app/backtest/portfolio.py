@@ -0,0 +1,203 @@
+from collections import deque
+from typing import Dict, List, Type
+import numpy as np
+from app.backtest.arrays import KlineArrays, ms_to_datetime
+from app.backtest.metrics import StreamingMetrics
+from app.strategy.base import BaseStrategy
+
+COMMISSION = 0.001 # 0.1%, same as BacktestEngine
+
+class AlignedBars:
+    """
+    Several symbols' klines on one shared time index (union of open times).
+    close[t, s] is NaN where symbol s has no bar at step t.
+    """
+    def __init__(self, bars_by_symbol: Dict[str, KlineArrays]):
+        self.symbols: List[str] = list(bars_by_symbol)
+        self.time = np.unique(np.concatenate([b.open_time for b in bars_by_symbol.values()]))
+        self.close_time = np.zeros(len(self.time), dtype=np.int64)
+        self.close = np.full((len(self.time), len(self.symbols)), np.nan)
+        # Row of each symbol's own bars in the shared index
+        self.rows: Dict[str, np.ndarray] = {}
+        for s, symbol in enumerate(self.symbols):
+            bars = bars_by_symbol[symbol]
+            rows = np.searchsorted(self.time, bars.open_time)
+            self.rows[symbol] = rows
+            self.close[rows, s] = bars.close
+            np.maximum.at(self.close_time, rows, bars.close_time)
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+class PortfolioBacktestEngine:
+    """
+    One-pass backtest of many symbols sharing a single cash balance.
+
+    Positions, entry prices and the last seen prices are vectors over symbols;
+    mark-to-market, SL/TP checks and fills are applied to all symbols at once with
+    NumPy on every step. Strategies with generate_signals() are evaluated once per
+    symbol up front; on_tick-only strategies are called per symbol per bar.
+    """
+    def __init__(self, strategy_class: Type[BaseStrategy], config: Dict, initial_capital: float = 10000.0):
+        self.strategy_class = strategy_class
+        self.config = config
+        self.initial_capital = initial_capital
+
+        # Risk Params (same keys as BacktestEngine)
+        self.sl_pct = config.get("sl_percent", 2.0) / 100
+        self.tp_pct = config.get("tp_percent", 4.0) / 100
+
+        self.cash = initial_capital
+        self.portfolio_value = initial_capital
+        self.trades: deque = deque(maxlen=10) # Last trades only; counts are kept per symbol
+        self.metrics = StreamingMetrics(initial_capital)
+
+    async def run(self, bars_by_symbol: Dict[str, KlineArrays]):
+        aligned = AlignedBars(bars_by_symbol)
+        symbols = aligned.symbols
+        n_steps, n_symbols = aligned.close.shape
+        print(f"Starting Portfolio Backtest ({n_symbols} symbols, {n_steps} steps) with ${self.initial_capital:.2f}...")
+
+        # Each new position gets an equal slice of 95% of cash (single symbol == BacktestEngine)
+        allocation = self.config.get("allocation", 0.95 / n_symbols)
+
+        # 1. Strategy signals, (steps, symbols) int8
+        signals = np.zeros((n_steps, n_symbols), dtype=np.int8)
+        strategies: List[BaseStrategy] = []
+        tick_strategies: Dict[int, BaseStrategy] = {}
+        tick_reasons: Dict[int, str] = {}
+        interval = self.config.get("interval", "1m")
+        for s, symbol in enumerate(symbols):
+            strategy = self.strategy_class(
+                strategy_id=f"portfolio_{symbol}",
+                config={"preload": False, **self.config, "symbol": symbol}
+            )
+            strategies.append(strategy)
+            symbol_signals = strategy.generate_signals(bars_by_symbol[symbol])
+            if symbol_signals is None:
+                tick_strategies[s] = strategy
+            else:
+                signals[aligned.rows[symbol], s] = symbol_signals
+
+        # Vector state
+        position = np.zeros(n_symbols)
+        avg_entry = np.zeros(n_symbols)
+        last_price = np.full(n_symbols, np.nan)
+        # History "price": equal-weight basket of each symbol's close relative to its first bar,
+        # starting at the average first close (the symbol's own close for a single symbol)
+        first_price = np.array([aligned.close[aligned.rows[symbol][0], s] for s, symbol in enumerate(symbols)])
+        basket_base = first_price.mean()
+        trade_counts = np.zeros(n_symbols, dtype=np.int64)
+        sl_pct, tp_pct = self.sl_pct, self.tp_pct
+
+        for t in range(n_steps):
+            price = aligned.close[t]
+            has_bar = ~np.isnan(price)
+            np.copyto(last_price, price, where=has_bar)
+
+            # 2. Mark to Market (symbols without a bar keep their last price)
+            held = np.abs(position) > 0.000001
+            self.portfolio_value = self.cash + np.dot(position[held], last_price[held])
+            basket = basket_base * np.nanmean(last_price / first_price)
+            self.metrics.update(aligned.close_time[t], self.portfolio_value, basket, float(held.any()))
+
+            # 3. Risk Management (SL/TP for all symbols at once)
+            active = held & has_bar
+            risk = np.zeros(n_symbols, dtype=bool)
+            pnl_pct = None
+            if active.any():
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    pnl_pct = np.where(position > 0, price - avg_entry, avg_entry - price) / avg_entry
+                risk = active & ((pnl_pct <= -sl_pct) | (pnl_pct >= tp_pct))
+
+            # 4. Strategy signals (dropped where the risk engine acted)
+            if tick_strategies:
+                for s, strategy in tick_strategies.items():
+                    if has_bar[s]:
+                        kline = bars_by_symbol[symbols[s]].kline(
+                            np.searchsorted(aligned.rows[symbols[s]], t), symbols[s], interval
+                        )
+                        signal = await strategy.on_tick(kline)
+                        if signal:
+                            signals[t, s] = 1 if signal["action"] == "BUY" else -1
+                            tick_reasons[s] = signal.get("reason", "N/A")
+            step_signal = np.where(has_bar & ~risk, signals[t], 0)
+
+            if not risk.any() and not step_signal.any():
+                continue
+
+            # 5. Fills (vectorised). Exits: risk hits, or opposite signal on a held symbol.
+            long = position > 0.000001
+            short = position < -0.000001
+            flat = ~(long | short)
+            close_long = long & (risk | (step_signal < 0))
+            cover_short = short & (risk | (step_signal > 0))
+            open_long = flat & (step_signal > 0)
+            open_short = flat & (step_signal < 0)
+
+            # Every entry this step is sized from the cash available before fills
+            entry_cash = self.cash * allocation
+            qty = np.zeros(n_symbols)
+            qty[close_long] = position[close_long]
+            qty[cover_short] = -position[cover_short]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                qty[open_long | open_short] = entry_cash / price[open_long | open_short]
+
+            notional = qty * np.nan_to_num(price)
+            fees = notional * COMMISSION
+            sells = close_long | open_short
+            buys = cover_short | open_long
+            self.cash += (notional[sells] - fees[sells]).sum() - (notional[buys] + fees[buys]).sum()
+
+            position[close_long | cover_short] = 0.0
+            avg_entry[close_long | cover_short] = 0.0
+            position[open_long] = qty[open_long]
+            position[open_short] = -qty[open_short]
+            avg_entry[open_long | open_short] = price[open_long | open_short]
+
+            traded = np.flatnonzero(sells | buys)
+            trade_counts[traded] += 1
+            timestamp = ms_to_datetime(aligned.close_time[t])
+            for s in traded:
+                if risk[s]:
+                    reason = "SL" if pnl_pct[s] < 0 else "TP"
+                elif s in tick_strategies:
+                    reason = tick_reasons.get(s, "N/A")
+                else:
+                    reason = strategies[s].describe_signal(
+                        int(np.searchsorted(aligned.rows[symbols[s]], t)), int(step_signal[s])
+                    )
+                self.trades.append({
+                    "time": timestamp,
+                    "symbol": symbols[s],
+                    "action": "SELL" if sells[s] else "BUY",
+                    "price": float(price[s]),
+                    "qty": float(qty[s]),
+                    "source": "RISK_ENGINE" if risk[s] else "STRATEGY",
+                    "reason": reason
+                })
+
+        return self._generate_report(symbols, position, trade_counts)
+
+    def _generate_report(self, symbols: List[str], position: np.ndarray, trade_counts: np.ndarray):
+        pnl = self.portfolio_value - self.initial_capital
+        pnl_pct = (pnl / self.initial_capital) * 100
+        stats = self.metrics.summary()
+
+        report = {
+            "initial_capital": self.initial_capital,
+            "final_value": self.portfolio_value,
+            "total_pnl": pnl,
+            "pnl_pct": pnl_pct,
+            **stats,
+            "num_trades": int(trade_counts.sum()),
+            "symbols": {
+                symbol: {"num_trades": int(trade_counts[s]), "open_position": float(position[s])}
+                for s, symbol in enumerate(symbols)
+            },
+            "trades": list(self.trades),
+            "history": self.metrics.curve()
+        }
+
+        print(f"Portfolio Backtest Completed. PnL: {pnl_pct:.2f}% | Drawdown: {stats['max_drawdown']:.2f}%")
+        return report
@@ -0,0 +1,15 @@
+import numpy as np
+
+DEFAULT_THRESHOLD = 1.0005 # Min predicted move ratio for a signal (0.05%)
+
+def threshold_signals(predicted: np.ndarray, close: np.ndarray, threshold: float) -> np.ndarray:
+    """
+    LSTMStrategy signal rule over whole arrays:
+    +1 (BUY) if predicted > close * threshold, -1 (SELL) if predicted < close / threshold.
+    NaN predictions produce no signal.
+    """
+    signals = np.zeros(len(close), dtype=np.int8)
+    with np.errstate(invalid="ignore"):
+        signals[predicted > close * threshold] = 1
+        signals[predicted < close / threshold] = -1
+    return signals
@@ -0,0 +1,155 @@
+import itertools
+import os
+import random
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+import pandas as pd
+from app.backtest.engine import BacktestEngine
+from app.backtest.signals import DEFAULT_THRESHOLD, threshold_signals
+
+# Parameters a sweep may vary: engine risk settings + the LSTM signal threshold
+SWEEP_PARAMS = ("sl_percent", "tp_percent", "threshold")
+METRICS = ("pnl_pct", "final_value", "max_drawdown", "sharpe", "sortino", "calmar", "exposure", "num_trades")
+
+def grid_space(grid: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """Cartesian product of {"param": [values, ...]}."""
+    _validate(grid)
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+def random_space(spec: Dict[str, Any], n_samples: int, seed: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Random search over {"param": [choices, ...]} or {"param": {"low": a, "high": b}} (uniform).
+    """
+    _validate(spec)
+    rng = random.Random(seed)
+    space = []
+    for _ in range(n_samples):
+        params = {}
+        for key, values in spec.items():
+            if isinstance(values, dict):
+                params[key] = rng.uniform(values["low"], values["high"])
+            else:
+                params[key] = rng.choice(values)
+        space.append(params)
+    return space
+
+def _validate(spec: Dict[str, Any]):
+    unknown = set(spec) - set(SWEEP_PARAMS)
+    if unknown:
+        raise ValueError(f"Unsupported sweep parameters: {sorted(unknown)}. Allowed: {SWEEP_PARAMS}")
+
+# --- Worker side ---
+# Each worker attaches once to the shared block holding close / close_time / predictions.
+_shm: Optional[shared_memory.SharedMemory] = None
+_arrays: Dict[str, np.ndarray] = {}
+
+def _attach(shm_name: str, n: int):
+    global _shm
+    _shm = shared_memory.SharedMemory(name=shm_name)
+    _arrays.update(_views(_shm.buf, n))
+
+def _views(buf, n: int) -> Dict[str, np.ndarray]:
+    return {
+        "close": np.ndarray((n,), dtype=np.float64, buffer=buf, offset=0),
+        "predicted": np.ndarray((n,), dtype=np.float64, buffer=buf, offset=n * 8),
+        "close_time": np.ndarray((n,), dtype=np.int64, buffer=buf, offset=2 * n * 8),
+    }
+
+def _run_one(job) -> Dict[str, Any]:
+    params, base_config, initial_capital = job
+    config = {**base_config, **params}
+    engine = BacktestEngine(None, config, initial_capital=initial_capital)
+    signals = threshold_signals(
+        _arrays["predicted"], _arrays["close"], config.get("threshold", DEFAULT_THRESHOLD)
+    )
+    report = engine.simulate(_arrays["close"], _arrays["close_time"], signals)
+    return {**params, **{k: report[k] for k in METRICS}}
+
+# --- Driver ---
+
+def run_sweep(
+    close: np.ndarray,
+    close_time: np.ndarray,
+    predicted: np.ndarray,
+    space: List[Dict[str, Any]],
+    base_config: Optional[Dict] = None,
+    initial_capital: float = 10000.0,
+    workers: Optional[int] = None,
+    rank_by: str = "sharpe",
+    progress: Optional[Callable[[str, float], None]] = None,
+) -> pd.DataFrame:
+    """
+    Runs one backtest per parameter set across a process pool.
+    `progress(stage, fraction)` is called as runs complete; if it raises, pending runs are cancelled.
+
+    The model predictions are computed once by the caller (e.g. LSTMStrategy.predict_batch)
+    and shared with all workers through a single shared-memory block, so each run only
+    pays for the signal threshold and the risk/fill simulation.
+
+    Returns:
+        DataFrame with one row per parameter set and its metrics, best `rank_by` first.
+    """
+    if rank_by not in METRICS:
+        raise ValueError(f"rank_by must be one of {METRICS}")
+    base_config = base_config or {}
+    n = len(close)
+    workers = workers or os.cpu_count() or 1
+
+    shm = shared_memory.SharedMemory(create=True, size=max(1, 3 * n * 8))
+    try:
+        views = _views(shm.buf, n)
+        views["close"][:] = close
+        views["predicted"][:] = predicted
+        views["close_time"][:] = close_time
+        del views # Release buffer exports before close()
+
+        jobs = [(params, base_config, initial_capital) for params in space]
+        chunksize = max(1, len(jobs) // (workers * 4))
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=mp.get_context("spawn"),
+            initializer=_attach,
+            initargs=(shm.name, n),
+        ) as pool:
+            rows = []
+            try:
+                for row in pool.map(_run_one, jobs, chunksize=chunksize):
+                    rows.append(row)
+                    if progress:
+                        progress("sweeping", len(rows) / len(jobs))
+            except BaseException:
+                pool.shutdown(cancel_futures=True)
+                raise
+    finally:
+        shm.close()
+        shm.unlink()
+
+    table = pd.DataFrame(rows, columns=[*dict.fromkeys(k for p in space for k in p), *METRICS])
+    # Drawdown is negative, so "best" is the largest value for every metric
+    table = table.sort_values(rank_by, ascending=False, ignore_index=True)
+    table.insert(0, "rank", range(1, len(table) + 1))
+    return table
+
+def sweep_backtest(
+    strategy_class,
+    config: Dict,
+    bars,
+    space: List[Dict[str, Any]],
+    progress: Optional[Callable[[str, float], None]] = None,
+    **kwargs,
+) -> pd.DataFrame:
+    """
+    Runs the strategy's batch inference once over `bars` (KlineArrays), then sweeps `space`.
+    The strategy must implement predict_batch().
+    """
+    strategy = strategy_class(strategy_id="sweep_v1", config={"preload": False, **config})
+    if not hasattr(strategy, "predict_batch"):
+        raise ValueError(f"{strategy_class.__name__} does not support parameter sweeps (no predict_batch).")
+    if progress:
+        progress("predicting", 0.0)
+    predicted = strategy.predict_batch(bars)
+    return run_sweep(bars.close, bars.close_time, predicted, space, base_config=config, progress=progress, **kwargs)
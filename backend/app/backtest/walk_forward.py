@@ -0,0 +1,181 @@
+import hashlib
+import json
+import os
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional
+import pandas as pd
+from app.backtest.arrays import KlineArrays, ms_to_datetime
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(__file__), "../../data/walk_forward")
+
+# Training hyperparameters (same defaults as scripts/train_model.py)
+DEFAULT_TRAIN_PARAMS = {
+    "seq_length": 60,
+    "hidden_dim": 64,
+    "num_layers": 2,
+    "epochs": 10,
+    "batch_size": 32,
+    "learning_rate": 0.001,
+    "seed": 0,
+}
+
+class Fold(NamedTuple):
+    index: int
+    train_start: int
+    train_end: int # exclusive
+    test_start: int
+    test_end: int # exclusive
+
+def make_folds(n: int, train_bars: int, test_bars: int, step: Optional[int] = None, anchored: bool = False) -> List[Fold]:
+    """
+    Rolling (or anchored/expanding) train -> test windows over n bars.
+    Each test window directly follows its training window; windows advance by `step`
+    (default: test_bars, so test windows tile the history without overlap).
+    """
+    step = step or test_bars
+    folds = []
+    train_end = train_bars
+    while train_end + test_bars <= n:
+        train_start = 0 if anchored else train_end - train_bars
+        folds.append(Fold(len(folds), train_start, train_end, train_end, train_end + test_bars))
+        train_end += step
+    return folds
+
+def fold_key(bars: KlineArrays, fold: Fold, train_params: Dict[str, Any]) -> str:
+    """Content hash of the training window + hyperparameters; identifies a cached model."""
+    from app.ml.artifacts import ARTIFACT_FORMAT
+    h = hashlib.sha256()
+    for field in ("open_time", "open", "high", "low", "close", "volume"):
+        h.update(getattr(bars, field)[fold.train_start:fold.train_end].tobytes())
+    h.update(json.dumps(train_params, sort_keys=True).encode())
+    h.update(f"artifact_format={ARTIFACT_FORMAT}".encode())
+    return h.hexdigest()[:24]
+
+def _ohlcv_frame(bars: KlineArrays, start: int, stop: int) -> pd.DataFrame:
+    return pd.DataFrame({
+        'close': bars.close[start:stop],
+        'open': bars.open[start:stop],
+        'high': bars.high[start:stop],
+        'low': bars.low[start:stop],
+        'volume': bars.volume[start:stop]
+    })
+
+# --- Worker side ---
+
+def _init_worker(torch_threads: int):
+    import torch
+    # Bound intra-op threads so parallel folds don't oversubscribe the box
+    torch.set_num_threads(torch_threads)
+    torch.set_num_interop_threads(1)
+
+def _run_fold(job) -> Dict[str, Any]:
+    from app.backtest.engine import BacktestEngine
+    from app.backtest.signals import DEFAULT_THRESHOLD, threshold_signals
+    from app.ml.artifacts import load_artifact, save_artifact
+    from app.ml.inference import predict_series
+    from app.ml.training import train_lstm
+
+    bars, fold, train_params, backtest_config, buffer_size, cache_dir = job
+    key = fold_key(bars, fold, train_params)
+    model_path = os.path.join(cache_dir, f"{key}.pt")
+
+    # 1. Train (or reuse the cached artifact for this exact window)
+    cached = os.path.exists(model_path)
+    if cached:
+        artifact = load_artifact(model_path)
+        model, scaler, train_metrics = artifact.model, artifact.scaler, artifact.metrics
+    else:
+        model, fitted, train_metrics = train_lstm(
+            _ohlcv_frame(bars, fold.train_start, fold.train_end),
+            log=lambda msg: print(f"[fold {fold.index}] {msg}"),
+            **train_params
+        )
+        scaler = (fitted.scale_, fitted.min_)
+        # Bundle is written to a temp name first, so a killed worker never leaves a half-written artifact
+        save_artifact(model_path, model, fitted, train_params["seq_length"], train_metrics, version=key)
+
+    # 2. Out-of-sample backtest with the fold's training scaler. Inference may look back
+    # into the training window (past data only) so the tick buffer is full from the first test bar.
+    context_start = max(0, fold.test_start - (buffer_size - 1))
+    predicted = predict_series(
+        model, _ohlcv_frame(bars, context_start, fold.test_end),
+        train_params["seq_length"], buffer_size, scaler=scaler
+    )[fold.test_start - context_start:]
+    close = bars.close[fold.test_start:fold.test_end]
+    close_time = bars.close_time[fold.test_start:fold.test_end]
+    signals = threshold_signals(predicted, close, backtest_config.get("threshold", DEFAULT_THRESHOLD))
+    engine = BacktestEngine(None, backtest_config, initial_capital=backtest_config.get("initial_capital", 10000.0))
+    report = engine.simulate(close, close_time, signals)
+
+    return {
+        "fold": fold.index,
+        "train_from": ms_to_datetime(bars.open_time[fold.train_start]),
+        "train_to": ms_to_datetime(bars.close_time[fold.train_end - 1]),
+        "test_from": ms_to_datetime(bars.open_time[fold.test_start]),
+        "test_to": ms_to_datetime(bars.close_time[fold.test_end - 1]),
+        "cached": cached,
+        "train_loss": train_metrics["train_loss"],
+        "val_loss": train_metrics["val_loss"],
+        "pnl_pct": report["pnl_pct"],
+        "max_drawdown": report["max_drawdown"],
+        "sharpe": report["sharpe"],
+        "num_trades": report["num_trades"],
+        "model_key": key,
+    }
+
+# --- Driver ---
+
+def run_walk_forward(
+    bars: KlineArrays,
+    train_bars: int,
+    test_bars: int,
+    step: Optional[int] = None,
+    anchored: bool = False,
+    train_params: Optional[Dict[str, Any]] = None,
+    backtest_config: Optional[Dict[str, Any]] = None,
+    buffer_size: int = 150,
+    workers: Optional[int] = None,
+    torch_threads: Optional[int] = None,
+    cache_dir: str = DEFAULT_CACHE_DIR,
+) -> pd.DataFrame:
+    """
+    Walk-forward evaluation: for every fold, train LSTMNetwork on the training
+    window and backtest the following test window with BacktestEngine.
+
+    Folds are independent and run in a process pool; each worker is limited to
+    `torch_threads` intra-op threads (default: cores / workers). Trained models
+    are cached in `cache_dir` by content hash, so re-running with extra folds
+    only trains the new ones.
+
+    Returns:
+        One row per fold with training loss and out-of-sample metrics.
+    """
+    train_params = {**DEFAULT_TRAIN_PARAMS, **(train_params or {})}
+    backtest_config = backtest_config or {}
+    folds = make_folds(len(bars), train_bars, test_bars, step, anchored)
+    if not folds:
+        raise ValueError(f"{len(bars)} bars is too short for train_bars={train_bars} + test_bars={test_bars}")
+
+    cpus = os.cpu_count() or 1
+    workers = min(workers or cpus, len(folds))
+    torch_threads = torch_threads or max(1, cpus // workers)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    # Ship each worker only the bars its fold needs (training window + test window)
+    jobs = []
+    for fold in folds:
+        start = fold.train_start
+        shifted = Fold(fold.index, 0, fold.train_end - start, fold.test_start - start, fold.test_end - start)
+        jobs.append((bars.slice(start, fold.test_end), shifted, train_params, backtest_config, buffer_size, cache_dir))
+
+    print(f"Walk-forward: {len(folds)} folds, {workers} workers x {torch_threads} torch threads")
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=mp.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(torch_threads,),
+    ) as pool:
+        rows = list(pool.map(_run_fold, jobs))
+
+    return pd.DataFrame(rows)
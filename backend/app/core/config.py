@@ -12,6 +12,51 @@ class Settings(BaseSettings):
     REAL_TRADING_ENABLED: bool = False # Default to Paper Trading
     BINANCE_TESTNET: bool = True # Default to True for safety
 
+    # Backtest prediction cache (relative to the backend root)
+    PREDICTION_CACHE_DIR: str = "data/prediction_cache"
+    PREDICTION_CACHE_MAX_BYTES: int = 1024 ** 3 # 1 GB, least recently used entries evicted first
+
+    # Model inference (see app/ml/runtime.py)
+    INFERENCE_THREADS: int = 0 # Torch intra-op threads for the API process; 0 keeps torch's default
+    # Live micro-batching across strategies (see app/ml/batching.py)
+    INFERENCE_BATCH_MAX_WAIT_MS: float = 2.0 # Collect requests this long after the first; 0 = same loop iteration only
+    INFERENCE_BATCH_MAX_SIZE: int = 256 # A full batch runs immediately
+
+    # Live kline ingestion (see app/services/stream_mux.py): combined-stream connections
+    BINANCE_STREAM_URL: str | None = None # None: python-binance's endpoint for the client (live / testnet)
+    INGEST_STREAMS: str = "" # Extra streams besides the active pair and the strategies', e.g. "ETHUSDT@1m,SOLUSDT@5m"
+    INGEST_STREAMS_PER_CONNECTION: int = 200 # Binance allows up to 1024
+    INGEST_SOCKET_QUEUE_SIZE: int = 100 # Parsed frames per connection; on overflow python-binance drops the connection
+    TICK_JOURNAL_DIR: str | None = None # Record every raw frame to a journal here (see app/services/tick_journal.py)
+    # Live kline ingestion pipeline (see app/services/market_data.py): bounded queue per stage, per stream
+    INGEST_DECODE_QUEUE_SIZE: int = 1024 # Raw socket messages; the socket reader waits when full
+    INGEST_STRATEGY_QUEUE_SIZE: int = 64 # Closed candles; the oldest is dropped when full
+    INGEST_BROADCAST_QUEUE_SIZE: int = 256 # UI messages; the oldest is dropped when full
+    # Write-behind buffer for market_data (see app/services/market_writer.py)
+    MARKET_WRITER_FLUSH_SECONDS: float = 60.0 # Also flushed when a candle closes
+    MARKET_WRITER_MAX_ROWS: int = 500 # Buffered candles that trigger an early flush
+    MARKET_WRITER_MAX_RETRY_ROWS: int = 10000 # Rows kept across failed flushes; oldest candles dropped beyond
+
+    # Online fine-tuning of live models (see app/services/model_refresh.py)
+    MODEL_REFRESH_INTERVAL_MINUTES: float = 360 # 0 disables the schedule (POST /model/refresh still works)
+    MODEL_REFRESH_CANDLES: int = 1000 # Most recent closed candles to fine-tune on (Binance max per request)
+    MODEL_REFRESH_EPOCHS: int = 3
+    MODEL_REFRESH_LEARNING_RATE: float = 0.0002
+    MODEL_REFRESH_BATCH_SIZE: int = 64
+    MODEL_REFRESH_MAX_LOSS_RATIO: float = 1.0 # Gate: candidate val loss <= current model's * ratio
+    MODEL_REFRESH_DIR: str = "data/models" # Accepted fine-tuned bundles (relative to the backend root)
+    MODEL_REFRESH_WORKER_THREADS: int = 1
+    MODEL_REFRESH_WORKER_NICENESS: int = 10 # The worker yields the CPU to the API / tick pipeline
+    MODEL_REFRESH_HISTORY: int = 100 # Refresh attempts kept for GET /model/refresh
+
+    # Background backtest jobs (run in worker processes, off the live trading loop)
+    BACKTEST_MAX_CONCURRENT_JOBS: int = 2 # Worker processes; further jobs wait in the queue
+    BACKTEST_MAX_PENDING_JOBS: int = 16 # Queued + running; submissions beyond this are rejected
+    BACKTEST_WORKER_THREADS: int = 1 # Torch/BLAS threads per worker
+    BACKTEST_WORKER_NICENESS: int = 10 # Workers yield the CPU to the API / tick pipeline
+    BACKTEST_JOB_HISTORY: int = 100 # Finished jobs kept for GET /backtest/jobs
+    BACKTEST_SWEEP_WORKERS: int = 2 # Processes per parameter sweep job (caps SweepRequest.workers)
+
     class Config:
         env_file = ".env"
 
@@ -9,9 +9,14 @@ from app.services.market_data import market_data_service
 async def lifespan(app: FastAPI):
     # Startup: Initialize connections & Start Ingestion
     await market_data_service.start()
+    from app.services.model_refresh import model_refresher
+    model_refresher.start()
     yield
-    # Shutdown: Close connections
+    # Shutdown: Close connections, stop backtest and fine-tuning workers
     await market_data_service.stop()
+    from app.services.backtest_jobs import backtest_jobs
+    backtest_jobs.shutdown()
+    model_refresher.shutdown()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
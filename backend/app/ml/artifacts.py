@@ -0,0 +1,174 @@
+import hashlib
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import torch
+from app.ml.features import FEATURE_COLUMNS
+from app.ml.networks import LSTMNetwork
+from app.ml.prediction_cache import model_fingerprint
+from app.ml.runtime import InferenceRuntime, export_path
+from app.core.config import settings
+
+# Bump when the bundle layout changes; load_artifact rejects newer formats
+ARTIFACT_FORMAT = 1
+
+class ModelArtifact:
+    """
+    A loaded model bundle: network (eval mode) + everything needed to feed it.
+
+    scale/min_ are the training MinMaxScaler parameters (scaled = x * scale + min_).
+    They are None for legacy bare state_dict files, in which case callers fall back
+    to fitting the scaler on each tick buffer.
+    """
+    def __init__(self, model: LSTMNetwork, architecture: Dict[str, int], features: List[str],
+                 seq_length: Optional[int], scale: Optional[np.ndarray], min_: Optional[np.ndarray],
+                 metrics: Dict[str, Any], version: str, path: str):
+        self.model = model
+        self.architecture = architecture
+        self.features = features
+        self.seq_length = seq_length
+        self.scale = scale
+        self.min_ = min_
+        self.metrics = metrics
+        self.version = version
+        self.path = path
+        self.fingerprint = self._fingerprint()
+        self._runtimes: Dict[bool, InferenceRuntime] = {}
+        self._runtime_lock = threading.Lock()
+
+    @property
+    def runtime(self) -> InferenceRuntime:
+        """Shared float32 forward pass: the exported graph next to the bundle if present, else eager."""
+        return self.get_runtime()
+
+    def get_runtime(self, quantized: bool = False) -> InferenceRuntime:
+        """Shared forward pass for the float32 or the int8 variant (one of each per artifact)."""
+        with self._runtime_lock:
+            if quantized not in self._runtimes:
+                self._runtimes[quantized] = InferenceRuntime(
+                    self.model, export_path(self.path, quantized), self.fingerprint,
+                    threads=settings.INFERENCE_THREADS, quantized=quantized
+                )
+            return self._runtimes[quantized]
+
+    @property
+    def scaler(self) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        return (self.scale, self.min_) if self.scale is not None else None
+
+    def _fingerprint(self) -> str:
+        """Hash of weights + scaler + input layout; identifies what the artifact predicts."""
+        h = hashlib.sha256(model_fingerprint(self.model).encode())
+        if self.scale is not None:
+            h.update(self.scale.tobytes())
+            h.update(self.min_.tobytes())
+        h.update(",".join(self.features).encode())
+        h.update(str(self.seq_length).encode())
+        return h.hexdigest()
+
+def save_artifact(
+    path: str,
+    model: LSTMNetwork,
+    scaler,
+    seq_length: int,
+    metrics: Optional[Dict[str, Any]] = None,
+    version: Optional[str] = None,
+):
+    """
+    Write a model bundle (one torch file): weights, fitted scaler arrays, feature list,
+    seq_length and architecture. Written to a temp name first, then renamed.
+
+    Args:
+        scaler: fitted sklearn MinMaxScaler (or anything with scale_ / min_).
+    """
+    bundle = {
+        "format": ARTIFACT_FORMAT,
+        "version": version or datetime.now().strftime("%Y%m%d%H%M%S"),
+        "created_at": datetime.now().isoformat(),
+        "architecture": {
+            "input_dim": model.lstm.input_size,
+            "hidden_dim": model.hidden_dim,
+            "output_dim": model.fc.out_features,
+            "num_layers": model.num_layers,
+        },
+        "features": list(FEATURE_COLUMNS),
+        "seq_length": seq_length,
+        "scaler": {
+            "scale": torch.from_numpy(np.asarray(scaler.scale_, dtype=np.float64)),
+            "min": torch.from_numpy(np.asarray(scaler.min_, dtype=np.float64)),
+        },
+        "metrics": {k: float(v) for k, v in (metrics or {}).items()},
+        "state_dict": model.state_dict(),
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    torch.save(bundle, path + ".tmp")
+    os.replace(path + ".tmp", path)
+
+def _infer_architecture(state_dict: Dict[str, torch.Tensor]) -> Dict[str, int]:
+    """Architecture of a legacy bare state_dict, from the tensor shapes."""
+    num_layers = sum(1 for key in state_dict if key.startswith("lstm.weight_ih_l"))
+    return {
+        "input_dim": state_dict["lstm.weight_ih_l0"].shape[1],
+        "hidden_dim": state_dict["lstm.weight_hh_l0"].shape[1],
+        "output_dim": state_dict["fc.weight"].shape[0],
+        "num_layers": num_layers,
+    }
+
+def load_artifact(path: str) -> ModelArtifact:
+    """
+    Load a bundle written by save_artifact, or a legacy bare state_dict.
+    Weights are memory-mapped from the file rather than read into fresh buffers.
+    """
+    obj = torch.load(path, map_location=torch.device('cpu'), mmap=True, weights_only=True)
+    if "state_dict" in obj:
+        if obj.get("format", 0) > ARTIFACT_FORMAT:
+            raise ValueError(f"{path}: artifact format {obj['format']} is newer than supported ({ARTIFACT_FORMAT})")
+        state_dict = obj["state_dict"]
+        architecture = obj["architecture"]
+        scale = obj["scaler"]["scale"].numpy()
+        min_ = obj["scaler"]["min"].numpy()
+        features, seq_length = obj["features"], obj["seq_length"]
+        metrics, version = obj.get("metrics", {}), obj.get("version", "")
+    else:
+        state_dict = obj
+        architecture = _infer_architecture(state_dict)
+        scale = min_ = None
+        features, seq_length = list(FEATURE_COLUMNS), None
+        metrics, version = {}, "legacy"
+
+    if features != list(FEATURE_COLUMNS):
+        raise ValueError(f"{path}: trained on features {features}, pipeline produces {FEATURE_COLUMNS}")
+
+    model = LSTMNetwork(architecture["input_dim"], architecture["hidden_dim"],
+                        architecture["output_dim"], architecture["num_layers"])
+    model.load_state_dict(state_dict, assign=True) # Keep the mmapped tensors
+    model.eval()
+    return ModelArtifact(model, architecture, features, seq_length, scale, min_, metrics, version, path)
+
+class ModelCache:
+    """
+    Process-wide cache of loaded artifacts, keyed by path and modification time.
+    Every strategy instance and backtest in the process shares one loaded model
+    per file; a file rewritten on disk is loaded again on the next get().
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._artifacts: Dict[str, Tuple[int, ModelArtifact]] = {}
+
+    def get(self, path: str) -> ModelArtifact:
+        path = os.path.realpath(path)
+        mtime = os.stat(path).st_mtime_ns
+        with self._lock:
+            cached = self._artifacts.get(path)
+            if cached and cached[0] == mtime:
+                return cached[1]
+            artifact = load_artifact(path)
+            self._artifacts[path] = (mtime, artifact)
+            return artifact
+
+    def clear(self):
+        with self._lock:
+            self._artifacts.clear()
+
+model_cache = ModelCache()
@@ -0,0 +1,131 @@
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+import numpy as np
+from app.core.config import settings
+from app.ml.runtime import InferenceRuntime
+
+class InferenceBatcher:
+    """
+    In-process micro-batching for live inference.
+
+    Callers (one per strategy and candle) await predict() with a single input window.
+    Requests for the same runtime (= model version and variant) and window shape are
+    collected for up to `max_wait_ms` after the first one, or until `max_batch` are
+    queued, then run as one forward pass; every caller's future gets its own row.
+    A lone request is passed as a view of its window; larger batches are copied into a
+    reused (max_batch, *shape) array. The forward pass runs on a dedicated thread, so
+    the event loop keeps serving sockets meanwhile. Batch sizes and queue waits are
+    kept for metrics().
+    """
+    def __init__(self, max_batch: int = settings.INFERENCE_BATCH_MAX_SIZE,
+                 max_wait_ms: float = settings.INFERENCE_BATCH_MAX_WAIT_MS, history: int = 4096):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queues: Dict[Tuple[InferenceRuntime, Tuple[int, ...]], List[Tuple[np.ndarray, asyncio.Future, float]]] = {}
+        self._timers: Dict[Tuple[InferenceRuntime, Tuple[int, ...]], asyncio.Handle] = {}
+        self._free: Dict[Tuple[int, ...], List[np.ndarray]] = {} # Batch arrays not in a forward pass, per window shape
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+
+        self.requests = 0
+        self.batches = 0
+        self.max_batch_seen = 0
+        self._batch_sizes: deque = deque(maxlen=history)
+        self._waits: deque = deque(maxlen=history) # Seconds from enqueue to forward pass start
+        self._forward_times: deque = deque(maxlen=history)
+        self._versions: Dict[str, int] = {} # Requests per runtime backend / model
+
+    async def predict(self, runtime: InferenceRuntime, window: np.ndarray) -> np.ndarray:
+        """Model output row for one (seq_length, features) window."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        key = (runtime, window.shape)
+        queue = self._queues.setdefault(key, [])
+        queue.append((window, future, time.perf_counter()))
+        if len(queue) >= self.max_batch:
+            self._flush(key)
+        elif len(queue) == 1:
+            if self.max_wait > 0:
+                self._timers[key] = loop.call_later(self.max_wait, self._flush, key)
+            else: # Still batches callers that enqueue in the same loop iteration
+                self._timers[key] = loop.call_soon(self._flush, key)
+        return await future
+
+    def _flush(self, key):
+        timer = self._timers.pop(key, None)
+        if timer:
+            timer.cancel()
+        requests = self._queues.pop(key, None)
+        if requests:
+            asyncio.ensure_future(self._run(key[0], requests))
+
+    async def _run(self, runtime: InferenceRuntime, requests: List[Tuple[np.ndarray, asyncio.Future, float]]):
+        started = time.perf_counter()
+        shape = requests[0][0].shape
+        buffer = None
+        if len(requests) == 1:
+            batch = requests[0][0][None] # View; the caller's window is untouched until it is answered
+        else:
+            buffer = self._take_buffer(shape, len(requests))
+            batch = buffer[:len(requests)]
+            for i, (window, _, _) in enumerate(requests):
+                batch[i] = window
+        try:
+            out = await asyncio.get_running_loop().run_in_executor(self._executor, runtime.predict, batch)
+        except Exception as e:
+            for _, future, _ in requests:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            if buffer is not None:
+                self._free.setdefault(shape, []).append(buffer)
+            self._record(runtime, requests, started)
+        for i, (_, future, _) in enumerate(requests):
+            if not future.done(): # Caller may have been cancelled
+                future.set_result(out[i])
+
+    def _take_buffer(self, shape: Tuple[int, ...], size: int) -> np.ndarray:
+        # float32, as the runtime feeds torch; one array per batch in flight
+        free = self._free.get(shape)
+        while free:
+            buffer = free.pop()
+            if len(buffer) >= size:
+                return buffer
+        return np.empty((max(self.max_batch, size), *shape), dtype=np.float32)
+
+    def _record(self, runtime: InferenceRuntime, requests, started: float):
+        size = len(requests)
+        self.requests += size
+        self.batches += 1
+        self.max_batch_seen = max(self.max_batch_seen, size)
+        self._batch_sizes.append(size)
+        self._waits.extend(started - enqueued for _, _, enqueued in requests)
+        self._forward_times.append(time.perf_counter() - started)
+        name = f"{runtime.backend}:{id(runtime.model):x}"
+        self._versions[name] = self._versions.get(name, 0) + size
+
+    def metrics(self) -> Dict[str, Any]:
+        """Totals plus batch-size and queue-wait statistics over the most recent batches."""
+        def percentiles(values, scale=1.0):
+            if not values:
+                return {"p50": None, "p99": None, "max": None}
+            arr = np.fromiter(values, dtype=np.float64) * scale
+            return {"p50": float(np.percentile(arr, 50)), "p99": float(np.percentile(arr, 99)), "max": float(arr.max())}
+
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch_size": self.requests / self.batches if self.batches else None,
+            "max_batch_size": self.max_batch_seen,
+            "batch_size": percentiles(self._batch_sizes),
+            "queue_wait_ms": percentiles(self._waits, 1000),
+            "forward_ms": percentiles(self._forward_times, 1000),
+            "pending": sum(len(queue) for queue in self._queues.values()),
+            "requests_by_model": dict(self._versions),
+            "max_wait_ms": self.max_wait * 1000,
+        }
+
+inference_batcher = InferenceBatcher()
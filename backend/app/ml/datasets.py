@@ -0,0 +1,38 @@
+import numpy as np
+import torch
+from torch.utils.data import Dataset
+
+class SequenceDataset(Dataset):
+    """
+    Sliding-window LSTM samples served by index from one contiguous float32 feature array.
+
+    Item i is (features[s:s + seq_length], target[s + seq_length:s + seq_length + horizon])
+    with s = i * stride. Both are views of the shared tensor, so the only copies made
+    during training are the mini-batches the DataLoader stacks; peak memory stays at
+    about the size of the feature matrix, whatever seq_length is.
+    """
+    def __init__(self, features: np.ndarray, seq_length: int, horizon: int = 1, stride: int = 1, target_col: int = 0):
+        # No copy if the input is already contiguous float32
+        self.features = torch.from_numpy(np.ascontiguousarray(features, dtype=np.float32))
+        self.target = self.features[:, target_col]
+        self.seq_length = seq_length
+        self.horizon = horizon
+        self.stride = stride
+        self.length = max(0, (len(features) - seq_length - horizon) // stride + 1)
+
+    def share_memory(self) -> "SequenceDataset":
+        """Move the feature tensor to shared memory so DataLoader workers map it instead of copying it."""
+        self.features.share_memory_()
+        return self
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, i: int):
+        if i < 0:
+            i += self.length
+        if not 0 <= i < self.length:
+            raise IndexError(f"Sample {i} out of range ({self.length} samples)")
+        start = i * self.stride
+        end = start + self.seq_length
+        return self.features[start:end], self.target[end:end + self.horizon]
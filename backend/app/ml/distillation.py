@@ -0,0 +1,320 @@
+import hashlib
+import os
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+import torch
+import torch.nn as nn
+from numpy.lib.stride_tricks import sliding_window_view
+from app.backtest.signals import DEFAULT_THRESHOLD, threshold_signals
+from app.ml.features import FeatureEngineer, FEATURE_COLUMNS, INDICATOR_WARMUP
+from app.ml.inference import prepare_online_window, predict_series
+from app.ml.online_features import OnlineFeatureEngine
+
+# Bump when the student bundle layout changes; load_student rejects newer formats
+STUDENT_FORMAT = 1
+# Targets are log moves in basis points, so the MSE is not lost in float32 rounding
+TARGET_SCALE = 1e4
+
+def student_path(model_path: str) -> str:
+    """Default student bundle next to a teacher model: lstm_v1.pth -> lstm_v1.student.pt"""
+    return os.path.splitext(model_path)[0] + ".student.pt"
+
+def student_inputs(rows: np.ndarray, lags: int, scaler: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> np.ndarray:
+    """
+    Student input vector from recent FEATURE_COLUMNS rows, shape (..., history, F)
+    -> (..., (lags + 1) * F):
+    - the last `lags` rows with prices taken relative to the newest close (SMA / volatility
+      relative to their own bar's close), independent of the price level;
+    - the newest row scaled the way the teacher scales its input: with its training
+      `scaler`, or (legacy teachers, scaler None) min-max over all given rows, NaN rows
+      ignored. The teacher's output depends strongly on this position in its range.
+    """
+    newest = rows[..., -1, :]
+    if scaler is not None:
+        scaled = newest * scaler[0] + scaler[1]
+    else:
+        low = np.fmin.reduce(rows, axis=-2)
+        data_range = np.fmax.reduce(rows, axis=-2) - low
+        data_range = np.where(data_range == 0.0, 1.0, data_range)
+        scaled = (newest - low) / data_range
+    rows = rows[..., -lags:, :]
+    close = rows[..., 0]
+    x = np.stack([
+        close / close[..., -1:] - 1.0,
+        rows[..., 1], # log_return
+        rows[..., 2] / close - 1.0, # sma_20
+        rows[..., 3] / 100.0, # rsi
+        rows[..., 4] / close, # volatility
+    ], axis=-1)
+    return np.concatenate([x.reshape(*x.shape[:-2], -1), scaled], axis=-1)
+
+class StudentNetwork(nn.Module):
+    """One hidden ReLU layer (hidden_dim 0: a linear model) from student_inputs to the log move in bps."""
+    def __init__(self, input_dim: int, hidden_dim: int = 32):
+        super(StudentNetwork, self).__init__()
+        if hidden_dim:
+            self.net = nn.Sequential(nn.Linear(input_dim, hidden_dim), nn.ReLU(), nn.Linear(hidden_dim, 1))
+        else:
+            self.net = nn.Sequential(nn.Linear(input_dim, 1))
+
+    def forward(self, x):
+        return self.net(x)
+
+class StudentModel:
+    """
+    Serving side of a distilled student: the network's weights as NumPy arrays, so one
+    decision is a few small mat-vec products on the newest feature rows (no torch call,
+    no sequence model). `history` rows are needed per decision: `lags`, or the teacher's
+    scaler fit rows when it has no training scaler.
+    """
+    def __init__(self, layers: List[Tuple[np.ndarray, np.ndarray]], mean: np.ndarray, std: np.ndarray,
+                 lags: int, history: int, scaler: Optional[Tuple[np.ndarray, np.ndarray]], teacher: str,
+                 metrics: Dict[str, Any], version: str, path: str = ""):
+        self.layers = layers
+        self.mean = mean
+        self.std = std
+        self.lags = lags
+        self.history = history
+        self.scaler = scaler
+        self.teacher = teacher # Fingerprint of the teacher artifact it was distilled from
+        self.metrics = metrics
+        self.version = version
+        self.path = path
+        h = hashlib.sha256(teacher.encode())
+        for weight, bias in layers:
+            h.update(weight.tobytes())
+            h.update(bias.tobytes())
+        h.update(mean.tobytes())
+        h.update(std.tobytes())
+        h.update(f"{lags}:{history}".encode())
+        if scaler is not None:
+            h.update(scaler[0].tobytes())
+            h.update(scaler[1].tobytes())
+        self.fingerprint = h.hexdigest()
+
+    @classmethod
+    def from_network(cls, network: StudentNetwork, mean: np.ndarray, std: np.ndarray, lags: int, history: int,
+                     scaler: Optional[Tuple[np.ndarray, np.ndarray]], teacher: str,
+                     metrics: Optional[Dict[str, Any]] = None, version: str = "", path: str = ""):
+        linears = [m for m in network.net if isinstance(m, nn.Linear)]
+        layers = [(m.weight.detach().numpy().astype(np.float64), m.bias.detach().numpy().astype(np.float64))
+                  for m in linears]
+        return cls(layers, mean, std, lags, history, scaler, teacher, metrics or {}, version, path)
+
+    def predict_move(self, rows: np.ndarray):
+        """Predicted log move of the next close for (..., history, F) rows; NaN where a lag row is NaN."""
+        x = (student_inputs(rows, self.lags, self.scaler) - self.mean) / self.std
+        for weight, bias in self.layers[:-1]:
+            x = np.maximum(x @ weight.T + bias, 0.0)
+        weight, bias = self.layers[-1]
+        return (x @ weight.T + bias)[..., 0] / TARGET_SCALE
+
+    def predict_close(self, rows: np.ndarray):
+        """Predicted next close for the newest bar of `rows`."""
+        return rows[..., -1, 0] * np.exp(self.predict_move(rows))
+
+    def predict_series(self, df: pd.DataFrame, buffer_size: int) -> np.ndarray:
+        """
+        predict_close for every bar of an OHLCV frame, NaN until the tick buffer is full
+        (as in LSTMStrategy.on_tick) and where a feature row is NaN.
+        """
+        n = len(df)
+        predictions = np.full(n, np.nan)
+        rows = _feature_rows(df)
+        if n < max(buffer_size, self.history):
+            return predictions
+        windows = sliding_window_view(rows, self.history, axis=0).transpose(0, 2, 1) # bar t at t - history + 1
+        ends = np.arange(buffer_size - 1, n)
+        for start in range(0, len(ends), 4096): # Bounded temporaries on long series
+            idx = ends[start:start + 4096]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                predictions[idx] = self.predict_close(windows[idx - self.history + 1])
+        return predictions
+
+def _feature_rows(df: pd.DataFrame) -> np.ndarray:
+    """FEATURE_COLUMNS per bar of `df` (NaN during the indicator warm-up), as the online engine has them."""
+    indicators = FeatureEngineer.add_technical_indicators(df)
+    return indicators[FEATURE_COLUMNS].reindex(range(len(df))).to_numpy(dtype=np.float64)
+
+def save_student(path: str, student: StudentModel):
+    """Write a student bundle (one torch file), temp name first, then renamed."""
+    bundle = {
+        "format": STUDENT_FORMAT,
+        "version": student.version,
+        "created_at": datetime.now().isoformat(),
+        "features": list(FEATURE_COLUMNS),
+        "lags": student.lags,
+        "history": student.history,
+        "scaler": None if student.scaler is None else {
+            "scale": torch.from_numpy(np.asarray(student.scaler[0], dtype=np.float64)),
+            "min": torch.from_numpy(np.asarray(student.scaler[1], dtype=np.float64)),
+        },
+        "teacher": student.teacher,
+        "layers": [{"weight": torch.from_numpy(w), "bias": torch.from_numpy(b)} for w, b in student.layers],
+        "mean": torch.from_numpy(student.mean),
+        "std": torch.from_numpy(student.std),
+        "metrics": {k: float(v) for k, v in student.metrics.items()},
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    torch.save(bundle, path + ".tmp")
+    os.replace(path + ".tmp", path)
+
+def load_student(path: str) -> StudentModel:
+    obj = torch.load(path, map_location="cpu", weights_only=True)
+    if obj.get("format", 0) > STUDENT_FORMAT:
+        raise ValueError(f"{path}: student format {obj['format']} is newer than supported ({STUDENT_FORMAT})")
+    if obj["features"] != list(FEATURE_COLUMNS):
+        raise ValueError(f"{path}: student trained on features {obj['features']}, expected {FEATURE_COLUMNS}")
+    layers = [(layer["weight"].numpy(), layer["bias"].numpy()) for layer in obj["layers"]]
+    scaler = (obj["scaler"]["scale"].numpy(), obj["scaler"]["min"].numpy()) if obj["scaler"] is not None else None
+    return StudentModel(layers, obj["mean"].numpy(), obj["std"].numpy(), obj["lags"], obj["history"], scaler,
+                        obj["teacher"], obj.get("metrics", {}), obj.get("version", ""), path)
+
+def teacher_predictions(artifact, df: pd.DataFrame, buffer_size: int = 150, seq_length: int = 60,
+                        quantized: bool = False) -> np.ndarray:
+    """The teacher's predicted close per bar, exactly as LSTMStrategy would serve it."""
+    return predict_series(artifact.get_runtime(quantized), df, artifact.seq_length or seq_length, buffer_size,
+                          scaler=artifact.scaler)
+
+def compare(student: StudentModel, artifact, df: pd.DataFrame, threshold: float = DEFAULT_THRESHOLD,
+            buffer_size: int = 150, seq_length: int = 60, teacher: Optional[np.ndarray] = None,
+            latency_iterations: int = 500) -> Dict[str, Any]:
+    """
+    Student vs teacher on `df`: agreement of the threshold signals (on every bar, and on
+    the bars where either model signals), error of the predicted move in basis points,
+    and per-decision latency of both hot paths (student: newest rows -> close; teacher:
+    window preparation + batch-of-1 forward), in microseconds.
+    """
+    if teacher is None:
+        teacher = teacher_predictions(artifact, df, buffer_size, seq_length)
+    predicted = student.predict_series(df, buffer_size)
+    close = df["close"].to_numpy(dtype=np.float64)
+    valid = ~np.isnan(teacher) & ~np.isnan(predicted)
+    if not valid.any():
+        raise ValueError("No bar where both student and teacher predict")
+    signals = threshold_signals(teacher[valid], close[valid], threshold)
+    student_signals = threshold_signals(predicted[valid], close[valid], threshold)
+    active = (signals != 0) | (student_signals != 0)
+    error_bps = (np.log(predicted[valid] / close[valid]) - np.log(teacher[valid] / close[valid])) * 1e4
+
+    # Latency on the live data structures: an OnlineFeatureEngine holding the last buffer
+    engine = OnlineFeatureEngine(history=buffer_size)
+    for price in close[-buffer_size:]:
+        engine.update(float(price))
+    runtime = artifact.runtime
+    seq_length = artifact.seq_length or seq_length
+    runtime.warmup(seq_length, (1,))
+    timings = {}
+    for name, decide in (
+        ("student", lambda: student.predict_close(engine.last_rows(student.history))),
+        ("teacher", lambda: runtime.predict(
+            prepare_online_window(engine, buffer_size, seq_length, artifact.scaler)[0][None])),
+    ):
+        decide()
+        times = []
+        for _ in range(latency_iterations):
+            started = time.perf_counter()
+            decide()
+            times.append(time.perf_counter() - started)
+        timings[name] = (float(np.median(times) * 1e6), float(np.percentile(times, 99) * 1e6))
+
+    return {
+        "bars": int(valid.sum()),
+        "signal_agreement": float(np.mean(signals == student_signals)),
+        "active_agreement": float(np.mean(signals[active] == student_signals[active])) if active.any() else 1.0,
+        "teacher_signals": int((signals != 0).sum()),
+        "student_signals": int((student_signals != 0).sum()),
+        "mae_bps": float(np.mean(np.abs(error_bps))),
+        "student_p50_us": timings["student"][0], "student_p99_us": timings["student"][1],
+        "teacher_p50_us": timings["teacher"][0], "teacher_p99_us": timings["teacher"][1],
+    }
+
+def distill(
+    artifact,
+    df: pd.DataFrame,
+    lags: int = 4,
+    hidden_dim: int = 32,
+    epochs: int = 60,
+    batch_size: int = 64,
+    learning_rate: float = 0.003,
+    train_split: float = 0.8,
+    buffer_size: int = 150,
+    seq_length: int = 60,
+    threshold: float = DEFAULT_THRESHOLD,
+    seed: Optional[int] = 0,
+    log: Callable[[str], None] = print,
+    latency_iterations: int = 500,
+) -> Tuple[StudentModel, Dict[str, Any]]:
+    """
+    Train a compact student to mimic a teacher LSTM artifact.
+
+    The teacher labels every bar of `df` with its predicted close (the same numbers
+    LSTMStrategy serves); the student learns the implied log move from the last `lags`
+    incremental feature rows and the teacher-scaled newest row (see student_inputs).
+    The chronologically last 1 - train_split of the bars is held out for the report
+    (see compare).
+
+    Returns:
+        (student, report with "train_loss" / "val_loss" (MSE in bps^2) plus compare()'s
+         agreement and latency figures on the held-out bars)
+    """
+    if seed is not None:
+        torch.manual_seed(seed)
+    teacher = teacher_predictions(artifact, df, buffer_size, seq_length)
+    rows = _feature_rows(df)
+    close = df["close"].to_numpy(dtype=np.float64)
+    # Legacy teachers fit their scaler on the buffer rows past the indicator warm-up
+    history = lags if artifact.scaler is not None else max(lags, buffer_size - INDICATOR_WARMUP)
+    windows = sliding_window_view(rows, history, axis=0).transpose(0, 2, 1)
+    ends = np.arange(max(history, buffer_size) - 1, len(df))
+    X = student_inputs(windows[ends - history + 1], lags, artifact.scaler)
+    y = np.log(teacher[ends] / close[ends]) * TARGET_SCALE
+    usable = ~np.isnan(X).any(axis=1) & ~np.isnan(y)
+    ends, X, y = ends[usable], X[usable], y[usable]
+    train_size = int(len(X) * train_split)
+    if train_size == 0 or train_size == len(X):
+        raise ValueError(f"Not enough labelled bars ({len(X)}) to train and hold out")
+
+    mean = X[:train_size].mean(axis=0)
+    std = X[:train_size].std(axis=0)
+    std[std == 0] = 1.0
+    X_t = torch.from_numpy(((X - mean) / std).astype(np.float32))
+    y_t = torch.from_numpy(y.astype(np.float32))[:, None]
+
+    network = StudentNetwork(X.shape[1], hidden_dim)
+    optimizer = torch.optim.Adam(network.parameters(), lr=learning_rate)
+    criterion = nn.MSELoss()
+    generator = torch.Generator().manual_seed(seed if seed is not None else torch.initial_seed())
+    train_loss = float("nan")
+    for epoch in range(epochs):
+        network.train()
+        order = torch.randperm(train_size, generator=generator)
+        total = 0.0
+        for start in range(0, train_size, batch_size):
+            idx = order[start:start + batch_size]
+            loss = criterion(network(X_t[idx]), y_t[idx])
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            total += loss.item() * len(idx)
+        train_loss = total / train_size
+        network.eval()
+        with torch.no_grad():
+            val_loss = criterion(network(X_t[train_size:]), y_t[train_size:]).item()
+        log(f"Epoch {epoch+1}/{epochs}, Loss: {train_loss:.4f}, Val Loss: {val_loss:.4f} (bps^2)")
+
+    metrics = {"train_loss": train_loss, "val_loss": val_loss, "samples": len(X)}
+    student = StudentModel.from_network(
+        network, mean, std, lags, history, artifact.scaler, artifact.fingerprint, metrics,
+        version=datetime.now().strftime("%Y%m%d%H%M%S")
+    )
+    # Held-out report: the tail from the first held-out bar, plus the candles its buffer needs
+    start = max(int(ends[train_size]) - buffer_size + 1, 0)
+    held_out = df.iloc[start:].reset_index(drop=True)
+    report = compare(student, artifact, held_out, threshold, buffer_size, seq_length, teacher=teacher[start:],
+                     latency_iterations=latency_iterations)
+    student.metrics.update({k: v for k, v in report.items() if k in ("signal_agreement", "mae_bps")})
+    return student, {**metrics, **report}
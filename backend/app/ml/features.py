@@ -1,5 +1,12 @@
 import pandas as pd
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Model input columns, in the order the LSTM was trained on
+FEATURE_COLUMNS = ['close', 'log_return', 'sma_20', 'rsi', 'volatility']
+
+# Rows dropped at the start of a frame by add_technical_indicators (longest window: sma_50)
+INDICATOR_WARMUP = 49
 
 class FeatureEngineer:
     @staticmethod
@@ -32,31 +39,28 @@ class FeatureEngineer:
         
         return df
 
+    @staticmethod
+    def sequence_views(data: np.ndarray, seq_length: int, horizon: int = 1, stride: int = 1, target_col: int = 0):
+        """
+        Sliding-window samples as strided views of `data` (rows, features), no copy.
+        X: (N, seq_length, num_features), X[i] = data[i*stride : i*stride + seq_length]
+        y: (N, horizon), the target column for the `horizon` rows after each window
+        """
+        n = max(0, (len(data) - seq_length - horizon) // stride + 1)
+        if n == 0:
+            return np.empty((0, seq_length, data.shape[1]), dtype=data.dtype), np.empty((0, horizon), dtype=data.dtype)
+        X = sliding_window_view(data, seq_length, axis=0)[::stride][:n].transpose(0, 2, 1)
+        y = sliding_window_view(data[seq_length:, target_col], horizon)[::stride][:n]
+        return X, y
+
     @staticmethod
     def create_sequences(data: np.ndarray, seq_length: int, predict_window: int = 1):
         """
         Creates Sliding Window sequences for LSTM.
         X: (N, seq_length, num_features)
-        y: (N, ) - Target (e.g., next close > current close?)
+        y: (N, ) - Target: feature 0 (scaled close) of the step after each window
+        Both are read-only views of `data` (see sequence_views), not copies.
         """
-        xs, ys = [], []
-        # data shape: [rows, features]
-        # We want to predict if Price[t+1] > Price[t] (Binary Classification)
-        # Or predict the Return[t+1] (Regression)
-        
-        # Let's do Binary Classification: 1 if Next Close > Current Close, else 0
-        # Target column index assumed to be 'Close' or similar. 
-        # But here 'data' is already normalized features.
-        
-        # Simplification: Let's assume the LAST column is the target for regression
-        # Or better, we handle X and y separation before calling this.
-        
-        for i in range(len(data) - seq_length - predict_window):
-            x = data[i:(i + seq_length)]
-            # Target: Return of the next step
-            # For simplicity, let's predict the 0-th feature of next step
-            y = data[i + seq_length][0] 
-            xs.append(x)
-            ys.append(y)
-            
-        return np.array(xs), np.array(ys)
+        X, y = FeatureEngineer.sequence_views(data, seq_length)
+        n = max(0, len(data) - seq_length - predict_window)
+        return X[:n], y[:n, 0]
@@ -0,0 +1,212 @@
+import math
+from typing import Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+import torch
+from numpy.lib.stride_tricks import sliding_window_view
+from app.ml.features import FeatureEngineer, FEATURE_COLUMNS, INDICATOR_WARMUP
+from app.ml.online_features import OnlineFeatureEngine
+from app.ml.runtime import InferenceRuntime
+
+def minmax_params(data: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    MinMaxScaler fit on the last axis-0 rows, vectorised over any leading batch axes.
+    Returns (scale, min_) so that scaled = x * scale + min_ (same formula as sklearn).
+    """
+    data_min = data.min(axis=-2)
+    data_range = data.max(axis=-2) - data_min
+    data_range[data_range == 0.0] = 1.0 # sklearn's _handle_zeros_in_scale
+    scale = 1.0 / data_range
+    return scale, -data_min * scale
+
+def prepare_window(df: pd.DataFrame, seq_length: int, scaler: Optional[Tuple[np.ndarray, np.ndarray]] = None):
+    """
+    Feature pipeline for one tick buffer, as used by LSTMStrategy.on_tick:
+    indicators -> scaler fit on every surviving row -> last seq_length rows scaled.
+    With `scaler` (the training (scale, min_) from a model artifact) nothing is fit.
+
+    Returns (input_scaled, scale, min_, df_with_indicators), or None if the
+    buffer is too short once the indicator warm-up rows are dropped.
+    """
+    df = FeatureEngineer.add_technical_indicators(df)
+    if len(df) < seq_length:
+        return None
+    features = df[FEATURE_COLUMNS].values
+    scale, min_ = scaler if scaler is not None else minmax_params(features)
+    input_scaled = features[-seq_length:] * scale + min_
+    return input_scaled, scale, min_, df
+
+def prepare_online_window(
+    engine: OnlineFeatureEngine,
+    buffer_size: int,
+    seq_length: int,
+    scaler: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+):
+    """
+    prepare_window for the last buffer_size candles, read from an OnlineFeatureEngine
+    instead of recomputing indicators: the scaler is fit on the buffer rows that
+    survive the batch warm-up (and NaN) drop (unless a fixed `scaler` is given),
+    the last seq_length of them are scaled.
+
+    Returns (input_scaled, scale, min_), or None until enough bars have been seen.
+    """
+    if engine.count < buffer_size:
+        return None
+    return window_from_rows(engine.last_rows(buffer_size - INDICATOR_WARMUP), seq_length, scaler)
+
+def window_from_rows(rows: np.ndarray, seq_length: int, scaler: Optional[Tuple[np.ndarray, np.ndarray]] = None):
+    """prepare_online_window on rows already taken from the engine (e.g. a copy kept for later)."""
+    valid = ~np.isnan(rows).any(axis=1)
+    features = rows if valid.all() else rows[valid]
+    if len(features) < seq_length:
+        return None
+    scale, min_ = scaler if scaler is not None else minmax_params(features)
+    return features[-seq_length:] * scale + min_, scale, min_
+
+class WindowBuffer:
+    """
+    Preallocated per-strategy model input: prepare_online_window written in place.
+
+    The scaled window lands in a contiguous float32 (1, seq_length, features) array that
+    torch reads through `tensor` (torch.from_numpy, same memory). The scaler is fitted
+    into reused arrays and applied with same-shape ufuncs writing to `out=`, so a
+    steady-state candle allocates no array buffers. Results are bit-identical to
+    prepare_online_window. Buffers holding NaN rows (RSI on perfectly flat stretches)
+    go through prepare_online_window and are copied in.
+
+    Returned arrays are views of the buffers: valid until the next fill().
+    """
+    def __init__(self, seq_length: int, buffer_size: int, n_features: int = len(FEATURE_COLUMNS)):
+        self.seq_length = seq_length
+        self.buffer_size = buffer_size
+        self.fit_rows = buffer_size - INDICATOR_WARMUP
+        self.window = np.zeros((1, seq_length, n_features), dtype=np.float32)
+        self.tensor = torch.from_numpy(self.window)
+        # float64 scratch (the scaler math runs in float64, as in prepare_online_window)
+        self._ones = np.ones(max(self.fit_rows, 0) * n_features)
+        self._scaled = np.empty((seq_length, n_features))
+        self._scale_rows = np.empty((seq_length, n_features)) # scale / min_ repeated per row
+        self._min_rows = np.empty((seq_length, n_features))
+        self._tiled = None # Fixed scaler currently in _scale_rows / _min_rows
+        self._low = np.empty(n_features)
+        self._range = np.empty(n_features)
+        self._scale = np.empty(n_features)
+        self._min = np.empty(n_features)
+
+    def fill(self, engine: OnlineFeatureEngine, scaler: Optional[Tuple[np.ndarray, np.ndarray]] = None):
+        """
+        Returns (window (seq_length, features) float32, scale, min_), or None until
+        enough bars have been seen (as prepare_online_window).
+        """
+        if engine.count < self.buffer_size or self.fit_rows < self.seq_length:
+            return None
+        rows = engine.last_rows(self.fit_rows)
+        if math.isnan(np.dot(rows.reshape(-1), self._ones)): # Any NaN, without a temporary
+            prepared = window_from_rows(rows, self.seq_length, scaler)
+            if prepared is None:
+                return None
+            input_scaled, scale, min_ = prepared
+            self.window[0] = input_scaled
+            return self.window[0], scale, min_
+
+        if scaler is None:
+            # minmax_params, in place
+            low, data_range, scale, min_ = self._low, self._range, self._scale, self._min
+            np.min(rows, axis=0, out=low)
+            np.max(rows, axis=0, out=data_range)
+            np.subtract(data_range, low, out=data_range)
+            if not data_range.all():
+                data_range[data_range == 0.0] = 1.0
+            np.divide(1.0, data_range, out=scale)
+            np.multiply(low, scale, out=min_)
+            np.negative(min_, out=min_)
+            np.copyto(self._scale_rows, scale)
+            np.copyto(self._min_rows, min_)
+            self._tiled = None
+        else:
+            scale, min_ = scaler
+            if self._tiled is None or self._tiled[0] is not scale or self._tiled[1] is not min_:
+                np.copyto(self._scale_rows, scale)
+                np.copyto(self._min_rows, min_)
+                self._tiled = (scale, min_)
+        np.multiply(rows[-self.seq_length:], self._scale_rows, out=self._scaled)
+        np.add(self._scaled, self._min_rows, out=self._scaled)
+        self.window[0] = self._scaled # float32 cast into the tensor's memory
+        return self.window[0], scale, min_
+
+def predict_series(
+    model: Union[torch.nn.Module, InferenceRuntime],
+    df: pd.DataFrame,
+    seq_length: int,
+    buffer_size: int,
+    batch_size: int = 1024,
+    scaler: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+) -> np.ndarray:
+    """
+    Whole-series equivalent of calling LSTMStrategy.on_tick on every bar.
+
+    Args:
+        model: network mapping (batch, seq_length, features) -> scaled next close,
+            or an InferenceRuntime wrapping one (e.g. the artifact's exported graph).
+        df: OHLCV frame ('close', 'open', 'high', 'low', 'volume') for the full history.
+        seq_length: model input length.
+        buffer_size: candles held by the tick path before it starts predicting.
+        batch_size: windows per forward pass.
+        scaler: fixed training (scale, min_); by default fit per tick buffer like on_tick.
+
+    Returns:
+        Predicted close per bar (float64), NaN where the tick path would not predict.
+    """
+    n = len(df)
+    predictions = np.full(n, np.nan)
+    fit_rows = buffer_size - INDICATOR_WARMUP # rows a tick buffer fits its scaler on
+    if n < buffer_size or fit_rows < seq_length:
+        return predictions
+
+    # Indicators are rolling, so one pass over the full series gives the same rows
+    # each tick buffer would compute for itself.
+    indicators = FeatureEngineer.add_technical_indicators(df)
+    features = indicators[FEATURE_COLUMNS].reindex(range(n)).to_numpy(dtype=np.float64)
+
+    # A bar can use the vectorised path when its whole scaler window (just the input
+    # window with a fixed scaler) is NaN-free (e.g. RSI is NaN on perfectly flat
+    # stretches; those bars take the slow path).
+    invalid = np.isnan(features).any(axis=1)
+    invalid_count = np.concatenate(([0], np.cumsum(invalid)))
+    ends = np.arange(buffer_size - 1, n)
+    check_rows = fit_rows if scaler is None else seq_length
+    clean = invalid_count[ends + 1] - invalid_count[ends + 1 - check_rows] == 0
+
+    fit_windows = sliding_window_view(features, fit_rows, axis=0) # (n - fit_rows + 1, F, fit_rows)
+    seq_windows = sliding_window_view(features, seq_length, axis=0) # (n - seq_length + 1, F, seq_length)
+
+    runtime = model if isinstance(model, InferenceRuntime) else InferenceRuntime(model)
+    clean_ends = ends[clean]
+    # Chunk buffers reused across mini-batches: float64 scaling, float32 model input
+    size = min(batch_size, len(clean_ends))
+    scaled = np.empty((size, seq_length, features.shape[1]))
+    batch = np.empty((size, seq_length, features.shape[1]), dtype=np.float32)
+    for start in range(0, len(clean_ends), batch_size):
+        idx = clean_ends[start:start + batch_size]
+        k = len(idx)
+        if scaler is None:
+            fit = fit_windows[idx - fit_rows + 1].transpose(0, 2, 1)
+            scale, min_ = minmax_params(fit)
+        else:
+            scale, min_ = (np.broadcast_to(p, (k, p.shape[-1])) for p in scaler)
+        seq = seq_windows[idx - seq_length + 1].transpose(0, 2, 1)
+        np.multiply(seq, scale[:, None, :], out=scaled[:k])
+        np.add(scaled[:k], min_[:, None, :], out=scaled[:k])
+        np.copyto(batch[:k], scaled[:k], casting="same_kind")
+        out = runtime.predict(batch[:k])[:, 0]
+        predictions[idx] = (out - min_[:, 0]) / scale[:, 0]
+
+    for t in ends[~clean]:
+        prepared = prepare_window(df.iloc[t - buffer_size + 1:t + 1].reset_index(drop=True), seq_length, scaler)
+        if prepared is None:
+            continue
+        input_scaled, scale, min_, _ = prepared
+        out = runtime.predict(input_scaled[None])[0, 0]
+        predictions[t] = (out - min_[0]) / scale[0]
+
+    return predictions
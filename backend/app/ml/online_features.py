@@ -0,0 +1,145 @@
+import math
+import numpy as np
+from app.ml.features import FEATURE_COLUMNS
+
+# Full-recompute interval (in windows) that bounds floating-point drift of the running sums
+RESYNC_WINDOWS = 64
+
+class RollingWindow:
+    """
+    Fixed-size rolling mean and sample std over a ring buffer, O(1) per value.
+
+    Mirrors pandas `rolling(size).mean()` / `.std()`: NaN until the window is full,
+    exactly the value (std 0) when every value in the window is identical.
+    The mean/M2 pair is updated with the sliding-window form of Welford's algorithm
+    and recomputed exactly every RESYNC_WINDOWS windows.
+    """
+    __slots__ = ("size", "values", "pos", "count", "mean_", "m2", "last", "same_run", "pushes")
+
+    def __init__(self, size: int):
+        self.size = size
+        self.values = [0.0] * size
+        self.pos = 0
+        self.count = 0
+        self.mean_ = 0.0
+        self.m2 = 0.0
+        self.last = math.nan
+        self.same_run = 0 # Consecutive identical values ending at the newest one
+        self.pushes = 0
+
+    def push(self, x: float):
+        if self.count < self.size:
+            self.count += 1
+            delta = x - self.mean_
+            self.mean_ += delta / self.count
+            self.m2 += delta * (x - self.mean_)
+        else:
+            old = self.values[self.pos]
+            old_mean = self.mean_
+            self.mean_ += (x - old) / self.size
+            self.m2 += (x - old) * (x - self.mean_ + old - old_mean)
+        self.values[self.pos] = x
+        self.pos = (self.pos + 1) % self.size
+
+        self.same_run = self.same_run + 1 if x == self.last else 1
+        self.last = x
+
+        self.pushes += 1
+        if self.pushes % (self.size * RESYNC_WINDOWS) == 0:
+            self._resync()
+
+    def _resync(self):
+        window = self.values if self.count == self.size else self.values[:self.count]
+        self.mean_ = math.fsum(window) / self.count
+        self.m2 = math.fsum((v - self.mean_) ** 2 for v in window)
+
+    @property
+    def full(self) -> bool:
+        return self.count == self.size
+
+    @property
+    def mean(self) -> float:
+        if self.count < self.size:
+            return math.nan
+        if self.same_run >= self.size:
+            return self.last
+        return self.mean_
+
+    @property
+    def std(self) -> float:
+        if self.count < self.size or self.size < 2:
+            return math.nan
+        if self.same_run >= self.size:
+            return 0.0
+        return math.sqrt(max(self.m2, 0.0) / (self.size - 1))
+
+class OnlineFeatureEngine:
+    """
+    Incremental version of FeatureEngineer.add_technical_indicators.
+
+    Each closed candle updates the indicator state in constant time (rolling windows
+    for SMA20 / volatility, rolling gain/loss means for the simple 14-period RSI) and
+    writes one FEATURE_COLUMNS row into a ring buffer of the last `history` rows.
+    Rows are stored twice (at i and i + history) so any run of recent rows is a
+    contiguous view of the buffer, without copying or building a DataFrame.
+
+    Row values match the pandas batch version; the warm-up rows where pandas
+    yields NaN are NaN here too (sma_50 is not computed, callers that need the
+    batch warm-up use INDICATOR_WARMUP).
+    """
+    def __init__(self, history: int = 150, sma_window: int = 20, rsi_window: int = 14):
+        self.history = history
+        self.sma = RollingWindow(sma_window) # sma_20 and volatility share the window
+        self.gain = RollingWindow(rsi_window)
+        self.loss = RollingWindow(rsi_window)
+        self.prev_close = None
+        self.count = 0 # Bars seen
+        self._rows = np.full((2 * history, len(FEATURE_COLUMNS)), np.nan)
+        self._pos = 0 # Next row slot in [0, history)
+
+    def update(self, close: float) -> np.ndarray:
+        """Add one closed bar; returns its feature row (a view, valid until the slot is reused)."""
+        prev = self.prev_close
+        if prev is None:
+            log_return = math.nan
+            delta = 0.0 # pandas: the NaN first diff counts as neither gain nor loss
+        else:
+            log_return = math.log(close / prev) if prev > 0 and close > 0 else math.nan
+            delta = close - prev
+        self.prev_close = close
+
+        self.sma.push(close)
+        self.gain.push(delta if delta > 0 else 0.0)
+        self.loss.push(-delta if delta < 0 else 0.0)
+
+        row = (close, log_return, self.sma.mean, self._rsi(), self.sma.std)
+        pos = self._pos
+        self._rows[pos] = row
+        self._rows[pos + self.history] = row
+        self._pos = (pos + 1) % self.history
+        self.count += 1
+        return self._rows[pos + self.history]
+
+    def _rsi(self) -> float:
+        if not self.gain.full:
+            return math.nan
+        gain = max(self.gain.mean, 0.0)
+        loss = max(self.loss.mean, 0.0)
+        if loss == 0.0:
+            return 100.0 if gain > 0.0 else math.nan # inf / NaN rs, as in pandas
+        return 100 - (100 / (1 + gain / loss))
+
+    def latest(self) -> np.ndarray:
+        """Feature row of the most recent bar (NaN before the first update)."""
+        return self._rows[(self._pos - 1) % self.history + self.history]
+
+    def last_rows(self, n: int) -> np.ndarray:
+        """
+        The last n feature rows, oldest first, as a read-only view of the ring buffer
+        (fewer rows if fewer bars have been seen).
+        """
+        n = min(n, self.count, self.history)
+        end = self._pos + self.history
+        view = self._rows[end - n:end]
+        view.flags.writeable = False
+        return view
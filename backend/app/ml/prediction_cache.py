@@ -0,0 +1,266 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+import numpy as np
+import torch
+from app.backtest.arrays import KlineArrays
+from app.backtest.signals import threshold_signals
+from app.core.config import settings
+from app.ml.features import FEATURE_COLUMNS
+
+try:
+    import fcntl
+except ImportError: # Windows: entries are not locked across processes
+    fcntl = None
+
+# Per-bar columns stored in every entry (raw little-endian files, memory-mapped on read)
+_COLUMNS = {
+    "open_time": np.int64, # Alignment
+    "close": np.float64, # Detects changed input data
+    "predicted": np.float64,
+}
+
+def model_fingerprint(model: torch.nn.Module) -> str:
+    """Hash of the model weights (names, shapes and values)."""
+    h = hashlib.sha256()
+    for name, tensor in sorted(model.state_dict().items()):
+        h.update(name.encode())
+        h.update(str(tuple(tensor.shape)).encode())
+        h.update(tensor.detach().cpu().contiguous().numpy().tobytes())
+    return h.hexdigest()
+
+def prediction_key(model_hash: str, seq_length: int, buffer_size: int, symbol: str, interval: str) -> str:
+    """
+    Cache key: model weights + feature pipeline + series. Neither end of the range is
+    part of the key: a run starting later (relative start_str) is served from inside
+    the entry and a run ending later extends it.
+    """
+    parts = [model_hash, ",".join(FEATURE_COLUMNS), str(seq_length), str(buffer_size), symbol, interval]
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()[:32]
+
+class PredictionCache:
+    """
+    On-disk, content-addressed cache of per-bar model predictions and signals.
+
+    Each entry is a directory of raw column files plus a meta.json holding the row
+    count, for one contiguous run of closed candles. A request is located inside the
+    entry by open time; from the first candle that differs (or is new) onwards rows
+    are recomputed and written in place. Candles still forming are predicted but
+    never stored. Every access to an entry holds an exclusive flock on
+    <root>/<key>.lock, so job and sweep worker processes never read a partial write.
+    Entries are evicted in least-recently-used order once the cache grows past
+    max_bytes.
+    """
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+
+    def predictions(
+        self,
+        key: str,
+        bars: KlineArrays,
+        predict: Callable[[KlineArrays], np.ndarray],
+        lookback: int,
+        now_ms: Optional[int] = None,
+    ) -> np.ndarray:
+        """
+        Predicted close for every bar, computing only what the cache does not hold.
+
+        Args:
+            predict: model inference over a KlineArrays range (one value per bar).
+            lookback: bars of history a prediction depends on (tick buffer size - 1).
+            now_ms: candles closing at or after this are not cached (default: now).
+        """
+        n = len(bars)
+        closed = self._closed(bars, now_ms)
+        predicted = np.empty(0)
+        if closed:
+            with self._lock(key):
+                predicted = self._closed_predictions(key, bars.slice(0, closed), predict, lookback)
+        if closed < n:
+            # Candles still forming: predicted every time, with their history in front
+            start = max(0, closed - lookback)
+            predicted = np.concatenate([predicted, predict(bars.slice(start, n))[closed - start:]])
+        self._evict()
+        return predicted
+
+    def signals(
+        self,
+        key: str,
+        threshold: float,
+        predicted: np.ndarray,
+        bars: KlineArrays,
+        lookback: int,
+        now_ms: Optional[int] = None,
+    ) -> np.ndarray:
+        """
+        Signals for `threshold` over `bars` (`predicted` as returned by predictions()),
+        stored next to the entry's predictions they are derived from.
+        """
+        closed = self._closed(bars, now_ms)
+        with self._lock(key):
+            meta = self._read_meta(key)
+            offset = self._offset(key, meta, bars)
+            if offset is None or not closed or offset + closed > meta["rows"]:
+                return threshold_signals(predicted, bars.close, threshold)
+            path = os.path.join(self._dir(key), f"signals_{threshold!r}.i1")
+            if os.path.exists(path) and os.path.getsize(path) == meta["rows"]:
+                stored = np.fromfile(path, dtype=np.int8, count=closed, offset=offset)
+            else:
+                columns = self._open(key, meta["rows"])
+                entry = threshold_signals(columns["predicted"], columns["close"], threshold)
+                entry.tofile(path)
+                stored = entry[offset:offset + closed]
+        signals = np.concatenate([stored, threshold_signals(predicted[closed:], bars.close[closed:], threshold)])
+        signals[:lookback] = 0 # No prediction before the tick buffer is full
+        return signals
+
+    def _closed_predictions(self, key: str, bars: KlineArrays, predict, lookback: int) -> np.ndarray:
+        # Caller holds the key lock; all bars are closed
+        n = len(bars)
+        meta = self._read_meta(key)
+        offset = self._offset(key, meta, bars)
+        if offset is not None:
+            columns = self._open(key, meta["rows"])
+            overlap = min(meta["rows"] - offset, n)
+            same = ((columns["open_time"][offset:offset + overlap] == bars.open_time[:overlap])
+                    & (columns["close"][offset:offset + overlap] == bars.close[:overlap]))
+            valid = overlap if same.all() else int(np.argmin(same)) # First differing candle
+            kept = self._served(columns["predicted"][offset:offset + min(valid, n)], lookback)
+            del columns
+            if valid >= n:
+                self._touch(key, meta)
+                return kept
+            if valid >= lookback:
+                # Rows from the first differing / new candle on, with their history in front
+                new = predict(bars.slice(valid - lookback, n))[lookback:]
+                self._write(key, bars.open_time[valid:], bars.close[valid:], new, offset + valid)
+                return np.concatenate([kept, new])
+        # Not in the entry (or differs within the tick buffer of its first bar): rebuild
+        predicted = predict(bars)
+        self._write(key, bars.open_time, bars.close, predicted, 0)
+        return predicted
+
+    @staticmethod
+    def _served(predicted: np.ndarray, lookback: int) -> np.ndarray:
+        # A request starting inside the entry has no prediction until its own buffer is full
+        predicted = np.array(predicted)
+        predicted[:lookback] = np.nan
+        return predicted
+
+    @staticmethod
+    def _closed(bars: KlineArrays, now_ms: Optional[int]) -> int:
+        # Number of leading bars that closed before now_ms (close times are ascending)
+        now_ms = time.time() * 1000 if now_ms is None else now_ms
+        return int(np.searchsorted(bars.close_time, now_ms, side="left"))
+
+    # --- Storage ---
+
+    def _dir(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    @contextmanager
+    def _lock(self, key: str, blocking: bool = True):
+        """Exclusive per-key lock across processes; yields False if not blocking and busy."""
+        if fcntl is None:
+            yield True
+            return
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, f"{key}.lock"), "a") as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _offset(self, key: str, meta: Optional[Dict], bars: KlineArrays) -> Optional[int]:
+        """Row of the entry holding the first bar, or None if the entry does not cover it."""
+        if not meta or not meta["rows"] or not len(bars):
+            return None
+        open_time = self._open(key, meta["rows"])["open_time"]
+        offset = int(np.searchsorted(open_time, bars.open_time[0]))
+        if offset < meta["rows"] and open_time[offset] == bars.open_time[0]:
+            return offset
+        return None
+
+    def _read_meta(self, key: str) -> Optional[Dict]:
+        try:
+            with open(os.path.join(self._dir(key), "meta.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, key: str, meta: Dict):
+        path = os.path.join(self._dir(key), "meta.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(path + ".tmp", path)
+
+    def _touch(self, key: str, meta: Dict):
+        meta["last_access"] = time.time()
+        self._write_meta(key, meta)
+
+    def _open(self, key: str, rows: int) -> Dict[str, np.ndarray]:
+        return {
+            name: np.memmap(os.path.join(self._dir(key), f"{name}.bin"), dtype=dtype, mode="r", shape=(rows,))
+            for name, dtype in _COLUMNS.items()
+        }
+
+    def _write(self, key: str, open_time: np.ndarray, close: np.ndarray, predicted: np.ndarray, offset: int):
+        """Write rows [offset, offset + len(predicted)) and drop the rows after; offset 0 replaces the entry."""
+        directory = self._dir(key)
+        if offset == 0 and os.path.isdir(directory):
+            shutil.rmtree(directory)
+        os.makedirs(directory, exist_ok=True)
+        end = offset + len(predicted)
+        data = {"open_time": open_time, "close": close, "predicted": predicted}
+        for name, dtype in _COLUMNS.items():
+            path = os.path.join(directory, f"{name}.bin")
+            with open(path, "r+b" if offset else "wb") as f:
+                f.seek(offset * np.dtype(dtype).itemsize)
+                f.write(np.ascontiguousarray(data[name], dtype=dtype).tobytes())
+                f.truncate()
+        # Derived signals are stale once the predictions change
+        for name in os.listdir(directory):
+            if name.startswith("signals_"):
+                os.remove(os.path.join(directory, name))
+        self._write_meta(key, {"rows": end, "last_access": time.time()})
+
+    def _evict(self):
+        if not os.path.isdir(self.root):
+            return
+        entries = []
+        total = 0
+        for key in os.listdir(self.root):
+            if not os.path.isdir(self._dir(key)):
+                continue
+            with self._lock(key, blocking=False) as locked:
+                if not locked:
+                    continue # Being written by another process
+                size = self._size(key)
+                meta = self._read_meta(key) or {}
+            entries.append((meta.get("last_access", 0.0), size, key))
+            total += size
+        for _, size, key in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            with self._lock(key, blocking=False) as locked:
+                if locked:
+                    shutil.rmtree(self._dir(key), ignore_errors=True)
+                    total -= size
+
+    def _size(self, key: str) -> int:
+        directory = self._dir(key)
+        if not os.path.isdir(directory):
+            return 0
+        return sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory))
+
+prediction_cache = PredictionCache(settings.PREDICTION_CACHE_DIR, settings.PREDICTION_CACHE_MAX_BYTES)
@@ -0,0 +1,140 @@
+import os
+import threading
+import warnings
+from typing import Optional, Set, Tuple
+import numpy as np
+import torch
+import torch.nn as nn
+from app.ml.networks import LSTMNetwork
+
+# Exported graphs live next to their bundle: models/lstm_v1.pth -> models/lstm_v1.ts
+# (float32) and models/lstm_v1.int8.ts (dynamically quantized)
+EXPORT_SUFFIX = ".ts"
+QUANTIZED_SUFFIX = ".int8.ts"
+# Batch shapes run once when a runtime is warmed: one live tick, one backtest mini-batch
+WARMUP_BATCHES = (1, 256)
+# The TorchScript profiling executor specialises the graph over the first calls
+WARMUP_ITERATIONS = 3
+
+def export_path(artifact_path: str, quantized: bool = False) -> str:
+    return os.path.splitext(artifact_path)[0] + (QUANTIZED_SUFFIX if quantized else EXPORT_SUFFIX)
+
+class _ExportedLSTM(nn.Module):
+    """LSTMNetwork.forward without the explicit zero state (nn.LSTM defaults to it), scriptable."""
+    def __init__(self, model: LSTMNetwork):
+        super().__init__()
+        self.lstm = model.lstm
+        self.fc = model.fc
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        out, _ = self.lstm(x)
+        return self.fc(out[:, -1, :])
+
+def quantize_dynamic(model: LSTMNetwork) -> nn.Module:
+    """
+    int8 copy of `model` for CPU serving: LSTM and Linear weights quantized ahead of
+    time, activations quantized on the fly per batch. Deterministic given the weights.
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore") # torch.ao.quantization deprecation notices
+        return torch.ao.quantization.quantize_dynamic(
+            _ExportedLSTM(model).eval(), {nn.LSTM, nn.Linear}, dtype=torch.qint8
+        )
+
+def export_torchscript(model: LSTMNetwork, path: str, seq_length: int, fingerprint: str,
+                       quantized: bool = False) -> str:
+    """
+    Script and freeze `model` (or its int8 quantized copy) for CPU inference and save
+    it to `path`. The artifact fingerprint is stored with the graph so a runtime never
+    pairs an export with retrained weights. A float export is checked against eager
+    output first; a quantized one only for finite output (its error is what
+    scripts/compare_quantized.py measures).
+    """
+    model.eval()
+    module = quantize_dynamic(model) if quantized else _ExportedLSTM(model).eval()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", FutureWarning) # torch.jit deprecation notices
+        graph = torch.jit.freeze(torch.jit.script(module))
+    sample = torch.rand(4, seq_length, model.lstm.input_size)
+    with torch.no_grad():
+        out, expected = graph(sample), model(sample)
+    if out.shape != expected.shape or not torch.isfinite(out).all():
+        raise ValueError("exported graph produces invalid output")
+    if not quantized and not torch.allclose(out, expected, atol=1e-6):
+        raise ValueError("exported graph does not match the eager model")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    extra = {"fingerprint": fingerprint, "variant": "int8" if quantized else "float32"}
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", FutureWarning)
+        torch.jit.save(graph, path + ".tmp", _extra_files=extra)
+    os.replace(path + ".tmp", path)
+    return path
+
+def export_artifact(artifact, quantized: bool = False) -> str:
+    """Export a loaded ModelArtifact next to its bundle file."""
+    return export_torchscript(artifact.model, export_path(artifact.path, quantized),
+                              artifact.seq_length or 60, artifact.fingerprint, quantized)
+
+class InferenceRuntime:
+    """
+    CPU forward pass for a model artifact: (batch, seq_length, features) float32 -> (batch, outputs).
+
+    Uses the exported TorchScript graph when one exists for the same fingerprint,
+    otherwise the eager model. With `quantized` the int8 variant is served: the
+    .int8.ts export, or the model quantized in memory when there is none. `threads`
+    pins torch's intra-op thread count (it is a process-wide setting; 0 leaves it
+    alone). warmup() runs dummy batches so the first live tick does not pay for graph
+    optimisation and allocator growth.
+    """
+    def __init__(self, model: LSTMNetwork, export_file: Optional[str] = None,
+                 fingerprint: Optional[str] = None, threads: int = 0, quantized: bool = False):
+        self.model = model
+        self.quantized = quantized
+        self.input_dim = model.lstm.input_size
+        self.backend = "eager-int8" if quantized else "eager"
+        self._forward = model
+        self._warmed: Set[Tuple[int, int]] = set()
+        self._lock = threading.Lock()
+        if threads:
+            torch.set_num_threads(threads)
+        loaded = export_file and os.path.exists(export_file) and self._load_export(export_file, fingerprint)
+        if quantized and not loaded:
+            self._forward = quantize_dynamic(model) # Only without a usable .int8.ts export
+
+    def _load_export(self, export_file: str, fingerprint: Optional[str]) -> bool:
+        """Serve the exported graph if it matches the weights and variant; returns whether it does."""
+        try:
+            extra = {"fingerprint": "", "variant": ""}
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", FutureWarning)
+                graph = torch.jit.load(export_file, map_location="cpu", _extra_files=extra)
+            exported_for, variant = (v.decode() if isinstance(v, bytes) else v
+                                     for v in (extra["fingerprint"], extra["variant"]))
+            if fingerprint is not None and exported_for != fingerprint:
+                print(f"[Runtime] {export_file} was exported from different weights, using {self.backend} model")
+                return False
+            if (variant == "int8") != self.quantized:
+                print(f"[Runtime] {export_file} is a {variant or 'float32'} export, using {self.backend} model")
+                return False
+            self._forward = graph
+            self.backend = "torchscript-int8" if self.quantized else "torchscript"
+            return True
+        except Exception as e:
+            print(f"[Runtime] Could not load {export_file}: {e}, using {self.backend} model")
+            return False
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        x = torch.from_numpy(np.ascontiguousarray(batch, dtype=np.float32))
+        with torch.inference_mode():
+            return self._forward(x).numpy()
+
+    def warmup(self, seq_length: int, batch_sizes: Tuple[int, ...] = WARMUP_BATCHES):
+        """Run dummy batches of each size once per (batch, seq_length) shape."""
+        with self._lock:
+            for batch in batch_sizes:
+                if (batch, seq_length) in self._warmed:
+                    continue
+                dummy = np.zeros((batch, seq_length, self.input_dim), dtype=np.float32)
+                for _ in range(WARMUP_ITERATIONS):
+                    self.predict(dummy)
+                self._warmed.add((batch, seq_length))
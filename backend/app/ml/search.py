@@ -0,0 +1,277 @@
+import hashlib
+import json
+import math
+import os
+import multiprocessing as mp
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+DEFAULT_STUDY_DIR = os.path.join(os.path.dirname(__file__), "../../data/studies/lstm")
+
+# Sampled per trial: a list is a categorical choice, ("log", low, high) is log-uniform
+DEFAULT_SEARCH_SPACE: Dict[str, Any] = {
+    "seq_length": [30, 60, 90, 120],
+    "hidden_dim": [32, 64, 128],
+    "num_layers": [1, 2, 3],
+    "learning_rate": ("log", 1e-4, 1e-2),
+    "batch_size": [32, 64, 128, 256],
+}
+
+def sample_config(space: Dict[str, Any], seed: int, trial: int) -> Dict[str, Any]:
+    """Configuration of one trial; deterministic in (seed, trial) so a resumed study samples the same ones."""
+    rng = np.random.default_rng([seed, trial])
+    config = {}
+    for name, spec in space.items():
+        if isinstance(spec, tuple) and spec[0] == "log":
+            config[name] = float(math.exp(rng.uniform(math.log(spec[1]), math.log(spec[2]))))
+        else:
+            value = spec[rng.integers(len(spec))]
+            config[name] = value.item() if isinstance(value, np.generic) else value
+    return config
+
+class ASHAScheduler:
+    """
+    Asynchronous successive halving. Rung k trains a trial for min_epochs * eta^k epochs
+    (capped at max_epochs). Whenever a worker frees up, the best 1/eta of any rung that
+    have not been promoted yet move up one rung; otherwise a new trial starts at rung 0.
+    Trials outside the top fraction are never trained further (pruned).
+    """
+    def __init__(self, min_epochs: int = 1, max_epochs: int = 27, eta: int = 3):
+        self.eta = eta
+        self.budgets: List[int] = []
+        budget = min_epochs
+        while budget < max_epochs:
+            self.budgets.append(budget)
+            budget *= eta
+        self.budgets.append(max_epochs)
+        self.results: List[Dict[int, float]] = [{} for _ in self.budgets] # rung -> {trial: val_loss}
+        self.promoted: List[set] = [set() for _ in self.budgets]
+
+    @property
+    def top_rung(self) -> int:
+        return len(self.budgets) - 1
+
+    def report(self, trial: int, rung: int, loss: float):
+        self.results[rung][trial] = loss
+        if rung > 0:
+            self.promoted[rung - 1].add(trial)
+
+    def promotable(self, running: set) -> Optional[Tuple[int, int]]:
+        """(trial, next rung) of the best unpromoted top-1/eta trial in the highest possible rung."""
+        for rung in range(self.top_rung - 1, -1, -1):
+            ranked = sorted(self.results[rung].items(), key=lambda item: item[1])
+            for trial, loss in ranked[:len(ranked) // self.eta]:
+                if trial not in self.promoted[rung] and trial not in running and math.isfinite(loss):
+                    return trial, rung + 1
+        return None
+
+class StudyStore:
+    """
+    Append-only JSON-lines log of finished (trial, rung) evaluations plus a header
+    describing the search; reopening the directory replays the log to resume.
+    """
+    def __init__(self, study_dir: str, header: Dict[str, Any]):
+        self.study_dir = study_dir
+        self.path = os.path.join(study_dir, "trials.jsonl")
+        os.makedirs(study_dir, exist_ok=True)
+        header_path = os.path.join(study_dir, "study.json")
+        if os.path.exists(header_path):
+            with open(header_path) as f:
+                stored = json.load(f)
+            if stored != json.loads(json.dumps(header)):
+                raise ValueError(f"{study_dir} holds a different study (data, search space or budgets changed)")
+        else:
+            with open(header_path, "w") as f:
+                json.dump(header, f, indent=2)
+
+    def load(self) -> List[Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return []
+        records = []
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    pass # Torn last line of an interrupted run
+        return records
+
+    def append(self, record: Dict[str, Any]):
+        with open(self.path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def checkpoint_path(self, trial: int) -> str:
+        return os.path.join(self.study_dir, f"trial_{trial:04d}.ckpt")
+
+    def artifact_path(self, trial: int) -> str:
+        return os.path.join(self.study_dir, f"trial_{trial:04d}.pt")
+
+# --- Worker side ---
+
+_features: Optional[np.ndarray] = None
+_scaler = None
+_shm: Optional[SharedMemory] = None
+
+def _init_worker(torch_threads: int, shm_name: str, shape: Tuple[int, int], scaler):
+    global _features, _scaler, _shm
+    import torch
+    # Split the cores between concurrent trials
+    torch.set_num_threads(torch_threads)
+    torch.set_num_interop_threads(1)
+    # Every trial reads the same feature rows from shared memory (no per-trial copy)
+    _shm = SharedMemory(name=shm_name)
+    _features = np.ndarray(shape, dtype=np.float32, buffer=_shm.buf)
+    _scaler = scaler
+
+def _run_trial(job) -> Dict[str, Any]:
+    from app.ml.artifacts import save_artifact
+    from app.ml.training import train_lstm
+
+    trial, rung, config, epochs, train_params, checkpoint_path, artifact_path = job
+    record = {"trial": trial, "rung": rung, "epochs": epochs, "config": config}
+    # Continues from the trial's previous rung via its checkpoint
+    try:
+        model, _, metrics = train_lstm(
+            None, epochs=epochs, checkpoint_path=checkpoint_path, keep_checkpoint=artifact_path is None,
+            prepared=(_features, _scaler), log=lambda msg: None, **config, **train_params
+        )
+    except ValueError as e: # e.g. seq_length too long for the data: never promoted
+        return {**record, "val_loss": float("inf"), "train_loss": float("inf"), "samples_per_sec": 0.0, "error": str(e)}
+    if artifact_path:
+        save_artifact(artifact_path, model, _scaler, config["seq_length"], metrics, version=f"trial{trial}")
+    return {
+        **record, "val_loss": metrics["val_loss"], "train_loss": metrics["train_loss"],
+        "samples_per_sec": metrics["samples_per_sec"],
+    }
+
+# --- Driver ---
+
+def _data_hash(features: np.ndarray) -> str:
+    return hashlib.sha256(features.tobytes()).hexdigest()[:24]
+
+def run_search(
+    df: pd.DataFrame,
+    n_trials: int = 32,
+    space: Optional[Dict[str, Any]] = None,
+    min_epochs: int = 1,
+    max_epochs: int = 27,
+    eta: int = 3,
+    workers: Optional[int] = None,
+    torch_threads: Optional[int] = None,
+    study_dir: str = DEFAULT_STUDY_DIR,
+    seed: int = 0,
+    train_split: float = 0.8,
+    log: Callable[[str], None] = print,
+) -> pd.DataFrame:
+    """
+    Hyperparameter search for LSTMNetwork (train_lstm settings) with ASHA pruning.
+
+    Trials are sampled from `space` and trained concurrently in a process pool, each
+    worker limited to `torch_threads` intra-op threads (default: cores / workers).
+    Features are computed once and shared with the workers through shared memory.
+    Every finished rung is appended to the study store in `study_dir`; running again
+    with the same data and settings resumes (finished rungs are not retrained,
+    interrupted ones continue from their last epoch checkpoint).
+
+    Returns:
+        One row per trial at its highest rung, best validation loss first. Trials that
+        reached max_epochs have a model bundle in `artifact`.
+    """
+    from app.ml.training import prepare_features
+
+    space = space or DEFAULT_SEARCH_SPACE
+    features, scaler = prepare_features(df)
+    scheduler = ASHAScheduler(min_epochs, max_epochs, eta)
+    store = StudyStore(study_dir, {
+        "data": _data_hash(features), "space": {k: list(v) for k, v in space.items()},
+        "budgets": scheduler.budgets, "eta": eta, "seed": seed, "train_split": train_split,
+    })
+
+    # Replay finished evaluations
+    started = 0
+    for record in store.load():
+        scheduler.report(record["trial"], record["rung"], record["val_loss"])
+        started = max(started, record["trial"] + 1)
+    if started:
+        log(f"Resuming study in {study_dir}: {started} trials, "
+            f"{sum(len(r) for r in scheduler.results)} rung evaluations")
+
+    cpus = os.cpu_count() or 1
+    workers = max(1, min(workers or cpus, n_trials))
+    torch_threads = torch_threads or max(1, cpus // workers)
+    train_params = {"seed": seed, "train_split": train_split}
+
+    def make_job(trial: int, rung: int):
+        config = sample_config(space, seed, trial)
+        final = rung == scheduler.top_rung
+        return (trial, rung, config, scheduler.budgets[rung], train_params, store.checkpoint_path(trial),
+                store.artifact_path(trial) if final else None)
+
+    def next_job(running: set):
+        nonlocal started
+        promotion = scheduler.promotable(running)
+        if promotion:
+            return make_job(*promotion)
+        # Trials started before an interruption but without a finished rung 0
+        for trial in range(started):
+            if trial not in running and not any(trial in r for r in scheduler.results):
+                return make_job(trial, 0)
+        if started < n_trials:
+            started += 1
+            return make_job(started - 1, 0)
+        return None
+
+    shm = SharedMemory(create=True, size=max(1, features.nbytes))
+    try:
+        np.ndarray(features.shape, dtype=np.float32, buffer=shm.buf)[:] = features
+        log(f"Search: {n_trials} trials, rungs {scheduler.budgets} epochs, "
+            f"{workers} workers x {torch_threads} torch threads")
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=mp.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(torch_threads, shm.name, features.shape, scaler),
+        ) as pool:
+            pending = {}
+            while True:
+                while len(pending) < workers:
+                    job = next_job({trial for trial, _ in pending.values()})
+                    if job is None:
+                        break
+                    pending[pool.submit(_run_trial, job)] = (job[0], job[1])
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    trial, rung = pending.pop(future)
+                    record = future.result()
+                    scheduler.report(trial, rung, record["val_loss"])
+                    store.append(record)
+                    log(f"[trial {trial}] rung {rung} ({record['epochs']} epochs): "
+                        f"val_loss {record['val_loss']:.6f} {record['config']}")
+    finally:
+        shm.close()
+        shm.unlink()
+
+    # Highest rung reached per trial
+    best: Dict[int, Dict[str, Any]] = {}
+    for record in store.load():
+        if record["trial"] not in best or record["rung"] >= best[record["trial"]]["rung"]:
+            best[record["trial"]] = record
+    rows = []
+    for trial, record in best.items():
+        artifact = store.artifact_path(trial)
+        rows.append({
+            "trial": trial, "rung": record["rung"], "epochs": record["epochs"], **record["config"],
+            "val_loss": record["val_loss"], "train_loss": record["train_loss"],
+            "artifact": artifact if os.path.exists(artifact) else None,
+        })
+    table = pd.DataFrame(rows)
+    if len(table):
+        table = table.sort_values(["rung", "val_loss"], ascending=[False, True]).reset_index(drop=True)
+    return table
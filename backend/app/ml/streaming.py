@@ -0,0 +1,75 @@
+from typing import List, Optional, Tuple
+import numpy as np
+import torch
+from app.ml.networks import LSTMNetwork
+
+class StreamingLSTM:
+    """
+    Stateful one-step-per-candle inference for an LSTMNetwork.
+
+    The windowed path (LSTMNetwork.forward) runs all seq_length steps from a zero
+    state on every candle. Here the (h, c) state after the last candle is kept and
+    advanced by a single LSTM step per new feature row, so per-candle work drops by
+    about seq_length. The step is a NumPy LSTM cell on the model's weights: a
+    one-step nn.LSTM call costs about half a full 60-step window in fixed overhead.
+
+    The two paths are not identical: the windowed path refits the scaler on every
+    buffer and forgets everything before the window. Every `resync_every` candles
+    (and whenever a row cannot be scaled) the caller runs sync() on a full window,
+    which resets the state and scaler to exactly what the windowed path computes,
+    bounding the drift. resync_every=1 is the windowed path.
+    """
+    def __init__(self, model: LSTMNetwork, resync_every: int = 15):
+        self.model = model
+        self.resync_every = resync_every
+        self.hidden_dim = model.hidden_dim
+        # Per layer (W_ih, W_hh, b_ih + b_hh), gate order i, f, g, o as in nn.LSTM
+        self._layers: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        for layer in range(model.num_layers):
+            weights = [getattr(model.lstm, f"{name}_l{layer}").detach().cpu().numpy().astype(np.float32)
+                       for name in ("weight_ih", "weight_hh", "bias_ih", "bias_hh")]
+            self._layers.append((weights[0], weights[1], weights[2] + weights[3]))
+        self._fc_weight = model.fc.weight.detach().cpu().numpy().astype(np.float32)
+        self._fc_bias = model.fc.bias.detach().cpu().numpy().astype(np.float32)
+
+        self.h: Optional[np.ndarray] = None # (num_layers, hidden_dim)
+        self.c: Optional[np.ndarray] = None
+        self.scale: Optional[np.ndarray] = None
+        self.min_: Optional[np.ndarray] = None
+        self.steps_since_sync = 0
+
+    @property
+    def needs_sync(self) -> bool:
+        return self.h is None or self.steps_since_sync + 1 >= self.resync_every
+
+    def reset(self):
+        self.h = self.c = None
+        self.steps_since_sync = 0
+
+    @torch.no_grad()
+    def sync(self, input_scaled: np.ndarray, scale: np.ndarray, min_: np.ndarray) -> float:
+        """Full-window forward (same result as model(input)); keeps the final state and the scaler."""
+        x = torch.from_numpy(np.ascontiguousarray(input_scaled, dtype=np.float32)).unsqueeze(0)
+        out, (h, c) = self.model.lstm(x) # Zero initial state, as in LSTMNetwork.forward
+        self.h = h[:, 0, :].numpy().copy()
+        self.c = c[:, 0, :].numpy().copy()
+        self.scale, self.min_ = np.array(scale), np.array(min_) # Callers may reuse their arrays
+        self.steps_since_sync = 0
+        return self.model.fc(out[:, -1, :]).item()
+
+    def step(self, features: np.ndarray) -> float:
+        """Advance one candle with its unscaled feature row (scaled with the scaler from the last sync)."""
+        x = (features * self.scale + self.min_).astype(np.float32)
+        H = self.hidden_dim
+        for layer, (w_ih, w_hh, b) in enumerate(self._layers):
+            gates = w_ih @ x + w_hh @ self.h[layer] + b
+            sig = 1.0 / (1.0 + np.exp(-gates))
+            c = sig[H:2 * H] * self.c[layer] + sig[:H] * np.tanh(gates[2 * H:3 * H])
+            self.c[layer] = c
+            self.h[layer] = x = sig[3 * H:] * np.tanh(c)
+        self.steps_since_sync += 1
+        return float((self._fc_weight @ x + self._fc_bias)[0])
+
+    def invert(self, prediction: float) -> float:
+        """Scaled close -> price, with the current scaler."""
+        return (prediction - self.min_[0]) / self.scale[0]
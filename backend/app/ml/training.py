@@ -0,0 +1,245 @@
+import hashlib
+import os
+import time
+from typing import Callable, Dict, Optional, Tuple
+import numpy as np
+import pandas as pd
+import torch
+import torch.nn as nn
+from sklearn.preprocessing import MinMaxScaler
+from torch.utils.data import DataLoader, Subset
+from app.ml.datasets import SequenceDataset
+from app.ml.features import FeatureEngineer, FEATURE_COLUMNS
+from app.ml.networks import LSTMNetwork
+
+# Bump when the checkpoint layout changes; older checkpoints are ignored
+CHECKPOINT_FORMAT = 1
+
+def _worker_init(worker_id: int):
+    # Loader workers only slice and stack; keep them off the training threads' cores
+    torch.set_num_threads(1)
+
+def configure_threads(threads: Optional[int] = None, interop_threads: Optional[int] = None):
+    """
+    Torch intra-op (per-op parallelism) and inter-op thread counts; None keeps the default.
+    The inter-op count can only be set before torch starts its pool, later calls are ignored.
+    """
+    if threads:
+        torch.set_num_threads(threads)
+    if interop_threads:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError:
+            pass
+
+def _evaluate(model: nn.Module, dataset, criterion, bf16: bool) -> float:
+    model.eval()
+    total_loss = 0.0
+    with torch.no_grad(), torch.autocast("cpu", dtype=torch.bfloat16, enabled=bf16):
+        for batch_X, batch_y in DataLoader(dataset, batch_size=1024):
+            total_loss += criterion(model(batch_X).float(), batch_y).item() * len(batch_X)
+    model.train()
+    return total_loss / len(dataset)
+
+def _run_key(data: np.ndarray, **params) -> str:
+    """Identifies a training run (data + settings) so a checkpoint is only resumed by the same run."""
+    h = hashlib.sha256(np.ascontiguousarray(data).tobytes())
+    h.update(repr(sorted(params.items())).encode())
+    return h.hexdigest()
+
+def minmax_scaler(scale: np.ndarray, min_: np.ndarray) -> MinMaxScaler:
+    """A fitted MinMaxScaler from stored (scale, min_) arrays, e.g. a model artifact's."""
+    scaler = MinMaxScaler()
+    scaler.scale_, scaler.min_ = np.asarray(scale, dtype=np.float64), np.asarray(min_, dtype=np.float64)
+    scaler.data_range_ = 1.0 / scaler.scale_
+    scaler.data_min_ = -scaler.min_ * scaler.data_range_
+    scaler.data_max_ = scaler.data_min_ + scaler.data_range_
+    scaler.n_features_in_ = len(scaler.scale_)
+    scaler.n_samples_seen_ = 0
+    return scaler
+
+def prepare_features(df: pd.DataFrame, scaler: Optional[MinMaxScaler] = None) -> Tuple[np.ndarray, MinMaxScaler]:
+    """
+    Training inputs for an OHLCV frame: indicator rows scaled (float32) and the scaler.
+    A given fitted `scaler` is applied as is (fine-tuning keeps the model's input scale);
+    otherwise one is fitted on the frame.
+    """
+    df = FeatureEngineer.add_technical_indicators(df)
+    data = np.array(df[FEATURE_COLUMNS], dtype=np.float64) # Own copy, scaled in place
+    if scaler is None:
+        scaler = MinMaxScaler().fit(data)
+    np.multiply(data, scaler.scale_, out=data)
+    np.add(data, scaler.min_, out=data)
+    return data.astype(np.float32), scaler
+
+def _split(dataset: SequenceDataset, train_split: float) -> Tuple[Subset, Subset]:
+    """Chronological train / validation split of the sequence windows."""
+    train_size = int(len(dataset) * train_split)
+    return Subset(dataset, range(train_size)), Subset(dataset, range(train_size, len(dataset)))
+
+def train_lstm(
+    df: Optional[pd.DataFrame],
+    seq_length: int = 60,
+    hidden_dim: int = 64,
+    num_layers: int = 2,
+    epochs: int = 10,
+    batch_size: int = 32,
+    learning_rate: float = 0.001,
+    train_split: float = 0.8,
+    stride: int = 1,
+    horizon: int = 1,
+    seed: Optional[int] = None,
+    log: Callable[[str], None] = print,
+    num_workers: int = 0,
+    threads: Optional[int] = None,
+    interop_threads: Optional[int] = None,
+    bf16: bool = False,
+    accumulation_steps: int = 1,
+    patience: Optional[int] = None,
+    checkpoint_path: Optional[str] = None,
+    keep_checkpoint: bool = False,
+    initial_state: Optional[Dict[str, torch.Tensor]] = None,
+    prepared: Optional[Tuple[np.ndarray, MinMaxScaler]] = None,
+) -> Tuple[LSTMNetwork, MinMaxScaler, Dict[str, float]]:
+    """
+    Trains an LSTMNetwork to predict the next scaled close from OHLCV data.
+
+    Args:
+        df: frame with 'close', 'open', 'high', 'low', 'volume' columns.
+        train_split: chronological fraction used for training, the rest for validation.
+        stride: bars between consecutive training windows.
+        horizon: future closes predicted per window (network output size).
+        num_workers: DataLoader worker processes; they read the shared-memory feature tensor.
+        threads / interop_threads: torch intra-op / inter-op threads (see configure_threads).
+        bf16: bfloat16 autocast for forward passes (weights and optimizer stay float32).
+        accumulation_steps: mini-batches per optimizer step (effective batch = batch_size * steps).
+        patience: stop after this many epochs without a better validation loss and
+            return the best weights; None trains all epochs and keeps the last ones.
+        checkpoint_path: saved after every epoch and resumed from if it belongs to the
+            same data and settings; removed once training completes unless keep_checkpoint
+            (then a later call with more epochs continues the run).
+        prepared: output of prepare_features, to reuse features across runs (df is then unused).
+        initial_state: state_dict to start from instead of random weights (fine-tuning).
+
+    Returns:
+        (model in eval mode, fitted scaler,
+         {"train_loss", "val_loss", "samples", "epochs", "samples_per_sec"})
+    """
+    if seed is not None:
+        torch.manual_seed(seed)
+    configure_threads(threads, interop_threads)
+
+    # 1. Feature Engineering + scaling
+    data_scaled, scaler = prepared if prepared is not None else prepare_features(df)
+    run_key = _run_key(
+        data_scaled, seq_length=seq_length, hidden_dim=hidden_dim, num_layers=num_layers,
+        batch_size=batch_size, learning_rate=learning_rate, train_split=train_split,
+        stride=stride, horizon=horizon, seed=seed, accumulation_steps=accumulation_steps,
+    )
+
+    # Sequences are served as views of one float32 array (target: next 'close', scaled)
+    dataset = SequenceDataset(data_scaled, seq_length, horizon=horizon, stride=stride)
+    if len(dataset) == 0:
+        raise ValueError(f"Not enough rows ({len(data_scaled)}) to build sequences of length {seq_length}")
+    del data_scaled
+    if num_workers:
+        dataset.share_memory() # Workers get a handle to the same pages instead of a pickled copy
+
+    # Split Train/Test (chronological)
+    train_set, test_set = _split(dataset, train_split)
+
+    # DataLoader
+    generator = torch.Generator()
+    generator.manual_seed(seed if seed is not None else torch.initial_seed())
+    loader = DataLoader(
+        train_set, batch_size=batch_size, shuffle=True, generator=generator,
+        num_workers=num_workers, persistent_workers=num_workers > 0,
+        worker_init_fn=_worker_init if num_workers else None,
+    )
+
+    # 2. Model Initialization
+    model = LSTMNetwork(len(FEATURE_COLUMNS), hidden_dim, horizon, num_layers)
+    if initial_state is not None:
+        model.load_state_dict(initial_state)
+    criterion = nn.MSELoss()
+    optimizer = torch.optim.Adam(model.parameters(), lr=learning_rate)
+
+    start_epoch = 0
+    best_loss, best_state, stale_epochs = float("inf"), None, 0
+    train_loss = val_loss = samples_per_sec = float("nan")
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        checkpoint = torch.load(checkpoint_path, map_location="cpu", weights_only=True)
+        if checkpoint.get("format") == CHECKPOINT_FORMAT and checkpoint.get("run_key") == run_key:
+            model.load_state_dict(checkpoint["model"])
+            optimizer.load_state_dict(checkpoint["optimizer"])
+            generator.set_state(checkpoint["generator"])
+            torch.set_rng_state(checkpoint["rng"]) # Dropout masks
+            start_epoch = checkpoint["epoch"]
+            best_loss, best_state = checkpoint["best_loss"], checkpoint["best_state"]
+            stale_epochs = checkpoint["stale_epochs"]
+            train_loss, val_loss = checkpoint["train_loss"], checkpoint["val_loss"]
+            log(f"Resuming from {checkpoint_path} after epoch {start_epoch}")
+        else:
+            log(f"Ignoring {checkpoint_path}: written by a different run")
+
+    # 3. Training Loop
+    model.train()
+    epochs_run = start_epoch
+    for epoch in range(start_epoch, epochs):
+        if patience is not None and stale_epochs >= patience:
+            break
+        total_loss = 0.0
+        started = time.perf_counter()
+        optimizer.zero_grad()
+        for step, (batch_X, batch_y) in enumerate(loader, 1):
+            with torch.autocast("cpu", dtype=torch.bfloat16, enabled=bf16):
+                outputs = model(batch_X)
+            loss = criterion(outputs.float(), batch_y)
+            (loss / accumulation_steps).backward()
+            if step % accumulation_steps == 0 or step == len(loader):
+                optimizer.step()
+                optimizer.zero_grad()
+            total_loss += loss.item()
+        samples_per_sec = len(train_set) / (time.perf_counter() - started)
+
+        train_loss = total_loss / max(1, len(loader))
+        message = f"Epoch {epoch+1}/{epochs}, Loss: {train_loss:.6f}"
+        if len(test_set):
+            val_loss = _evaluate(model, test_set, criterion, bf16)
+            message += f", Val Loss: {val_loss:.6f}"
+            if val_loss < best_loss:
+                best_loss, stale_epochs = val_loss, 0
+                if patience is not None:
+                    best_state = {k: v.clone() for k, v in model.state_dict().items()}
+            else:
+                stale_epochs += 1
+        log(f"{message}, {samples_per_sec:.0f} samples/s")
+        epochs_run = epoch + 1
+
+        if checkpoint_path:
+            os.makedirs(os.path.dirname(os.path.abspath(checkpoint_path)), exist_ok=True)
+            torch.save({
+                "format": CHECKPOINT_FORMAT, "run_key": run_key, "epoch": epoch + 1,
+                "model": model.state_dict(), "optimizer": optimizer.state_dict(),
+                "generator": generator.get_state(), "rng": torch.get_rng_state(), "best_loss": best_loss, "best_state": best_state,
+                "stale_epochs": stale_epochs, "train_loss": train_loss, "val_loss": val_loss,
+            }, checkpoint_path + ".tmp")
+            os.replace(checkpoint_path + ".tmp", checkpoint_path)
+
+    if epochs_run < epochs:
+        log(f"Early stopping: no validation improvement for {patience} epochs")
+    if best_state is not None:
+        model.load_state_dict(best_state)
+        val_loss = best_loss
+
+    # 4. Evaluate
+    model.eval()
+    if len(test_set):
+        log(f"Test Loss: {val_loss:.6f}")
+    if checkpoint_path and not keep_checkpoint and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    return model, scaler, {
+        "train_loss": train_loss, "val_loss": val_loss, "samples": len(dataset),
+        "epochs": epochs_run, "samples_per_sec": samples_per_sec,
+    }
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import TypedDict, Literal
+from typing import Any, Dict, List, Literal, Optional, TypedDict, Union
 
 class KlineData(BaseModel):
     """
@@ -17,6 +17,67 @@ class KlineData(BaseModel):
     close_time: datetime
     is_closed: bool
 
+class Kline:
+    """
+    Compact kline record for the live ingestion, risk and strategy hot paths.
+    Same attributes as KlineData, but times are stored as epoch-ms ints and the
+    open_time / close_time datetimes are only built when read. Use to_model() at
+    API boundaries.
+    """
+    __slots__ = ("symbol", "interval", "open_time_ms", "open_price", "high_price", "low_price",
+                 "close_price", "volume", "close_time_ms", "is_closed")
+
+    def __init__(self, symbol: str, interval: str, open_time_ms: int, open_price: float, high_price: float,
+                 low_price: float, close_price: float, volume: float, close_time_ms: int, is_closed: bool):
+        self.symbol = symbol
+        self.interval = interval
+        self.open_time_ms = open_time_ms
+        self.open_price = open_price
+        self.high_price = high_price
+        self.low_price = low_price
+        self.close_price = close_price
+        self.volume = volume
+        self.close_time_ms = close_time_ms
+        self.is_closed = is_closed
+
+    @classmethod
+    def from_event(cls, event: Dict[str, Any]) -> "Kline":
+        """Decodes a Binance kline event ({"e": "kline", "s": ..., "k": {...}}); prices arrive as strings."""
+        k = event['k']
+        return cls(event['s'], k['i'], k['t'], float(k['o']), float(k['h']), float(k['l']),
+                   float(k['c']), float(k['v']), k['T'], k['x'])
+
+    @property
+    def open_time(self) -> datetime:
+        return datetime.fromtimestamp(self.open_time_ms / 1000)
+
+    @property
+    def close_time(self) -> datetime:
+        return datetime.fromtimestamp(self.close_time_ms / 1000)
+
+    def to_model(self) -> KlineData:
+        return KlineData.model_construct(
+            symbol=self.symbol, interval=self.interval, open_time=self.open_time,
+            open_price=self.open_price, high_price=self.high_price, low_price=self.low_price,
+            close_price=self.close_price, volume=self.volume, close_time=self.close_time,
+            is_closed=self.is_closed
+        )
+
+    def tick_message(self) -> Dict[str, Any]:
+        """TICK websocket message for the frontend"""
+        return {
+            "type": "TICK",
+            "data": {
+                "symbol": self.symbol,
+                "price": self.close_price,
+                "volume": self.volume,
+                "time": self.close_time.isoformat()
+            }
+        }
+
+    def __repr__(self) -> str:
+        return f"Kline({self.symbol} {self.interval} close={self.close_price} closed={self.is_closed})"
+
 class TradeSignal(TypedDict):
     action: Literal["BUY", "SELL", "HOLD"]
     symbol: str
@@ -39,6 +100,9 @@ class BacktestRequest(BaseModel):
     interval: str = "1h"
     start_str: str = "1 month ago UTC"
     strategy_name: str = "LSTMStrategy"
+    sl_percent: float = 2.0
+    tp_percent: float = 4.0
+    initial_capital: float = 10000.0
 
 class BacktestResponse(BaseModel):
     initial_capital: float
@@ -47,6 +111,45 @@ class BacktestResponse(BaseModel):
     pnl_pct: float
     max_drawdown: float
     sharpe: float
+    sortino: float = 0.0
+    calmar: float = 0.0
+    exposure: float = 0.0 # % of bars with an open position
     num_trades: int
+    trades: list = [] # Last 10 trades
     history: list # Sampled history for chart
 
+
+class SweepRequest(BaseModel):
+    symbol: str = "BTCUSDT"
+    interval: str = "1h"
+    start_str: str = "1 month ago UTC"
+    strategy_name: str = "LSTMStrategy"
+    # Grid: {"sl_percent": [1, 2], "tp_percent": [2, 4], "threshold": [1.0005, 1.001]}
+    grid: Dict[str, List[float]] = {}
+    # Random search: {"sl_percent": {"low": 0.5, "high": 5}, ...}, used when n_samples > 0
+    random_spec: Dict[str, Any] = {}
+    n_samples: int = 0
+    seed: Optional[int] = None
+    rank_by: str = "sharpe"
+    workers: Optional[int] = None
+
+class SweepResponse(BaseModel):
+    num_runs: int
+    rank_by: str
+    results: List[Dict[str, Any]] # One row per parameter set, best first
+
+class BacktestJobResponse(BaseModel):
+    """
+    Backtest / sweep job record (GET /backtest/jobs/{job_id}, BACKTEST_JOB messages).
+    """
+    job_id: str
+    kind: Literal["backtest", "sweep"]
+    status: Literal["queued", "running", "completed", "failed", "cancelled"]
+    stage: str
+    progress: float
+    request: Dict[str, Any]
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[Union[BacktestResponse, SweepResponse]] = None # Completed jobs only
@@ -0,0 +1,315 @@
+import asyncio
+import importlib
+import multiprocessing as mp
+import os
+import queue
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from app.backtest.arrays import KlineArrays
+from app.backtest.engine import BacktestCancelled
+from app.core.config import settings
+from app.schemas.market_data import BacktestResponse, SweepResponse
+
+# Strategies a job may name. Imported inside the worker, so the API process
+# never loads torch (or the model) just to run a backtest.
+BACKTEST_STRATEGIES = {
+    "LSTMStrategy": "app.strategy.implementations.lstm_strategy:LSTMStrategy",
+    "DummyStrategy": "app.strategy.implementations.dummy:DummyStrategy",
+}
+
+PROGRESS_INTERVAL = 0.25 # Seconds between progress messages per job
+
+def _fetch_history(symbol: str, interval: str, start_str: str):
+    from app.services.binance_client import binance_adapter
+    return binance_adapter.get_bulk_history(symbol, interval, start_str)
+
+# --- Worker side ---
+
+_progress_queue = None
+_cancel_flags = None
+
+def _init_worker(progress_queue, cancel_flags, threads: int, niceness: int):
+    global _progress_queue, _cancel_flags
+    _progress_queue = progress_queue
+    _cancel_flags = cancel_flags
+    # Lower priority and a single BLAS/torch thread per worker, so backtests
+    # cannot crowd out the event loop serving the live tick pipeline
+    if niceness and hasattr(os, "nice"):
+        os.nice(niceness)
+    import torch
+    torch.set_num_threads(threads)
+    torch.set_num_interop_threads(1)
+
+def _strategy_class(strategy_name: str):
+    module_name, class_name = BACKTEST_STRATEGIES[strategy_name].split(":")
+    return getattr(importlib.import_module(module_name), class_name)
+
+def _progress_callback(job_id: str, slot: int) -> Callable[[str, float], None]:
+    """Throttled progress reporter; raises BacktestCancelled once the job is cancelled."""
+    last = {"stage": None, "time": 0.0}
+    def progress(stage: str, fraction: float):
+        if _cancel_flags[slot]:
+            raise BacktestCancelled()
+        now = time.monotonic()
+        if stage != last["stage"] or now - last["time"] >= PROGRESS_INTERVAL:
+            last["stage"], last["time"] = stage, now
+            _progress_queue.put((job_id, stage, fraction))
+    return progress
+
+def _run_job(job_id: str, slot: int, strategy_name: str, config: Dict, bars: KlineArrays, initial_capital: float):
+    from app.backtest.engine import BacktestEngine
+
+    engine = BacktestEngine(_strategy_class(strategy_name), config, initial_capital=initial_capital)
+    engine.progress = _progress_callback(job_id, slot)
+    try:
+        return asyncio.run(engine.run_arrays(bars))
+    except BacktestCancelled:
+        return None
+
+def _run_sweep(job_id: str, slot: int, strategy_name: str, config: Dict, bars: KlineArrays,
+               space: List[Dict[str, Any]], rank_by: str, workers: int, initial_capital: float):
+    from app.backtest.sweep import sweep_backtest
+
+    try:
+        table = sweep_backtest(
+            _strategy_class(strategy_name), config, bars, space, progress=_progress_callback(job_id, slot),
+            rank_by=rank_by, workers=workers, initial_capital=initial_capital
+        )
+    except BacktestCancelled:
+        return None
+    return {"num_runs": len(table), "rank_by": rank_by, "results": table.to_dict(orient="records")}
+
+# --- API side ---
+
+class BacktestJob:
+    def __init__(self, job_id: str, request: Dict[str, Any], space: Optional[List[Dict[str, Any]]] = None):
+        self.id = job_id
+        self.request = request
+        self.space = space # Parameter sets of a sweep job
+        self.kind = "sweep" if space is not None else "backtest"
+        self.status = "queued" # queued | running | completed | failed | cancelled
+        self.stage = "queued"
+        self.progress = 0.0
+        self.progress_changed = False # Set by the progress pump, cleared once broadcast
+        self.result: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self.created_at = datetime.now()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.cancel_requested = False
+        self.slot: Optional[int] = None
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed", "cancelled")
+
+    def to_dict(self, include_result: bool = False) -> Dict[str, Any]:
+        data = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": round(self.progress, 4),
+            "request": self.request,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+        if include_result:
+            data["result"] = self.result
+        return data
+
+class BacktestJobManager:
+    """
+    Runs backtests and parameter sweeps as background jobs in a process pool.
+
+    At most `max_concurrent` jobs run at once (one worker process each); the rest
+    wait in FIFO order, and submissions beyond `max_pending` are rejected. History is
+    fetched in a thread, the backtest itself in a worker, so the event loop stays free.
+    Workers report progress through a queue, which is relayed to the frontend as
+    BACKTEST_JOB messages; cancellation is a per-slot shared-memory flag the worker
+    checks on every progress callback. A sweep job runs its strategy's batch inference in
+    its worker, which then fans the runs out to at most `sweep_workers` processes.
+    """
+    def __init__(
+        self,
+        max_concurrent: int = settings.BACKTEST_MAX_CONCURRENT_JOBS,
+        max_pending: int = settings.BACKTEST_MAX_PENDING_JOBS,
+        worker_threads: int = settings.BACKTEST_WORKER_THREADS,
+        niceness: int = settings.BACKTEST_WORKER_NICENESS,
+        history: int = settings.BACKTEST_JOB_HISTORY,
+        sweep_workers: int = settings.BACKTEST_SWEEP_WORKERS,
+        fetch_history: Callable[[str, str, str], List] = _fetch_history,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_pending = max_pending
+        self.worker_threads = worker_threads
+        self.niceness = niceness
+        self.history = history
+        self.sweep_workers = sweep_workers
+        self.fetch_history = fetch_history
+
+        self.jobs: "OrderedDict[str, BacktestJob]" = OrderedDict()
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._free_slots = list(range(max_concurrent))
+        self._ctx = mp.get_context("spawn")
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._progress_queue = None
+        self._cancel_flags = None
+        self._pump_task: Optional[asyncio.Task] = None
+
+    def submit(self, request: Dict[str, Any], space: Optional[List[Dict[str, Any]]] = None) -> BacktestJob:
+        """
+        Queue a backtest, or with `space` a parameter sweep over it (see app/backtest/sweep.py).
+        Raises ValueError for unknown strategies or a full queue.
+        """
+        if request.get("strategy_name") not in BACKTEST_STRATEGIES:
+            raise ValueError(f"Strategy {request.get('strategy_name')} not available for backtesting.")
+        pending = sum(1 for job in self.jobs.values() if not job.finished)
+        if pending >= self.max_pending:
+            raise ValueError(f"Too many backtest jobs pending ({pending}), try again later.")
+
+        self._ensure_pool()
+        job = BacktestJob(uuid.uuid4().hex[:12], request, space)
+        self.jobs[job.id] = job
+        job.task = asyncio.create_task(self._run(job))
+        if self._pump_task is None:
+            self._pump_task = asyncio.create_task(self._pump_progress())
+        self._trim_history()
+        return job
+
+    def get(self, job_id: str) -> Optional[BacktestJob]:
+        return self.jobs.get(job_id)
+
+    def list_jobs(self) -> List[BacktestJob]:
+        return list(reversed(self.jobs.values()))
+
+    def cancel(self, job_id: str) -> Optional[BacktestJob]:
+        job = self.jobs.get(job_id)
+        if job is None or job.finished:
+            return job
+        job.cancel_requested = True
+        if job.status == "queued":
+            job.task.cancel()
+        elif job.slot is not None:
+            self._cancel_flags[job.slot] = 1
+        return job
+
+    def shutdown(self):
+        for job in self.jobs.values():
+            if not job.finished:
+                self.cancel(job.id)
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    # --- Internals ---
+
+    def _ensure_pool(self):
+        if self._pool is not None:
+            return
+        self._progress_queue = self._ctx.Queue()
+        self._cancel_flags = self._ctx.Array("b", self.max_concurrent, lock=False)
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.max_concurrent,
+            mp_context=self._ctx,
+            initializer=_init_worker,
+            initargs=(self._progress_queue, self._cancel_flags, self.worker_threads, self.niceness),
+        )
+
+    async def _run(self, job: BacktestJob):
+        req = job.request
+        loop = asyncio.get_running_loop()
+        try:
+            async with self._slots:
+                job.slot = self._free_slots.pop()
+                self._cancel_flags[job.slot] = 0
+                job.status, job.stage, job.started_at = "running", "fetching", datetime.now()
+                await self._broadcast(job)
+                try:
+                    # 1. Fetch Bulk History (blocking HTTP, in a thread)
+                    print(f"[job {job.id}] Fetching bulk history for {req['symbol']} ({req['interval']}) from {req['start_str']}...")
+                    klines = await loop.run_in_executor(
+                        None, self.fetch_history, req["symbol"], req["interval"], req["start_str"]
+                    )
+                    if not klines:
+                        raise ValueError("Failed to fetch historical data")
+                    if job.cancel_requested:
+                        raise BacktestCancelled()
+
+                    # 2. Run in a worker process
+                    config = {
+                        "symbol": req["symbol"],
+                        "interval": req["interval"],
+                        "sl_percent": req.get("sl_percent", 2.0),
+                        "tp_percent": req.get("tp_percent", 4.0)
+                    }
+                    bars = KlineArrays.from_klines(klines)
+                    initial_capital = req.get("initial_capital", 10000.0)
+                    if job.kind == "sweep":
+                        workers = min(req.get("workers") or self.sweep_workers, self.sweep_workers)
+                        job.result = await loop.run_in_executor(
+                            self._pool, _run_sweep, job.id, job.slot, req["strategy_name"], config, bars,
+                            job.space, req.get("rank_by", "sharpe"), workers, initial_capital
+                        )
+                    else:
+                        job.result = await loop.run_in_executor(
+                            self._pool, _run_job, job.id, job.slot, req["strategy_name"], config, bars, initial_capital
+                        )
+                finally:
+                    self._free_slots.append(job.slot)
+                    job.slot = None
+            if job.result is None:
+                raise BacktestCancelled()
+            # The report is what GET /backtest/jobs/{job_id} documents; a mismatch fails the job
+            response = SweepResponse if job.kind == "sweep" else BacktestResponse
+            job.result = response.model_validate(job.result).model_dump()
+            job.status, job.stage, job.progress = "completed", "done", 1.0
+        except (asyncio.CancelledError, BacktestCancelled):
+            job.status, job.stage = "cancelled", "cancelled"
+        except Exception as e:
+            print(f"[job {job.id}] Backtest failed: {e}")
+            job.status, job.stage, job.error = "failed", "failed", str(e)
+        job.finished_at = datetime.now()
+        await self._broadcast(job)
+
+    async def _pump_progress(self):
+        """Relay worker progress to job records and WebSocket clients while jobs are pending."""
+        while True:
+            self._drain_progress()
+            for job in list(self.jobs.values()):
+                if job.status == "running" and job.progress_changed:
+                    job.progress_changed = False
+                    await self._broadcast(job)
+            if all(job.finished for job in self.jobs.values()):
+                self._pump_task = None
+                return
+            await asyncio.sleep(PROGRESS_INTERVAL)
+
+    def _drain_progress(self):
+        while True:
+            try:
+                job_id, stage, fraction = self._progress_queue.get_nowait()
+            except queue.Empty:
+                return
+            job = self.jobs.get(job_id)
+            if job and job.status == "running":
+                job.stage, job.progress = stage, fraction
+                job.progress_changed = True
+
+    async def _broadcast(self, job: BacktestJob):
+        from app.api.websockets import manager
+        await manager.broadcast({"type": "BACKTEST_JOB", "data": job.to_dict()})
+
+    def _trim_history(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self.jobs[job_id]
+
+backtest_jobs = BacktestJobManager()
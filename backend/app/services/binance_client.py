@@ -6,9 +6,17 @@ class BinanceAdapter:
     def __init__(self, api_key: str | None = None, api_secret: str | None = None):
         self.api_key = api_key or settings.BINANCE_API_KEY
         self.api_secret = api_secret or settings.BINANCE_SECRET_KEY
-        self.client = Client(self.api_key, self.api_secret, testnet=settings.BINANCE_TESTNET)
+        self._client = None
         self.async_client = None
 
+    @property
+    def client(self) -> Client:
+        # Created on first use: the constructor pings Binance, which would make
+        # importing the services fail offline (e.g. replaying a tick journal)
+        if self._client is None:
+            self._client = Client(self.api_key, self.api_secret, testnet=settings.BINANCE_TESTNET)
+        return self._client
+
     async def get_async_client(self):
         if not self.async_client:
             self.async_client = await AsyncClient.create(self.api_key, self.api_secret, testnet=settings.BINANCE_TESTNET)
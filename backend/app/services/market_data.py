@@ -1,15 +1,25 @@
 import asyncio
 import logging
-from typing import Callable, List
+import os
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from binance import AsyncClient, BinanceSocketManager
 from app.core.config import settings
 from app.services.binance_client import binance_adapter
+from app.services.market_writer import market_data_writer
+from app.services.pipeline import BLOCK, COALESCE, DROP_OLDEST, Stage, percentiles
+from app.services.stream_mux import StreamMultiplexer, kline_stream, parse_streams
 
 logger = logging.getLogger(__name__)
 
 class MarketDataService:
     def __init__(self):
         self.active_streams = []
+        self.pipelines: Dict[str, Dict[str, Stage]] = {} # Stream -> ingestion stages
+        self.mux: Optional[StreamMultiplexer] = None
+        self.journal = None # TickJournal while recording (TICK_JOURNAL_DIR)
+        self.signal_latency: deque = deque(maxlen=4096) # Receipt of a closed candle -> its strategies decided
         self._running = False
         self._ingestion_task = None
         self.start_time = None
@@ -19,6 +29,7 @@ class MarketDataService:
             return
         logger.info("Starting Market Data Service...")
         self._running = True
+        market_data_writer.start()
         self._ingestion_task = asyncio.create_task(self.ingest_realtime_data())
         from datetime import datetime
         self.start_time = datetime.now()
@@ -35,6 +46,7 @@ class MarketDataService:
             except asyncio.CancelledError:
                 pass
             self._ingestion_task = None
+        await market_data_writer.stop() # Final flush of buffered candles
         self.active_streams = []
         self.start_time = None
 
@@ -59,177 +71,220 @@ class MarketDataService:
         """
         Starts a WebSocket stream for a specific symbol/interval.
         """
-        client = await binance_adapter.get_async_client()
-        bm = BinanceSocketManager(client)
-        
-        # Format: <symbol>@kline_<interval>
-        stream_name = f"{symbol.lower()}@kline_{interval}"
-        self.active_streams.append(stream_name)
-        
-        logger.info(f"Starting Kline Socket for {symbol} {interval}")
-        
-        # Note: In a real prod environment, we would use a MultiplexSocket or similar
-        # to handle multiple streams efficiently.
-        socket = bm.kline_socket(symbol=symbol, interval=interval)
+        await self.start_kline_streams([(symbol, interval)], callback)
+
+    async def start_kline_streams(self, keys: List[Tuple[str, str]], callback: Callable, url: Optional[str] = None):
+        """
+        Ingests the kline streams of many (symbol, interval) keys over a few combined-stream
+        connections (see app/services/stream_mux.py). Messages are routed by key to that
+        key's own pipeline, so strategies only see the streams they trade.
 
-        async with socket as tscm:
+        The first key is the displayed stream (the active pair at its timeframe): only it is
+        written to market_data (keyed by time and symbol), risk-checked and broadcast as
+        TICK / INDICATORS messages, so other intervals of the same symbol never mix into
+        the table or the chart. The other keys only feed their strategies.
+
+        The socket loop only receives; everything else runs in pipeline stages (see
+        app/services/pipeline.py) connected by bounded queues, so a slow DB commit or
+        websocket client never delays reading the next exchange message:
+
+            receive -> decode -+-> market_data_writer (write-behind, latest update per candle; displayed stream)
+                               +-> risk      (coalesce per symbol: always the freshest price; displayed stream)
+                               +-> strategy  (closed candles; drop oldest)
+                               +-> broadcast (UI messages; drop oldest)
+
+        `url` (or BINANCE_STREAM_URL) replaces Binance's endpoint, e.g. with a
+        ReplayServer playing back a tick journal (app/services/tick_journal.py).
+        """
+        url = url or settings.BINANCE_STREAM_URL
+        if not url:
+            client = await binance_adapter.get_async_client()
+            # Same endpoint python-binance uses for this client (live / testnet / demo)
+            url = BinanceSocketManager(client)._get_stream_url()
+        if settings.TICK_JOURNAL_DIR and self.journal is None:
             from datetime import datetime
-            from app.db.session import AsyncSessionLocal
-            from app.db.models import MarketTicket
-            from app.schemas.market_data import KlineData
-            from app.strategy.registry import strategy_registry
+            from app.services.tick_journal import TickJournal
+            self.journal = TickJournal(os.path.join(settings.TICK_JOURNAL_DIR, f"ticks-{datetime.now():%Y%m%d-%H%M%S}.tkj"))
+            print(f"Recording ticks to {self.journal.path}")
+        mux = StreamMultiplexer(url, journal=self.journal, max_queue_size=settings.INGEST_SOCKET_QUEUE_SIZE)
 
-            while True:
-                res = await tscm.recv()
-                if res and 'k' in res:
-                    kline = res['k']
-                    
-                    # 1. Parse Data
-                    data_point = KlineData(
-                        symbol=res['s'],
-                        interval=kline['i'],
-                        open_time=datetime.fromtimestamp(kline['t'] / 1000),
-                        open_price=float(kline['o']),
-                        high_price=float(kline['h']),
-                        low_price=float(kline['l']),
-                        close_price=float(kline['c']),
-                        volume=float(kline['v']),
-                        close_time=datetime.fromtimestamp(kline['T'] / 1000),
-                        is_closed=kline['x']
-                    )
+        displayed = keys[0]
+        for symbol, interval in keys:
+            # Format: <symbol>@kline_<interval>
+            stream_name = kline_stream(symbol, interval)
+            if stream_name in self.pipelines:
+                continue
+            stages = self._build_pipeline(symbol, interval, callback, displayed)
+            self.pipelines[stream_name] = stages
+            self.active_streams.append(stream_name)
+            for stage in stages.values():
+                stage.start()
+            # Only backpressure point: decode is cheap, so this waits only if it is wedged
+            mux.subscribe(symbol, interval, stages["decode"].put)
+
+        logger.info(f"Starting {len(mux.stats)} kline streams over {len(mux.connections())} connections")
+        self.mux = mux
+        try:
+            await mux.run()
+        finally:
+            for stream_name in mux.stats:
+                for stage in self.pipelines.pop(stream_name, {}).values():
+                    await stage.stop()
+            self.mux = None
+            if self.journal:
+                self.journal.close()
+                self.journal = None
+
+    def _build_pipeline(self, symbol: str, interval: str, callback: Callable,
+                        displayed: Tuple[str, str]) -> Dict[str, Stage]:
+        from datetime import datetime
+        from app.schemas.market_data import Kline
+        from app.strategy.registry import strategy_registry
+        from app.services.trade_executor import TradeExecutor
+        from app.api.websockets import manager
+
+        stages: Dict[str, Stage] = {}
+        is_displayed = (symbol, interval) == tuple(displayed)
+        # SL/TP compares against the position of the active pair, at any of its intervals
+        risk_symbol = symbol == displayed[0]
+
+        def log(msg: str, kind: str):
+            stages["broadcast"].offer({
+                "type": "LOG",
+                "data": {"time": datetime.now().strftime("%H:%M:%S"), "msg": msg, "type": kind}
+            })
 
-                    # 2. Save to DB (Upsert to avoid duplicates)
-                    from sqlalchemy.dialects.postgresql import insert
+        async def decode(res):
+            if not (res and 'k' in res):
+                return
+
+            # 1. Parse Data: slotted record, no validation or datetimes on the hot path
+            data_point = Kline.from_event(res)
+            # Downstream lags count from receipt
+            since = stages["decode"].current_since
+            if data_point.is_closed:
+                stages["strategy"].offer(data_point, since)
+            if not is_displayed:
+                return # Extra streams only feed their strategies
+            # 2. Save to DB: write-behind buffer, the latest update per candle is upserted in batches
+            market_data_writer.add(data_point)
+            stages["risk"].offer(data_point, since)
+            # The TICK message is built by the broadcast stage, only for ticks it does not drop
+            stages["broadcast"].offer(data_point, since)
+            await callback(data_point)
+
+        async def broadcast(message):
+            if isinstance(message, Kline):
+                message = message.tick_message()
+            await manager.broadcast(message)
+
+        async def risk_closed(risk_event):
+            # Broadcast the risk closure event
+            log(f"RISK ENGINE: {risk_event}", "error")
+            # Refresh active trades after risk closure
+            try:
+                from app.api.endpoints import get_active_trades
+                current_trades = await get_active_trades()
+                stages["broadcast"].offer({
+                    "type": "ACTIVE_TRADES",
+                    "data": current_trades
+                })
+            except: pass
+
+        async def risk(data_point):
+            # 3. Risk Management Engine (Check SL/TP on the latest price)
+            # Serialised with trade execution in TradeExecutor; firing on a closed candle drops its strategy signals
+            risk_event = await TradeExecutor.check_risk_management(
+                data_point.close_price, data_point.symbol, data_point.close_time_ms if data_point.is_closed else None
+            )
+            if risk_event:
+                await risk_closed(risk_event)
+
+        async def run_strategies(data_point):
+            # 4. Feed to Strategies
+            # The strategies of this stream see the candle concurrently so their model
+            # calls are served by one batched forward pass (app/ml/batching.py)
+            strategies = strategy_registry.instances_for(symbol, interval)
+            signals = await asyncio.gather(
+                *(strategy.on_tick(data_point) for _, strategy in strategies), return_exceptions=True
+            )
+            if strategies:
+                self.signal_latency.append(time.monotonic() - stages["strategy"].current_since)
+            to_execute = []
+            for (strategy_id, strategy), signal in zip(strategies, signals):
+                try:
+                    if isinstance(signal, Exception):
+                        raise signal
                     
-                    async with AsyncSessionLocal() as session:
-                        stmt = insert(MarketTicket).values(
-                            time=data_point.close_time,
-                            symbol=data_point.symbol,
-                            price=data_point.close_price,
-                            volume=data_point.volume,
-                            open=data_point.open_price,
-                            high=data_point.high_price,
-                            low=data_point.low_price,
-                            close=data_point.close_price
-                        )
-                        
-                        # UPDATE if exists (Upsert)
-                        stmt = stmt.on_conflict_do_update(
-                            index_elements=['time', 'symbol'],
-                            set_={
-                                'price': stmt.excluded.price,
-                                'volume': stmt.excluded.volume,
-                                'open': stmt.excluded.open,
-                                'high': stmt.excluded.high,
-                                'low': stmt.excluded.low,
-                                'close': stmt.excluded.close
-                            }
-                        )
+                    # Broadcast Log (if available)
+                    if hasattr(strategy, 'last_log') and strategy.last_log:
+                        log(strategy.last_log, "info")
+                        strategy.last_log = "" # Clear after sending
+                    
+                    # Broadcast Indicators (drawn on the chart of the displayed stream)
+                    if is_displayed and hasattr(strategy, 'last_indicators') and strategy.last_indicators:
+                        stages["broadcast"].offer({
+                            "type": "INDICATORS",
+                            "data": strategy.last_indicators
+                        })
+                    
+                    # Broadcast Signal
+                    if signal:
+                        print(f"SIGNAL: {signal}")
+                        stages["broadcast"].offer({
+                            "type": "SIGNAL",
+                            "data": signal
+                        })
+                        # Send success log too
+                        log(f"Signal: {signal['action']} @ {signal['price']}", "success")
+                        to_execute.append(signal)
                         
-                        await session.execute(stmt)
-                        await session.commit()
+                except Exception as e:
+                    print(f"Strategy Error {strategy_id}: {e}")
 
-                    await callback(data_point)
+            # 6. Execute Trades (Auto-Trading): risk management first, as one step with the trades
+            if not to_execute:
+                return
+            try:
+                risk_event, trades = await TradeExecutor.execute_strategy_signals(
+                    to_execute, data_point.close_price, symbol, data_point.close_time_ms, check_risk=risk_symbol
+                )
+            except Exception as e:
+                print(f"Trade Execution Error {symbol}: {e}")
+                return
+            if risk_event:
+                await risk_closed(risk_event)
+            if trades is None:
+                log(f"Signals dropped: risk management closed the {symbol} position on this candle", "info")
+                return
+            for trade in trades:
+                log(f"EXECUTED: {trade.side} {trade.quantity:.4f} @ {trade.price}", "success")
 
-                    # 3. Risk Management Engine (Check SL/TP on every tick)
-                    from app.services.trade_executor import TradeExecutor
-                    from app.api.websockets import manager # Import manager here for risk_event and trade execution
-                    risk_event = await TradeExecutor.check_risk_management(data_point.close_price, data_point.symbol)
-                    if risk_event:
-                        # Broadcast the risk closure event
-                        await manager.broadcast({
-                            "type": "LOG",
-                            "data": {
-                                "time": datetime.now().strftime("%H:%M:%S"),
-                                "msg": f"RISK ENGINE: {risk_event}",
-                                "type": "error"
-                            }
-                        })
-                        # Refresh active trades after risk closure
-                        try:
-                            from app.api.endpoints import get_active_trades
-                            current_trades = await get_active_trades()
-                            await manager.broadcast({
-                                "type": "ACTIVE_TRADES",
-                                "data": current_trades
-                            })
-                        except: pass
+        stages["decode"] = Stage("decode", decode, settings.INGEST_DECODE_QUEUE_SIZE, BLOCK)
+        if is_displayed:
+            stages["risk"] = Stage("risk", risk, 1, COALESCE, key=lambda d: d.symbol)
+        stages["strategy"] = Stage("strategy", run_strategies, settings.INGEST_STRATEGY_QUEUE_SIZE, DROP_OLDEST)
+        # 5. Broadcast to Frontend via WebSocket
+        stages["broadcast"] = Stage("broadcast", broadcast, settings.INGEST_BROADCAST_QUEUE_SIZE, DROP_OLDEST)
+        return stages
 
-                    # 4. Feed to Strategies
-                    if data_point.is_closed:
-                        for strategy_id, strategy in strategy_registry._strategies.items():
-                            try:
-                                signal = await strategy.on_tick(data_point)
-                                
-                                from app.api.websockets import manager
-                                
-                                # Broadcast Log (if available)
-                                if hasattr(strategy, 'last_log') and strategy.last_log:
-                                    await manager.broadcast({
-                                        "type": "LOG",
-                                        "data": {
-                                            "time": datetime.now().strftime("%H:%M:%S"),
-                                            "msg": strategy.last_log,
-                                            "type": "info"
-                                        }
-                                    })
-                                    strategy.last_log = "" # Clear after sending
-                                
-                                # Broadcast Indicators
-                                if hasattr(strategy, 'last_indicators') and strategy.last_indicators:
-                                    await manager.broadcast({
-                                        "type": "INDICATORS",
-                                        "data": strategy.last_indicators
-                                    })
-                                
-                                # Broadcast Signal
-                                if signal:
-                                    print(f"SIGNAL: {signal}")
-                                    await manager.broadcast({
-                                        "type": "SIGNAL",
-                                        "data": signal
-                                    })
-                                    # Send success log too
-                                    await manager.broadcast({
-                                        "type": "LOG",
-                                        "data": {
-                                            "time": datetime.now().strftime("%H:%M:%S"),
-                                            "msg": f"Signal: {signal['action']} @ {signal['price']}",
-                                            "type": "success"
-                                        }
-                                    })
-                                    
-                                    # 6. Execute Trade (Auto-Trading)
-                                    trade = await TradeExecutor.execute_signal(signal)
-                                    
-                                    if trade:
-                                        await manager.broadcast({
-                                            "type": "LOG",
-                                            "data": {
-                                                "time": datetime.now().strftime("%H:%M:%S"),
-                                                "msg": f"EXECUTED: {trade.side} {trade.quantity:.4f} @ {trade.price}",
-                                                "type": "success"
-                                            }
-                                        })
-                                    
-                            except Exception as e:
-                                print(f"Strategy Error {strategy_id}: {e}")
-                    
-                    # 5. Broadcast to Frontend via WebSocket
-                    from app.api.websockets import manager
-                    # Convert to dict (pydantic model dump)
-                    # Use jsonable_encoder if needed, or just dict(). 
-                    # datetime might need serialization
-                    payload = {
-                        "type": "TICK",
-                        "data": {
-                            "symbol": data_point.symbol,
-                            "price": data_point.close_price,
-                            "volume": data_point.volume,
-                            "time": data_point.close_time.isoformat()
-                        }
-                    }
-                    await manager.broadcast(payload)
+    def pipeline_metrics(self) -> Dict[str, Any]:
+        """
+        Per stream, per stage: queue depth, drops / coalesced updates, lag and service time;
+        per connection errors and per stream message rates; tick-to-signal latency; DB writer
+        and tick journal stats.
+        """
+        return {
+            "streams": {
+                stream: {name: stage.metrics() for name, stage in stages.items()}
+                for stream, stages in self.pipelines.items()
+            },
+            "ingest": self.mux.metrics() if self.mux else None,
+            "tick_to_signal_ms": percentiles(self.signal_latency),
+            "market_data_writer": market_data_writer.metrics(),
+            "journal": {"path": self.journal.path, "records": self.journal.records, "bytes": self.journal.bytes}
+                       if self.journal else None,
+        }
 
     async def ingest_realtime_data(self):
         """
@@ -277,7 +332,8 @@ class MarketDataService:
             # print(f"Update: {data.symbol} Price: {data.close_price} Closed: {data.is_closed}")
             pass
 
-        # Start for Active Pair
-        await self.start_kline_socket(active_pair, interval, process_kline)
+        # Start for Active Pair (the displayed stream), every running strategy's stream and the configured extra streams
+        keys = [(active_pair, interval)] + sorted(strategy_registry.stream_keys()) + parse_streams(settings.INGEST_STREAMS)
+        await self.start_kline_streams(keys, process_kline)
 
 market_data_service = MarketDataService()
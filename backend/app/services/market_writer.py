@@ -0,0 +1,185 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from app.core.config import settings
+
+ROWS_PER_STATEMENT = 1000 # 8 bind parameters per row; Postgres allows 32767 per statement
+
+def row_from_kline(data_point) -> Dict[str, Any]:
+    """market_data row for a Kline update (keyed by candle close time and symbol)."""
+    return {
+        "time": data_point.close_time,
+        "symbol": data_point.symbol,
+        "price": data_point.close_price,
+        "volume": data_point.volume,
+        "open": data_point.open_price,
+        "high": data_point.high_price,
+        "low": data_point.low_price,
+        "close": data_point.close_price,
+    }
+
+def upsert_statement(rows: List[Dict[str, Any]]):
+    """One multi-row INSERT ... ON CONFLICT (time, symbol) DO UPDATE for the rows."""
+    from sqlalchemy.dialects.postgresql import insert
+    from app.db.models import MarketTicket
+
+    stmt = insert(MarketTicket).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=['time', 'symbol'],
+        set_={
+            'price': stmt.excluded.price,
+            'volume': stmt.excluded.volume,
+            'open': stmt.excluded.open,
+            'high': stmt.excluded.high,
+            'low': stmt.excluded.low,
+            'close': stmt.excluded.close
+        }
+    )
+
+async def upsert_rows(rows: List[Dict[str, Any]]):
+    """Writes the rows in one transaction (one round-trip per ROWS_PER_STATEMENT rows)."""
+    from app.db.session import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as session:
+        for i in range(0, len(rows), ROWS_PER_STATEMENT):
+            await session.execute(upsert_statement(rows[i:i + ROWS_PER_STATEMENT]))
+        await session.commit()
+
+class MarketDataWriter:
+    """
+    Write-behind buffer for the market_data table.
+
+    add() only updates an in-memory dict of Kline records keyed by (close time, symbol),
+    so the partial-candle updates Binance sends every ~2 seconds overwrite each other and
+    only the latest one per candle is written. The buffer is flushed as one multi-row
+    upsert every `flush_interval` seconds, as soon as a candle closes, or when it holds
+    `max_rows` candles.
+
+    If a flush fails (DB down), its rows are kept for the next attempt, merged under any
+    newer updates, and attempts back off up to `max_backoff` seconds. At most
+    `max_retry_rows` failed rows are kept; beyond that the oldest candles are dropped.
+    stop() makes a final flush.
+    """
+    def __init__(self, write: Optional[Callable[[List[Dict[str, Any]]], Awaitable[Any]]] = None,
+                 flush_interval: float = settings.MARKET_WRITER_FLUSH_SECONDS,
+                 max_rows: int = settings.MARKET_WRITER_MAX_ROWS,
+                 max_retry_rows: int = settings.MARKET_WRITER_MAX_RETRY_ROWS,
+                 max_backoff: float = 30.0, history: int = 256):
+        self._write = write or upsert_rows
+        self.flush_interval = flush_interval
+        self.max_rows = max_rows
+        self.max_retry_rows = max_retry_rows
+        self.max_backoff = max_backoff
+        self._buffer: Dict[Tuple, Any] = {} # (close_time_ms, symbol) -> latest Kline
+        self._retry: Dict[Tuple, Any] = {} # Updates of failed flushes
+        self._wake: Optional[asyncio.Event] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self._failures_in_row = 0
+
+        self.updates = 0
+        self.coalesced = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self.failures = 0
+        self.dropped = 0
+        self._flush_ms: deque = deque(maxlen=history)
+
+    def add(self, data_point):
+        key = (data_point.close_time_ms, data_point.symbol)
+        if key in self._buffer:
+            self.coalesced += 1
+        self._buffer[key] = data_point
+        self.updates += 1
+        if self._wake and (data_point.is_closed or len(self._buffer) >= self.max_rows):
+            self._wake.set()
+
+    async def flush(self) -> int:
+        """Writes everything buffered (plus rows of failed flushes); returns the rows written."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            rows = {**self._retry, **self._buffer} # Newer updates win
+            self._retry, self._buffer = {}, {}
+            if not rows:
+                return 0
+            started = time.perf_counter()
+            try:
+                await self._write([row_from_kline(data_point) for data_point in rows.values()])
+            except Exception as e:
+                self.failures += 1
+                self._failures_in_row += 1
+                self._keep_for_retry(rows)
+                print(f"[market_writer] Flush of {len(rows)} rows failed ({e}), {len(self._retry)} rows kept for retry")
+                return 0
+            self._failures_in_row = 0
+            self.flushes += 1
+            self.rows_written += len(rows)
+            self._flush_ms.append((time.perf_counter() - started) * 1000)
+            return len(rows)
+
+    def _keep_for_retry(self, rows: Dict[Tuple, Any]):
+        # Updates that arrived during the failed write are newer and stay in the buffer
+        rows = {key: row for key, row in rows.items() if key not in self._buffer}
+        if len(rows) > self.max_retry_rows:
+            newest = sorted(rows, key=lambda key: key[0])[-self.max_retry_rows:]
+            self.dropped += len(rows) - len(newest)
+            rows = {key: rows[key] for key in newest}
+        self._retry = rows
+
+    def _delay(self) -> float:
+        if not self._failures_in_row:
+            return self.flush_interval
+        return min(self.max_backoff, self.flush_interval * 2 ** self._failures_in_row)
+
+    async def _run(self):
+        while True:
+            deadline = time.monotonic() + self._delay()
+            while time.monotonic() < deadline:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=deadline - time.monotonic())
+                except asyncio.TimeoutError:
+                    break
+                self._wake.clear()
+                if not self._failures_in_row:
+                    break # Early flush (candle closed / buffer full); while backing off, wait it out
+            self._wake.clear()
+            await self.flush()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._lock = asyncio.Lock()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._wake = None
+        await self.flush()
+        if self._retry:
+            print(f"[market_writer] {len(self._retry)} rows could not be written before shutdown")
+
+    def metrics(self) -> Dict[str, Any]:
+        flush_ms = sorted(self._flush_ms)
+        return {
+            "updates": self.updates,
+            "coalesced": self.coalesced,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "updates_per_flush": self.updates / self.flushes if self.flushes else None,
+            "buffered": len(self._buffer),
+            "retry_pending": len(self._retry),
+            "failures": self.failures,
+            "dropped": self.dropped,
+            "flush_ms_p50": flush_ms[len(flush_ms) // 2] if flush_ms else None,
+            "flush_ms_max": flush_ms[-1] if flush_ms else None,
+        }
+
+market_data_writer = MarketDataWriter()
@@ -0,0 +1,277 @@
+import asyncio
+import math
+import multiprocessing as mp
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from app.core.config import settings
+
+def _fetch_recent(symbol: str, interval: str, limit: int):
+    from app.services.binance_client import binance_adapter
+    # The newest kline is the candle still forming: fetch one more and drop it
+    return binance_adapter.get_history(symbol, interval, limit=limit + 1)[:-1]
+
+# --- Worker side ---
+
+def _init_worker(threads: int, niceness: int):
+    # Fine-tuning must not compete with the live tick pipeline for the CPU
+    if niceness and hasattr(os, "nice"):
+        os.nice(niceness)
+    import torch
+    torch.set_num_threads(threads)
+    torch.set_num_interop_threads(1)
+
+def _live_loss(model, df, seq_length: int, buffer_size: int, scaler, train_split: float) -> float:
+    """
+    Price MSE of the next-close predictions over the newest (1 - train_split) of `df`,
+    made the way LSTMStrategy serves `model`: with the fixed (scale, min_) `scaler`, or
+    with a scaler fitted per tick buffer when it is None (legacy weights).
+    """
+    import numpy as np
+    from app.ml.inference import predict_series
+
+    predicted = predict_series(model, df, seq_length, buffer_size, scaler=scaler)
+    errors = (predicted[:-1] - df["close"].to_numpy()[1:])[int(len(df) * train_split):]
+    errors = errors[~np.isnan(errors)]
+    return float(np.mean(errors ** 2)) if len(errors) else float("nan")
+
+def _fine_tune(model_path: str, klines: List, out_dir: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Continue training the bundle at `model_path` on `klines`, keeping its input scaler, and
+    gate the result: the candidate must not do worse than the current weights (times
+    max_loss_ratio) on the held-out newest candles, each served as it would be live.
+    Accepted candidates are written (with their inference export) to `out_dir` as a new
+    versioned bundle.
+
+    Legacy weight-only files have no scaler: live, they scale every window separately.
+    The candidate gets a fixed scaler fitted here, so the gate compares the base model
+    with per-window scaling against the candidate with its fixed scaler, and the result
+    records the change of scaling.
+    """
+    import pandas as pd
+    from app.ml.artifacts import load_artifact, save_artifact
+    from app.ml.runtime import export_artifact
+    from app.ml.training import minmax_scaler, prepare_features, train_lstm
+
+    base = load_artifact(model_path)
+    rows = [k[:6] for k in klines] # open_time, open, high, low, close, volume
+    df = pd.DataFrame(rows, columns=["open_time", "open", "high", "low", "close", "volume"]).astype(float)
+    # Keep the live model's input scale; legacy weight-only files get one fitted here
+    scaler = minmax_scaler(base.scale, base.min_) if base.scaler is not None else None
+    prepared = prepare_features(df, scaler)
+    seq_length = base.seq_length or params["seq_length"]
+    scaling = "fixed" if base.scaler is not None else "per-window -> fixed"
+    if base.scaler is None:
+        print(f"[refresh] {model_path} has no bundled scaler: a candidate is served with a fixed scaler "
+              f"fitted on {len(df)} candles instead of per-window scaling")
+
+    base_loss = _live_loss(base.model, df, seq_length, params["buffer_size"], base.scaler, params["train_split"])
+    model, fitted, metrics = train_lstm(
+        None,
+        seq_length=seq_length,
+        hidden_dim=base.architecture["hidden_dim"],
+        num_layers=base.architecture["num_layers"],
+        horizon=base.architecture["output_dim"],
+        epochs=params["epochs"],
+        batch_size=params["batch_size"],
+        learning_rate=params["learning_rate"],
+        train_split=params["train_split"],
+        initial_state=base.model.state_dict(),
+        prepared=prepared,
+        log=lambda msg: print(f"[refresh] {msg}"),
+    )
+    candidate_loss = _live_loss(model, df, seq_length, params["buffer_size"], (fitted.scale_, fitted.min_),
+                                params["train_split"])
+    accepted = math.isfinite(candidate_loss) and (
+        not math.isfinite(base_loss) or candidate_loss <= base_loss * params["max_loss_ratio"]
+    )
+
+    version = f"ft{datetime.now().strftime('%Y%m%d%H%M%S')}"
+    path = None
+    if accepted:
+        # lstm_v1.pth -> lstm_v1-ft<time>.pth (also when fine-tuning an earlier fine-tune)
+        stem = os.path.splitext(os.path.basename(model_path))[0].split("-ft")[0]
+        path = os.path.join(out_dir, f"{stem}-{version}.pth")
+        save_artifact(path, model, fitted, seq_length, metrics, version=version)
+        export_artifact(load_artifact(path))
+    return {
+        "accepted": accepted,
+        "base_version": base.version,
+        "version": version,
+        "base_loss": base_loss if math.isfinite(base_loss) else None,
+        "candidate_loss": candidate_loss if math.isfinite(candidate_loss) else None,
+        "samples": metrics["samples"],
+        "scaling": scaling,
+        "path": path,
+    }
+
+# --- API side ---
+
+class ModelRefresher:
+    """
+    Scheduled online fine-tuning of live LSTM strategies.
+
+    Every `interval_minutes` each live strategy with a model is fine-tuned on its most
+    recent closed candles in a separate, low-priority worker process. A candidate that
+    passes the validation gate is loaded and warmed up in a thread, then swapped into
+    the strategy from the event loop with LSTMStrategy.use_artifact: a reference swap
+    between two ticks. The tick path never waits on any of this.
+    """
+    def __init__(
+        self,
+        interval_minutes: float = settings.MODEL_REFRESH_INTERVAL_MINUTES,
+        candles: int = settings.MODEL_REFRESH_CANDLES,
+        epochs: int = settings.MODEL_REFRESH_EPOCHS,
+        learning_rate: float = settings.MODEL_REFRESH_LEARNING_RATE,
+        batch_size: int = settings.MODEL_REFRESH_BATCH_SIZE,
+        max_loss_ratio: float = settings.MODEL_REFRESH_MAX_LOSS_RATIO,
+        out_dir: str = settings.MODEL_REFRESH_DIR,
+        worker_threads: int = settings.MODEL_REFRESH_WORKER_THREADS,
+        niceness: int = settings.MODEL_REFRESH_WORKER_NICENESS,
+        history: int = settings.MODEL_REFRESH_HISTORY,
+        fetch_recent: Callable[[str, str, int], List] = _fetch_recent,
+    ):
+        self.interval_minutes = interval_minutes
+        self.candles = candles
+        self.params = {
+            "epochs": epochs,
+            "learning_rate": learning_rate,
+            "batch_size": batch_size,
+            "max_loss_ratio": max_loss_ratio,
+            "train_split": 0.8,
+            "seq_length": 60,
+            "buffer_size": 150, # LSTMStrategy.buffer_size
+        }
+        self.out_dir = out_dir
+        self.worker_threads = worker_threads
+        self.niceness = niceness
+        self.fetch_recent = fetch_recent
+
+        self.history: deque = deque(maxlen=history) # Refresh attempts, newest last
+        self._lock: Optional[asyncio.Lock] = None # One fine-tune at a time
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._lock is not None and self._lock.locked()
+
+    def start(self):
+        """Start the schedule (no-op when interval_minutes is 0)."""
+        if self.interval_minutes > 0 and self._task is None:
+            self._task = asyncio.create_task(self._schedule())
+
+    def shutdown(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "interval_minutes": self.interval_minutes,
+            "scheduled": self._task is not None,
+            "running": self.running,
+            "history": list(reversed(self.history)),
+        }
+
+    async def refresh_all(self) -> List[Dict[str, Any]]:
+        """Fine-tune every registered strategy that has a model."""
+        from app.strategy.registry import strategy_registry
+        results = []
+        for strategy in list(strategy_registry._strategies.values()):
+            if getattr(strategy, "artifact", None) is None:
+                continue
+            try:
+                results.append(await strategy.train(None))
+            except Exception as e:
+                print(f"[refresh] {strategy.strategy_id}: fine-tuning failed: {e}")
+        return results
+
+    async def refresh(self, strategy, klines: Optional[List] = None) -> Dict[str, Any]:
+        """Fine-tune `strategy`'s model on `klines` (default: recent closed candles) and swap it in if accepted."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            attempt = {
+                "strategy_id": strategy.strategy_id,
+                "started_at": datetime.now().isoformat(),
+                "status": "failed",
+            }
+            loop = asyncio.get_running_loop()
+            try:
+                if strategy.artifact is None:
+                    raise ValueError("Strategy has no model loaded")
+                if klines is None:
+                    klines = await loop.run_in_executor(
+                        None, self.fetch_recent, strategy.symbol, strategy.config.get("interval", "1m"), self.candles
+                    )
+                if not klines:
+                    raise ValueError("No candles to fine-tune on")
+
+                result = await loop.run_in_executor(
+                    self._ensure_pool(), _fine_tune, strategy.artifact.path, klines, self.out_dir, self.params
+                )
+                attempt.update(result)
+                if result["accepted"]:
+                    # Load + warm-up off the event loop; nothing is awaited between here and the
+                    # swap, so it lands between two ticks
+                    artifact = await loop.run_in_executor(None, self._prepare, strategy, result["path"])
+                    strategy.use_artifact(artifact)
+                    attempt["status"] = "swapped"
+                else:
+                    attempt["status"] = "rejected"
+            except Exception as e:
+                attempt["error"] = str(e)
+            attempt["finished_at"] = datetime.now().isoformat()
+            self.history.append(attempt)
+            await self._broadcast(attempt)
+            return attempt
+
+    # --- Internals ---
+
+    def _ensure_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            os.makedirs(self.out_dir, exist_ok=True)
+            self._pool = ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=mp.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.worker_threads, self.niceness),
+            )
+        return self._pool
+
+    @staticmethod
+    def _prepare(strategy, path: str):
+        from app.ml.artifacts import model_cache
+        artifact = model_cache.get(path)
+        strategy.warm_up(artifact)
+        return artifact
+
+    async def _schedule(self):
+        while True:
+            await asyncio.sleep(self.interval_minutes * 60)
+            await self.refresh_all()
+
+    async def _broadcast(self, attempt: Dict[str, Any]):
+        from app.api.websockets import manager
+        losses = f"val loss {attempt.get('candidate_loss')} vs {attempt.get('base_loss')} before"
+        if attempt["status"] == "swapped":
+            if attempt.get("scaling") == "per-window -> fixed":
+                losses += "; input scaling is now fixed instead of per-window"
+            msg, kind = f"MODEL: {attempt['strategy_id']} now on {attempt['version']} ({losses})", "success"
+        elif attempt["status"] == "rejected":
+            msg, kind = f"MODEL: {attempt['strategy_id']} fine-tune rejected ({losses})", "info"
+        else:
+            msg, kind = f"MODEL: {attempt['strategy_id']} fine-tune failed: {attempt.get('error')}", "error"
+        print(msg)
+        await manager.broadcast({
+            "type": "LOG",
+            "data": {"time": datetime.now().strftime("%H:%M:%S"), "msg": msg, "type": kind}
+        })
+
+model_refresher = ModelRefresher()
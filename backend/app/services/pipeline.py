@@ -0,0 +1,143 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+# Overflow policies
+BLOCK = "block" # put() waits for room: backpressure on the producer
+DROP_OLDEST = "drop_oldest" # The oldest queued item makes room for the new one
+DROP_NEWEST = "drop_newest" # The new item is discarded
+COALESCE = "coalesce" # A queued item with the same key is replaced in place (keeps its position); when full, drop oldest
+
+def percentiles(values) -> Dict[str, Optional[float]]:
+    """p50 / p99 / max of durations in seconds, in ms"""
+    if not values:
+        return {"p50": None, "p99": None, "max": None}
+    ordered = sorted(values)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+    return {"p50": pick(0.5), "p99": pick(0.99), "max": ordered[-1] * 1000}
+
+class Stage:
+    """
+    One stage of a streaming pipeline: a bounded asyncio.Queue drained by a worker task
+    that awaits `handler(item)` per item.
+
+    Producers call offer() (never waits; what happens when the queue is full depends on
+    the policy) or, for BLOCK stages, put(). Items carry the time they entered the
+    pipeline (`since`, default: when offered), so `lag_ms` is how old an item is when its
+    handler starts, including the time spent in upstream stages; `service_ms` is the
+    handler's own time; `current_since` is the entry time of the item being handled, for
+    handlers that pass it on. Handler errors are printed and counted, the stage keeps running.
+    """
+    def __init__(self, name: str, handler: Callable[[Any], Awaitable[Any]], maxsize: int, policy: str = BLOCK,
+                 key: Optional[Callable[[Any], Hashable]] = None, history: int = 1024):
+        if policy == COALESCE and key is None:
+            raise ValueError(f"Stage {name}: coalescing needs a key function")
+        self.name = name
+        self.handler = handler
+        self.maxsize = maxsize
+        self.policy = policy
+        self.key = key
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self._pending: Dict[Hashable, list] = {} # COALESCE: key -> [item, since], the queue holds keys
+        self._task: Optional[asyncio.Task] = None
+        self.current_since: Optional[float] = None
+
+        self.offered = 0
+        self.processed = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.errors = 0
+        self._lags: deque = deque(maxlen=history)
+        self._service: deque = deque(maxlen=history)
+
+    # --- Producer side ---
+
+    def offer(self, item: Any, since: Optional[float] = None) -> bool:
+        """Enqueue without waiting; False if the item was dropped (DROP_NEWEST, or a full BLOCK stage)."""
+        self.offered += 1
+        since = time.monotonic() if since is None else since
+        if self.policy == COALESCE:
+            key = self.key(item)
+            entry = self._pending.get(key)
+            if entry is not None:
+                entry[0] = item # Newest value, original position and age
+                self.coalesced += 1
+                return True
+            if self._queue.full():
+                self._pending.pop(self._queue.get_nowait(), None)
+                self.dropped += 1
+            self._pending[key] = [item, since]
+            self._queue.put_nowait(key)
+            return True
+        if self._queue.full():
+            if self.policy == DROP_OLDEST:
+                self._queue.get_nowait()
+                self.dropped += 1
+            else:
+                self.dropped += 1
+                return False
+        self._queue.put_nowait((item, since))
+        return True
+
+    async def put(self, item: Any, since: Optional[float] = None):
+        """Enqueue, waiting for room if the stage is full (any policy other than BLOCK just offers)."""
+        if self.policy != BLOCK:
+            self.offer(item, since)
+            return
+        self.offered += 1
+        await self._queue.put((item, time.monotonic() if since is None else since))
+
+    # --- Consumer side ---
+
+    def start(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            entry = await self._queue.get()
+            if self.policy == COALESCE:
+                item, since = self._pending.pop(entry)
+            else:
+                item, since = entry
+            started = time.monotonic()
+            self._lags.append(started - since)
+            self.current_since = since
+            try:
+                await self.handler(item)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                print(f"[pipeline] {self.name} error: {e}")
+            self.processed += 1
+            self._service.append(time.monotonic() - started)
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "policy": self.policy,
+            "depth": self.depth,
+            "maxsize": self.maxsize,
+            "offered": self.offered,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "lag_ms": percentiles(self._lags),
+            "service_ms": percentiles(self._service),
+        }
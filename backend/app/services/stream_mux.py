@@ -0,0 +1,159 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from binance.ws.constants import WSListenerState
+from binance.ws.reconnecting_websocket import ReconnectingWebsocket
+from app.core.config import settings
+
+Handler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+def kline_stream(symbol: str, interval: str) -> str:
+    """Binance stream name, e.g. btcusdt@kline_1m"""
+    return f"{symbol.lower()}@kline_{interval}"
+
+def parse_streams(spec: str) -> List[Tuple[str, str]]:
+    """'ETHUSDT@1m, SOLUSDT@5m' -> [("ETHUSDT", "1m"), ("SOLUSDT", "5m")]"""
+    keys = []
+    for item in spec.split(","):
+        if item.strip():
+            symbol, _, interval = item.strip().partition("@")
+            keys.append((symbol.upper(), interval or "1m"))
+    return keys
+
+class RecordingWebsocket(ReconnectingWebsocket):
+    """ReconnectingWebsocket that appends every raw frame to a TickJournal before parsing it."""
+    def __init__(self, *args, journal=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.journal = journal
+
+    def _handle_message(self, evt):
+        if self.journal is not None:
+            self.journal.append(evt)
+        return super()._handle_message(evt)
+
+class StreamStats:
+    """Message count and rate of one stream (rate over the last `window` seconds)."""
+    def __init__(self, window: float = 60.0):
+        self.window = window
+        self.messages = 0
+        self.last_message: Optional[float] = None
+        self._times: deque = deque()
+
+    def record(self, now: float):
+        self.messages += 1
+        self.last_message = now
+        self._times.append(now)
+        while self._times[0] < now - self.window:
+            self._times.popleft()
+
+    def metrics(self, now: float) -> Dict[str, Any]:
+        while self._times and self._times[0] < now - self.window:
+            self._times.popleft()
+        return {
+            "messages": self.messages,
+            "per_minute": len(self._times) * 60.0 / self.window,
+            "last_message_age_s": None if self.last_message is None else now - self.last_message,
+        }
+
+class StreamMultiplexer:
+    """
+    Kline streams for many symbol x interval keys over a few combined-stream connections
+    (wss://.../stream?streams=a/b/c, at most `streams_per_connection` streams each).
+
+    Each combined message {"stream": name, "data": payload} is routed by stream name to
+    the handler subscribed for that (symbol, interval) and awaited, so a slow handler
+    only holds up its own connection. Connections reconnect through python-binance's
+    ReconnectingWebsocket; if it gives up, the connection is reopened after a backoff.
+    With a `journal` (app/services/tick_journal.py) every raw frame is recorded as received.
+    """
+    def __init__(self, url: str, streams_per_connection: int = settings.INGEST_STREAMS_PER_CONNECTION,
+                 rate_window: float = 60.0, max_backoff: float = 60.0, journal=None,
+                 max_queue_size: int = settings.INGEST_SOCKET_QUEUE_SIZE):
+        self.url = url # e.g. wss://stream.binance.com:9443/
+        self.journal = journal
+        self.max_queue_size = max_queue_size
+        self.streams_per_connection = streams_per_connection
+        self.rate_window = rate_window
+        self.max_backoff = max_backoff
+        self._routes: Dict[str, Tuple[Tuple[str, str], Handler]] = {} # Stream name -> (key, handler)
+        self.stats: Dict[str, StreamStats] = {}
+        self.errors: Dict[int, int] = {} # Connection -> error events / reconnects
+        self.unrouted = 0
+        self._tasks: List[asyncio.Task] = []
+
+    def subscribe(self, symbol: str, interval: str, handler: Handler):
+        name = kline_stream(symbol, interval)
+        self._routes[name] = ((symbol.upper(), interval), handler)
+        self.stats.setdefault(name, StreamStats(self.rate_window))
+
+    def connections(self) -> List[List[str]]:
+        """Stream names per connection"""
+        names = sorted(self._routes)
+        size = self.streams_per_connection
+        return [names[i:i + size] for i in range(0, len(names), size)]
+
+    async def dispatch(self, msg: Dict[str, Any]):
+        route = self._routes.get(msg.get("stream")) if isinstance(msg, dict) else None
+        if route is None:
+            self.unrouted += 1
+            return
+        self.stats[msg["stream"]].record(time.monotonic())
+        await route[1](msg["data"])
+
+    async def run(self):
+        """Opens the connections and dispatches until cancelled."""
+        self._tasks = [
+            asyncio.create_task(self._run_connection(i, streams))
+            for i, streams in enumerate(self.connections())
+        ]
+        try:
+            await asyncio.gather(*self._tasks)
+        finally:
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            self._tasks = []
+
+    async def _run_connection(self, index: int, streams: List[str]):
+        self.errors[index] = 0
+        failures = 0
+        while True:
+            socket = RecordingWebsocket(url=self.url, path=f"streams={'/'.join(streams)}", prefix="stream?",
+                                        max_queue_size=self.max_queue_size, journal=self.journal)
+            try:
+                async with socket as conn:
+                    failures = 0
+                    try:
+                        while True:
+                            msg = await conn.recv()
+                            if msg.get("e") == "error":
+                                # Reported by the read loop while it reconnects
+                                self.errors[index] += 1
+                                print(f"[stream_mux] Connection {index}: {msg.get('type')} {msg.get('m')}")
+                                continue
+                            await self.dispatch(msg)
+                    finally:
+                        # The read loop only sees the exit once its recv() returns (10 s timeout)
+                        conn.ws_state = WSListenerState.EXITING
+                        if conn.ws:
+                            await conn.ws.close()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors[index] += 1
+                failures += 1
+                delay = min(self.max_backoff, 2 ** failures)
+                print(f"[stream_mux] Connection {index} ({len(streams)} streams) lost: {e!r}, reopening in {delay}s")
+                await asyncio.sleep(delay)
+
+    def metrics(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "connections": [
+                {"streams": len(streams), "errors": self.errors.get(i, 0)}
+                for i, streams in enumerate(self.connections())
+            ],
+            "unrouted": self.unrouted,
+            "streams": {name: stats.metrics(now) for name, stats in self.stats.items()},
+        }
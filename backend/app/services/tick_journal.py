@@ -0,0 +1,167 @@
+import asyncio
+import json
+import mmap
+import os
+import struct
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+MAGIC = b"TKJ1"
+RECORD = struct.Struct("<qI") # Receive time (epoch ns), payload length; then the raw frame bytes
+FLUSH_BYTES = 64 * 1024
+FLUSH_SECONDS = 1.0
+
+class TickJournal:
+    """
+    Append-only binary journal of raw socket frames (the combined-stream JSON exactly as
+    received), each prefixed with its receive time. Appends go to an in-memory buffer
+    that is written out every FLUSH_BYTES or FLUSH_SECONDS, so a crash loses at most
+    that much; a torn last record is ignored by JournalReader.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+        else:
+            with open(path, "rb") as f:
+                if f.read(len(MAGIC)) != MAGIC:
+                    self._file.close()
+                    raise ValueError(f"{path} is not a tick journal")
+        self._buffer = bytearray()
+        self._last_flush = time.monotonic()
+        self.records = 0
+        self.bytes = 0
+
+    def append(self, frame, received_ns: Optional[int] = None):
+        if isinstance(frame, str):
+            frame = frame.encode()
+        self._buffer += RECORD.pack(time.time_ns() if received_ns is None else received_ns, len(frame))
+        self._buffer += frame
+        self.records += 1
+        self.bytes += RECORD.size + len(frame)
+        if len(self._buffer) >= FLUSH_BYTES or time.monotonic() - self._last_flush >= FLUSH_SECONDS:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self._file.write(self._buffer)
+            self._file.flush()
+            self._buffer.clear()
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+class JournalReader:
+    """Memory-mapped, sequential reader of a TickJournal file."""
+    def __init__(self, path: str):
+        self.path = path
+        self.truncated = False # A torn record at the end (writer crashed mid-flush)
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a tick journal")
+
+    def __iter__(self) -> Iterator[Tuple[int, bytes]]:
+        """(received_ns, raw frame) per record, in recording order"""
+        with open(self.path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == len(MAGIC):
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                offset, end = len(MAGIC), len(data)
+                while offset < end:
+                    if offset + RECORD.size > end:
+                        self.truncated = True
+                        return
+                    received_ns, length = RECORD.unpack_from(data, offset)
+                    offset += RECORD.size
+                    if offset + length > end:
+                        self.truncated = True
+                        return
+                    yield received_ns, data[offset:offset + length]
+                    offset += length
+
+    def messages(self) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        for received_ns, frame in self:
+            yield received_ns, json.loads(frame)
+
+    def streams(self) -> Dict[str, int]:
+        """Stream name -> message count"""
+        counts: Dict[str, int] = {}
+        for _, msg in self.messages():
+            counts[msg.get("stream")] = counts.get(msg.get("stream"), 0) + 1
+        return counts
+
+class ReplayServer:
+    """
+    Local stand-in for Binance's combined-stream endpoint that plays a journal back.
+
+    A connection to /stream?streams=a/b/c receives the journal's frames of those streams
+    with their recorded spacing divided by `speed` (0: as fast as possible). Point
+    BINANCE_STREAM_URL (or start_kline_streams(url=...)) at `url` to drive the real
+    ingestion path. `finished` is set once every stream of the journal has been sent.
+    """
+    def __init__(self, reader: JournalReader, speed: float = 1.0, host: str = "127.0.0.1", port: int = 0):
+        self.reader = reader
+        self.speed = speed
+        self.host = host
+        self.port = port
+        self.sent = 0
+        self.finished = asyncio.Event()
+        self._frames: Dict[str, List[Tuple[int, str]]] = {}
+        self._first_ns = 0
+        self._served = set()
+        self._server = None
+
+    async def start(self):
+        from websockets.asyncio.server import serve
+
+        # Index once, so serving does not compete with the pipeline for CPU
+        for received_ns, frame in self.reader:
+            text = frame.decode()
+            self._frames.setdefault(json.loads(text).get("stream"), []).append((received_ns, text))
+        self._first_ns = min((frames[0][0] for frames in self._frames.values()), default=0)
+        self._server = await serve(self._serve, self.host, self.port, max_queue=None)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    @property
+    def streams(self) -> List[str]:
+        return sorted(self._frames)
+
+    @property
+    def total(self) -> int:
+        """Frames in the journal"""
+        return sum(len(frames) for frames in self._frames.values())
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}/"
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _serve(self, conn):
+        from urllib.parse import parse_qs, urlparse
+
+        names = parse_qs(urlparse(conn.request.path).query).get("streams", [""])[0].split("/")
+        frames = sorted(frame for name in names for frame in self._frames.get(name, []))
+        started = time.monotonic()
+        for received_ns, text in frames:
+            if self.speed:
+                delay = (received_ns - self._first_ns) / 1e9 / self.speed - (time.monotonic() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            await conn.send(text)
+            self.sent += 1
+            if not self.speed:
+                await asyncio.sleep(0) # Let the consumer run in between
+        self._served.update(names)
+        if self._served >= set(self._frames):
+            self.finished.set()
+        await conn.wait_closed()
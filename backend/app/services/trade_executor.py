@@ -1,4 +1,6 @@
+import asyncio
 from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 from sqlalchemy import select, asc
 from app.db.session import AsyncSessionLocal
 from app.db.models import TradeLog, MarketTicket
@@ -7,7 +9,19 @@ class TradeExecutor:
     '''
     Service to handle trade execution logic and wallet state calculation.
     Supports Long, Short, and Risk Management.
+
+    Every decision rebuilds the wallet from TradeLog and then writes a trade, so all of
+    them run under one lock: the risk stage and the strategy stage of the ingestion
+    pipeline (and of every stream) would otherwise act on the same stale position.
     '''
+    _lock: Optional[asyncio.Lock] = None
+    _risk_ticks: Dict[str, int] = {} # Symbol -> close time (ms) of the closed candle risk management last fired on
+
+    @classmethod
+    def lock(cls) -> asyncio.Lock:
+        if cls._lock is None:
+            cls._lock = asyncio.Lock()
+        return cls._lock
 
     @staticmethod
     async def calculate_wallet_state():
@@ -105,10 +119,43 @@ class TradeExecutor:
             }
 
     @staticmethod
-    async def check_risk_management(current_price: float, symbol: str):
+    async def check_risk_management(current_price: float, symbol: str, tick: Optional[int] = None):
         """
         Evaluate if we need to Force Close based on SL/TP.
+        `tick` is the close time (ms) of a closed candle: strategy signals on it are dropped if this fires.
+        """
+        async with TradeExecutor.lock():
+            trade = await TradeExecutor._check_risk_management(current_price, symbol)
+            if trade and tick is not None:
+                TradeExecutor._risk_ticks[symbol] = tick
+            return trade
+
+    @staticmethod
+    async def execute_strategy_signals(signals: List[dict], current_price: float, symbol: str,
+                                       tick: int, check_risk: bool = True) -> Tuple[Optional[TradeLog], Optional[List[TradeLog]]]:
         """
+        Executes the strategy signals of one closed candle (close time `tick`, in ms) as one step:
+        risk management first, at the candle's price. If SL/TP fires on this candle (here or
+        already in the risk stage) the signals are dropped. Returns (risk trade, executed trades),
+        with None instead of the trades when the signals were dropped. `check_risk` is False
+        for symbols other than the active pair, whose position SL/TP is measured against.
+        """
+        async with TradeExecutor.lock():
+            if check_risk and TradeExecutor._risk_ticks.get(symbol) == tick:
+                return None, None
+            risk_trade = await TradeExecutor._check_risk_management(current_price, symbol) if check_risk else None
+            if risk_trade:
+                TradeExecutor._risk_ticks[symbol] = tick
+                return risk_trade, None
+            trades = []
+            for signal in signals:
+                trade = await TradeExecutor._execute_signal(signal)
+                if trade:
+                    trades.append(trade)
+            return None, trades
+
+    @staticmethod
+    async def _check_risk_management(current_price: float, symbol: str):
         state = await TradeExecutor.calculate_wallet_state()
         pos = state['position']
         avg_entry = state['avg_entry']
@@ -155,7 +202,7 @@ class TradeExecutor:
                 "price": current_price,
                 "reason": reason
             }
-            return await TradeExecutor.execute_signal(signal)
+            return await TradeExecutor._execute_signal(signal)
             
         return None
 
@@ -165,6 +212,11 @@ class TradeExecutor:
         Executes a trade based on the signal and current wallet state.
         Returns the executed trade log or None if invalid.
         '''
+        async with TradeExecutor.lock():
+            return await TradeExecutor._execute_signal(signal)
+
+    @staticmethod
+    async def _execute_signal(signal: dict):
         state = await TradeExecutor.calculate_wallet_state()
         
         symbol = signal['symbol']
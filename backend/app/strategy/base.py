@@ -18,7 +18,8 @@ class BaseStrategy(ABC):
         Called every time a new market update (tick/kline) arrives.
         
         Args:
-            data: The latest market data candle.
+            data: The latest market data candle (a slotted Kline live, a KlineData
+                in backtests; both have the same attributes).
             
         Returns:
             Optional Dictionary containing a Signal (BUY/SELL) or None.
@@ -26,6 +27,23 @@ class BaseStrategy(ABC):
         """
         pass
 
+    def generate_signals(self, bars: Any) -> Optional[Any]:
+        """
+        Optional vectorised entry point used by the BacktestEngine.
+
+        Args:
+            bars: KlineArrays holding the whole backtest series.
+
+        Returns:
+            An int8 array aligned with the bars (+1 BUY, -1 SELL, 0 no action),
+            or None if the strategy only supports on_tick.
+        """
+        return None
+
+    def describe_signal(self, index: int, action: int) -> str:
+        """Reason string recorded for a trade opened from generate_signals()."""
+        return self.__class__.__name__
+
     @abstractmethod
     async def train(self, historical_data: Any):
         """
@@ -1,14 +1,22 @@
-from typing import List, Optional
-import torch
+import asyncio
+from collections import deque
+from typing import Optional
 import numpy as np
 import pandas as pd
 from app.strategy.base import BaseStrategy
 from app.schemas.market_data import KlineData, TradeSignal
-from app.ml.networks import LSTMNetwork
-from app.ml.features import FeatureEngineer
-from sklearn.preprocessing import MinMaxScaler
+from app.ml.distillation import StudentModel, load_student
+from app.ml.features import FEATURE_COLUMNS, INDICATOR_WARMUP
+from app.ml.inference import WindowBuffer, predict_series, window_from_rows
+from app.ml.online_features import OnlineFeatureEngine
+from app.ml.runtime import InferenceRuntime
+from app.ml.streaming import StreamingLSTM
+from app.backtest.arrays import KlineArrays
+from app.backtest.signals import DEFAULT_THRESHOLD, threshold_signals
+from app.ml.artifacts import ModelArtifact, model_cache
+from app.ml.batching import inference_batcher
+from app.ml.prediction_cache import prediction_cache, prediction_key
 import os
-from datetime import datetime
 from app.services.binance_client import binance_adapter
 
 class LSTMStrategy(BaseStrategy):
@@ -17,22 +25,43 @@ class LSTMStrategy(BaseStrategy):
         self.symbol = config.get("symbol", "BTCUSDT")
         self.model_path = config.get("model_path", "app/ml/models/lstm_v1.pth")
         self.seq_length = config.get("seq_length", 60)
+        self.threshold = config.get("threshold", DEFAULT_THRESHOLD) # Min predicted move ratio for a signal
+        self.quantized = config.get("quantized", False) # Serve the int8 model variant
+        # Share one forward pass with the other strategies' requests (inference_batcher)
+        self.batch_inference = config.get("batch_inference", True)
         
         # Buffer to store recent candles for inference
         # We need at least seq_length + lookback for indicators
         self.buffer_size = 150 
-        self.candles: List[KlineData] = []
+        # Indicators are updated per candle; the last buffer_size feature rows stay in a ring buffer
+        self.features = OnlineFeatureEngine(history=self.buffer_size)
         
-        # Model & Scaler
+        # Model artifact (weights + training scaler). Legacy weight-only files have no
+        # scaler; it is then fitted on the buffer at inference time, see prepare_window.
+        self.artifact: Optional[ModelArtifact] = None
         self.model = None
-        self.scaler = MinMaxScaler() # Note: In prod, scaler should be loaded from training!
-        # For simplicity in this demo, we fit scaler on the buffer (Not ideal, but works for POC)
-        # OR we just assume the range is similar.
+        self.runtime: Optional[InferenceRuntime] = None # Exported graph or eager model, shared per artifact
+        self.window_buffer: Optional[WindowBuffer] = None # Preallocated float32 model input
         self.last_log = ""
         self.last_indicators = None
         
+        # Backtest predictions from predict_batch, used for signal reasons
+        self.batch_predictions: Optional[np.ndarray] = None
+        self.model_hash: Optional[str] = None # Artifact fingerprint for the prediction cache
+        # Optional stateful inference: one LSTM step per candle, full-window resync every N candles
+        self.stream: Optional[StreamingLSTM] = None
+        # Optional distilled surrogate (app/ml/distillation.py): decides in the hot path while
+        # the LSTM (teacher) runs after each decision, only to monitor agreement
+        self.student: Optional[StudentModel] = None
+        self.teacher_monitor: deque = deque(maxlen=config.get("teacher_monitor_size", 500)) # (agree, error bps)
+        self._teacher_task: Optional[asyncio.Task] = None
+        
+        if config.get("student_path"):
+            self.load_student(config["student_path"])
         self.load_model()
-        self.preload_data()
+        # Live instances warm the buffer from Binance; backtests start empty
+        if config.get("preload", True):
+            self.preload_data()
         
     def preload_data(self):
         """
@@ -50,41 +79,17 @@ class LSTMStrategy(BaseStrategy):
                 print(f"[{self.strategy_id}] creating candles failed")
                 return
 
-            parsed_candles = []
             for k in klines:
                 # k is [time, open, high, low, close, volume, close_time, ...]
-                # Binance time is ms timestamp
-                parsed_candles.append(KlineData(
-                    symbol=self.symbol,
-                    interval=self.config.get("interval", "1m"),
-                    open_time=datetime.fromtimestamp(k[0] / 1000),
-                    open_price=float(k[1]),
-                    high_price=float(k[2]),
-                    low_price=float(k[3]),
-                    close_price=float(k[4]),
-                    volume=float(k[5]),
-                    close_time=datetime.fromtimestamp(k[6] / 1000),
-                    is_closed=True 
-                ))
+                self.features.update(float(k[4]))
             
-            # Keep only the last buffer_size
-            self.candles = parsed_candles[-self.buffer_size:]
-            print(f"[{self.strategy_id}] Successfully preloaded {len(self.candles)} candles.")
+            print(f"[{self.strategy_id}] Successfully preloaded {len(klines)} candles.")
             
         except Exception as e:
             print(f"[{self.strategy_id}] Error preloading data: {e}")
         
     def load_model(self):
         try:
-            # Reconstruct model architecture
-            # Assuming we know the input dim from features.py (5 features)
-            input_dim = 5 
-            hidden_dim = 64
-            num_layers = 2
-            
-            self.model = LSTMNetwork(input_dim, hidden_dim, 1, num_layers)
-            
-            # Load weights
             # Adjust path relative to execution
             abs_path = os.path.abspath(self.model_path)
             if not os.path.exists(abs_path):
@@ -92,14 +97,68 @@ class LSTMStrategy(BaseStrategy):
                  abs_path = os.path.join(os.getcwd(), self.model_path)
             
             if os.path.exists(abs_path):
-                self.model.load_state_dict(torch.load(abs_path, map_location=torch.device('cpu')))
-                self.model.eval()
-                print(f"[{self.strategy_id}] LSTM Model loaded from {abs_path}")
+                # Loaded once per process and shared by every instance (architecture,
+                # scaler and seq_length come from the artifact)
+                artifact = model_cache.get(abs_path)
+                self.warm_up(artifact)
+                self.use_artifact(artifact)
+                print(f"[{self.strategy_id}] LSTM Model {self.artifact.version} loaded from {abs_path} ({self.runtime.backend})")
             else:
                 print(f"[{self.strategy_id}] Model file not found at {abs_path}")
         except Exception as e:
             print(f"[{self.strategy_id}] Error loading model: {e}")
 
+    def load_student(self, path: str):
+        try:
+            self.student = load_student(os.path.abspath(path))
+            print(f"[{self.strategy_id}] Student model {self.student.version} loaded from {path} "
+                  f"(lags {self.student.lags}, history {self.student.history})")
+        except Exception as e:
+            print(f"[{self.strategy_id}] Error loading student model: {e}")
+
+    def _seq_length_for(self, artifact: ModelArtifact) -> int:
+        if artifact.seq_length and "seq_length" not in self.config:
+            return artifact.seq_length
+        return self.seq_length
+
+    def warm_up(self, artifact: ModelArtifact):
+        """
+        Build and warm the artifact's runtime (once per process) so the first candle on it
+        runs at steady-state latency. The slow half of a model switch: safe off the event loop.
+        """
+        artifact.get_runtime(self.quantized).warmup(self._seq_length_for(artifact))
+
+    def use_artifact(self, artifact: ModelArtifact):
+        """
+        Switch inference to `artifact` (warm it up first). Only rebinds references, so
+        called from the event loop it takes effect atomically between two on_tick calls.
+        """
+        runtime = artifact.get_runtime(self.quantized)
+        stream = None
+        if self.config.get("streaming", False):
+            stream = StreamingLSTM(artifact.model, resync_every=self.config.get("stream_resync_every", 15))
+        seq_length = self._seq_length_for(artifact)
+        window_buffer = WindowBuffer(seq_length, self.buffer_size)
+        self.seq_length = seq_length
+        self.window_buffer = window_buffer
+        self.artifact = artifact
+        self.model = artifact.model
+        # The int8 variant predicts slightly different prices: cache it separately
+        self.model_hash = artifact.fingerprint + (":int8" if self.quantized else "")
+        if self.student:
+            # Backtests then replay the student's predictions
+            self.model_hash += f":student:{self.student.fingerprint}"
+            if self.student.teacher != artifact.fingerprint:
+                print(f"[{self.strategy_id}] Warning: student {self.student.version} was distilled from "
+                      f"another model than {artifact.version}; see the teacher agreement")
+        self.runtime = runtime
+        self.stream = stream # Fresh state: the next candle syncs on a full window
+
+    @property
+    def scaler(self):
+        """Training (scale, min_) from the artifact; None means fit per buffer (legacy weights)."""
+        return self.artifact.scaler if self.artifact else None
+
     async def on_tick(self, market_data: KlineData) -> Optional[TradeSignal]:
         if market_data.symbol != self.symbol:
             return None
@@ -108,83 +167,74 @@ class LSTMStrategy(BaseStrategy):
         if not market_data.is_closed:
             return None
 
-        self.candles.append(market_data)
-        if len(self.candles) > self.buffer_size:
-            self.candles.pop(0)
+        # Feature Engineering (O(1) indicator update, no DataFrame)
+        self.features.update(market_data.close_price)
             
         # Need enough data for:
         # 1. Indicators (need ~50)
         # 2. Sequence (need 60 after indicators)
-        if len(self.candles) < self.buffer_size:
-            msg = f"[{self.strategy_id}] Buffering Data: {len(self.candles)}/{self.buffer_size}..."
+        if self.features.count < self.buffer_size:
+            msg = f"[{self.strategy_id}] Buffering Data: {self.features.count}/{self.buffer_size}..."
             print(msg)
             self.last_log = msg
             return None
-            
-        # Prepare Data
-        df = pd.DataFrame([{
-            'close': c.close_price,
-            'open': c.open_price,
-            'high': c.high_price,
-            'low': c.low_price,
-            'volume': c.volume
-        } for c in self.candles])
         
-        # Feature Engineering
         try:
-            df = FeatureEngineer.add_technical_indicators(df)
-            features = ['close', 'log_return', 'sma_20', 'rsi', 'volatility']
-            
-            # Get last SEQ_LENGTH rows
-            if len(df) < self.seq_length:
-                return None
+            # Last SEQ_LENGTH feature rows, scaled with the training scaler (or one fit
+            # on the buffer for legacy models). Same windows as predict_batch.
+            latest = self.features.latest()
+            if self.student:
+                # Surrogate: a few mat-vec products on the newest rows; the teacher runs after the decision
+                predicted_close = float(self.student.predict_close(self.features.last_rows(self.student.history)))
+                if np.isnan(predicted_close):
+                    return None
+                self._monitor_teacher(predicted_close, market_data.close_price)
+            elif self.stream and not self.stream.needs_sync and not np.isnan(latest).any():
+                # Streaming: advance the carried LSTM state by this candle only
+                predicted_close = self.stream.invert(self.stream.step(latest))
+            else:
+                prepared = self.window_buffer.fill(self.features, self.scaler)
+                if prepared is None:
+                    return None
+                input_scaled, scale, min_ = prepared
                 
-            input_data = df[features].tail(self.seq_length).values
-            
-            # Normalize (Using a fresh scaler on the window is bad practice, 
-            # ideally load the scaler used in training. For POC we skip or use buffer min/max)
-            # self.scaler.fit(input_data) # Only fits on this window... 
-            # Better approach for POC: Simple Manual Normalization based on known approximate range
-            # or just run it raw if model can handle it (it can't usually).
-            
-            # Let's fit on the whole buffer for a slightly better estimate
-            self.scaler.fit(df[features].values)
-            input_scaled = self.scaler.transform(input_data)
-            
-            # Inference
-            tensor_in = torch.FloatTensor(input_scaled).unsqueeze(0) # (1, seq_len, features)
-            
-            with torch.no_grad():
-                prediction = self.model(tensor_in).item()
+                # Inference
+                if self.stream:
+                    prediction = self.stream.sync(input_scaled, scale, min_)
+                elif self.batch_inference:
+                    # Batched with concurrent requests for the same model; scale / min_ and
+                    # the runtime are bound before the await, so a model swap meanwhile is harmless
+                    prediction = float((await inference_batcher.predict(self.runtime, input_scaled))[0])
+                else:
+                    # (1, seq_len, features)
+                    prediction = float(self.runtime.predict(input_scaled[None])[0, 0])
                 
-            # Prediction is Scaled Next Close Price
-            # Inverse transform is tricky if we only have the scaled value.
-            # We construct a dummy row to inverse transform
-            dummy = np.zeros((1, len(features)))
-            dummy[0, 0] = prediction # close is at index 0
-            predicted_close = self.scaler.inverse_transform(dummy)[0, 0]
+                # Prediction is Scaled Next Close Price (close is feature 0)
+                predicted_close = (prediction - min_[0]) / scale[0]
             
             current_close = market_data.close_price
             
             # Store indicators for UI
             # Get the last row of indicators
-            last_row = df.iloc[-1]
+            last_row = dict(zip(FEATURE_COLUMNS, np.nan_to_num(latest).tolist()))
             self.last_indicators = {
-                "rsi": float(last_row.get('rsi', 0)),
-                "sma_20": float(last_row.get('sma_20', 0)),
-                "volatility": float(last_row.get('volatility', 0)),
+                "rsi": last_row['rsi'],
+                "sma_20": last_row['sma_20'],
+                "volatility": last_row['volatility'],
                 "predicted_price": float(predicted_close),
                 "current_price": float(current_close),
                 "sentiment": "BULLISH" if predicted_close > current_close else "BEARISH",
                 "confidence": abs((predicted_close - current_close) / current_close) * 1000 # Dummy score scale
             }
+            if self.student:
+                self.last_indicators["teacher_agreement"] = self.surrogate_stats()["signal_agreement"]
 
             log_msg = f"[{self.strategy_id}] Price: {current_close:.2f} -> Pred: {predicted_close:.2f}"
             print(log_msg)
             self.last_log = log_msg
             
-            # Simple Logic: If predicted increase > 0.1%
-            threshold = 1.0005 # 0.05%
+            # Simple Logic: If predicted move exceeds the threshold (default 0.05%)
+            threshold = self.threshold
             if predicted_close > current_close * threshold:
                 return {
                     "action": "BUY",
@@ -206,5 +256,99 @@ class LSTMStrategy(BaseStrategy):
             
         return None
 
+    def _monitor_teacher(self, student_close: float, close: float):
+        """Schedule the teacher on this candle's window; skipped while the previous one still runs."""
+        if self.runtime is None or (self._teacher_task and not self._teacher_task.done()):
+            return
+        # The ring buffer moves on with the next candle: keep a copy of the rows
+        rows = self.features.last_rows(self.buffer_size - INDICATOR_WARMUP).copy()
+        self._teacher_task = asyncio.create_task(
+            self._run_teacher(self.runtime, self.scaler, rows, student_close, close)
+        )
+
+    async def _run_teacher(self, runtime, scaler, rows: np.ndarray, student_close: float, close: float):
+        try:
+            prepared = window_from_rows(rows, self.seq_length, scaler)
+            if prepared is None:
+                return
+            input_scaled, scale, min_ = prepared
+            if self.batch_inference:
+                out = float((await inference_batcher.predict(runtime, input_scaled))[0])
+            else:
+                out = float(runtime.predict(input_scaled[None])[0, 0])
+            teacher_close = (out - min_[0]) / scale[0]
+            signals = threshold_signals(np.array([student_close, teacher_close]), np.array([close, close]), self.threshold)
+            self.teacher_monitor.append((signals[0] == signals[1], np.log(student_close / teacher_close) * 1e4))
+        except Exception as e:
+            print(f"[{self.strategy_id}] Teacher monitor error: {e}")
+
+    def surrogate_stats(self) -> dict:
+        """Student vs teacher over the last teacher_monitor_size candles."""
+        if not self.teacher_monitor:
+            return {"compared": 0, "signal_agreement": None, "mae_bps": None}
+        agree, error = zip(*self.teacher_monitor)
+        return {
+            "compared": len(agree),
+            "signal_agreement": float(np.mean(agree)),
+            "mae_bps": float(np.mean(np.abs(error))),
+        }
+
+    def predict_batch(self, bars: KlineArrays) -> np.ndarray:
+        """
+        Predicted close for every bar of a backtest series, matching what on_tick
+        would return bar by bar (NaN until the buffer is full).
+        Served from the on-disk prediction cache when the same weights already ran
+        over these candles; otherwise computed with _predict_series.
+        """
+        if self.model is None or len(bars) == 0:
+            return np.full(len(bars), np.nan)
+        if not self.config.get("prediction_cache", True):
+            return self._predict_series(bars)
+        return prediction_cache.predictions(
+            self._cache_key(), bars, self._predict_series, lookback=self.buffer_size - 1
+        )
+
+    def _cache_key(self) -> str:
+        return prediction_key(
+            self.model_hash, self.seq_length, self.buffer_size,
+            self.symbol, self.config.get("interval", "1m")
+        )
+
+    def _predict_series(self, bars: KlineArrays) -> np.ndarray:
+        # All windows are built at once and run through the network in mini-batches
+        df = pd.DataFrame({
+            'close': bars.close,
+            'open': bars.open,
+            'high': bars.high,
+            'low': bars.low,
+            'volume': bars.volume
+        })
+        if self.student:
+            return self.student.predict_series(df, self.buffer_size)
+        return predict_series(
+            self.runtime, df, self.seq_length, self.buffer_size,
+            batch_size=self.config.get("batch_size", 1024), scaler=self.scaler
+        )
+
+    def generate_signals(self, bars: KlineArrays) -> np.ndarray:
+        predicted = self.predict_batch(bars)
+        self.batch_predictions = predicted
+        if self.model is None or len(bars) == 0 or not self.config.get("prediction_cache", True):
+            return threshold_signals(predicted, bars.close, self.threshold)
+        return prediction_cache.signals(
+            self._cache_key(), self.threshold, predicted, bars, lookback=self.buffer_size - 1
+        )
+
+    def describe_signal(self, index: int, action: int) -> str:
+        predicted_close = self.batch_predictions[index]
+        if action > 0:
+            return f"LSTM_PRED_UP ({predicted_close:.2f})"
+        return f"LSTM_PRED_DOWN ({predicted_close:.2f})"
+
     async def train(self, historical_data):
-        pass
+        """
+        Fine-tune the live model on recent candles (kline rows; None fetches them) in the
+        model refresh worker process and hot-swap it in if it passes the validation gate.
+        """
+        from app.services.model_refresh import model_refresher
+        return await model_refresher.refresh(self, historical_data)
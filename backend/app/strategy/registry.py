@@ -1,4 +1,4 @@
-from typing import Dict, Type
+from typing import Dict, List, Set, Tuple, Type
 from app.strategy.base import BaseStrategy
 
 class StrategyRegistry:
@@ -23,5 +23,20 @@ class StrategyRegistry:
     def get_instance(self, instance_id: str) -> BaseStrategy:
         return self._strategies.get(instance_id)
 
+    def instances_for(self, symbol: str, interval: str) -> List[Tuple[str, BaseStrategy]]:
+        """Running instances trading this symbol/interval (config keys); those without a symbol see every stream"""
+        return [
+            (instance_id, strategy) for instance_id, strategy in self._strategies.items()
+            if "symbol" not in strategy.config
+            or (strategy.config["symbol"] == symbol and strategy.config.get("interval", "1m") == interval)
+        ]
+
+    def stream_keys(self) -> Set[Tuple[str, str]]:
+        """(symbol, interval) of every running instance with a symbol"""
+        return {
+            (strategy.config["symbol"], strategy.config.get("interval", "1m"))
+            for strategy in self._strategies.values() if "symbol" in strategy.config
+        }
+
 # Global Registry
 strategy_registry = StrategyRegistry()
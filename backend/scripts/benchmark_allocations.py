@@ -0,0 +1,145 @@
+import sys
+import os
+import asyncio
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+import torch
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
+
+from app.ml.batching import InferenceBatcher
+from app.ml.features import FEATURE_COLUMNS
+from app.ml.inference import WindowBuffer, prepare_online_window
+from app.ml.online_features import OnlineFeatureEngine
+
+# Per-candle feature -> model input path: memory allocated per tick in steady state.
+# Traced bytes are tracemalloc's peak above the live baseline during one tick, which
+# includes every transient allocation (NumPy reports array buffers to tracemalloc).
+# A path that allocates array buffers grows with the window; bookkeeping of the NumPy
+# calls themselves (views, ufunc iterators) does not.
+# The batched paths go through InferenceBatcher to a runtime that only keeps its input
+# (no forward pass), for one strategy and for BATCH strategies on the same candle.
+SHAPES = [(60, 150), (240, 330)] # (seq_length, buffer_size)
+TICKS = 500
+BATCH = 4
+
+class InputOnlyRuntime:
+    """Stands in for InferenceRuntime: keeps the batch it was handed."""
+    backend = "input-only"
+
+    def __init__(self):
+        self.model = self
+        self.batch = None
+        self._out = np.zeros((BATCH, 1), dtype=np.float32)
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        self.batch = batch
+        return self._out[:len(batch)]
+
+def traced_bytes(tick, closes) -> np.ndarray:
+    """tracemalloc peak above the live baseline for each call of tick(close)."""
+    out = []
+    tracemalloc.start()
+    for close in closes:
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        tick(close)
+        out.append(tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+    return np.array(out)
+
+def timed(tick, closes) -> float:
+    started = time.perf_counter()
+    for close in closes:
+        tick(close)
+    return (time.perf_counter() - started) / len(closes) * 1e6
+
+def paths(engine: OnlineFeatureEngine, seq_length: int, buffer_size: int, scaler):
+    """tick(close) per path, plus a check whether the model input memory was reused."""
+    buffer = WindowBuffer(seq_length, buffer_size)
+    address = {}
+
+    def before(close: float):
+        # prepare_online_window, then the float32 conversion the runtime made for torch
+        engine.update(close)
+        prepared = prepare_online_window(engine, buffer_size, seq_length, scaler)
+        if prepared is not None:
+            return torch.from_numpy(np.ascontiguousarray(prepared[0][None], dtype=np.float32))
+
+    def after(close: float):
+        engine.update(close)
+        buffer.fill(engine, scaler)
+        return buffer.tensor
+
+    def batched_path(strategies: int):
+        buffers = [buffer] + [WindowBuffer(seq_length, buffer_size) for _ in range(strategies - 1)]
+        batcher = InferenceBatcher(max_batch=strategies, max_wait_ms=0)
+        runtime = InputOnlyRuntime()
+        loop = asyncio.new_event_loop()
+
+        async def predict_all(windows):
+            return await asyncio.gather(*(batcher.predict(runtime, window) for window in windows))
+
+        def tick(close: float):
+            engine.update(close)
+            windows = [b.fill(engine, scaler) for b in buffers]
+            if windows[0] is not None:
+                loop.run_until_complete(predict_all([w[0] for w in windows]))
+                address.setdefault("batch", runtime.batch.__array_interface__["data"][0])
+                address["reused"] = address.get("reused", True) and (
+                    runtime.batch.__array_interface__["data"][0] == address["batch"]
+                    if strategies > 1 else np.shares_memory(runtime.batch, buffer.window)
+                )
+
+        return tick
+
+    ticks = {"before": before, "after": after, "batch1": batched_path(1), f"batch{BATCH}": batched_path(BATCH)}
+
+    def reused(name: str, start: int) -> str:
+        if name == "after":
+            return "yes" if buffer.tensor.data_ptr() == start else "no"
+        if name.startswith("batch"):
+            return "yes" if address.get("reused") else "no"
+        return "-"
+
+    return ticks, buffer, reused
+
+def main():
+    data_dir = os.path.join(os.path.dirname(__file__), "../data/historical")
+    files = sorted(f for f in os.listdir(data_dir) if f.endswith(".csv"))
+    if files:
+        closes = pd.read_csv(os.path.join(data_dir, files[0]))["close"].astype(float).tolist()
+    else:
+        rng = np.random.default_rng(0)
+        closes = (60000 * np.exp(np.cumsum(rng.normal(0, 0.002, 4000)))).tolist()
+    rng = np.random.default_rng(1)
+    fixed = (rng.uniform(1e-5, 1e-2, len(FEATURE_COLUMNS)), rng.uniform(-1, 0, len(FEATURE_COLUMNS)))
+
+    print(f"{'scaler':<7} {'window':>10} {'path':<7} {'bytes/tick p50':>15} {'max':>7} {'us/tick':>8}  tensor memory reused")
+    for scaler_name, scaler in (("buffer", None), ("fixed", fixed)):
+        for seq_length, buffer_size in SHAPES:
+            warm = buffer_size + 50
+            if len(closes) < warm + 2 * TICKS:
+                print(f"Need {warm + 2 * TICKS} candles, have {len(closes)}")
+                return
+            for name in ("before", "after", "batch1", f"batch{BATCH}"):
+                engine = OnlineFeatureEngine(history=buffer_size)
+                ticks, buffer, reused = paths(engine, seq_length, buffer_size, scaler)
+                for close in closes[:warm]:
+                    ticks[name](close)
+                # Steady state: buffer full, indicators warmed up
+                closes_run = closes[warm:warm + TICKS]
+                address = buffer.tensor.data_ptr()
+                traced = traced_bytes(ticks[name], closes_run)
+                us = timed(ticks[name], closes[warm + TICKS:warm + 2 * TICKS])
+                print(f"{scaler_name:<7} {f'{seq_length}x{buffer_size}':>10} {name:<7} {np.median(traced):>15.0f} "
+                      f"{traced.max():>7.0f} {us:>8.1f}  {reused(name, address)}")
+    sizes = " / ".join(str(seq_length * len(FEATURE_COLUMNS) * 4) for seq_length, _ in SHAPES)
+    print(f"\nOne float32 window is {sizes} bytes; 'after' stays below it and does not grow with the window.")
+    print(f"batch1 / batch{BATCH} (via InferenceBatcher) are asyncio and thread bookkeeping: the same for both windows.")
+
+if __name__ == "__main__":
+    main()
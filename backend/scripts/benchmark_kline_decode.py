@@ -0,0 +1,98 @@
+import sys
+import os
+import json
+import time
+from datetime import datetime
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
+
+from app.schemas.market_data import Kline, KlineData
+
+try:
+    import orjson # python-binance parses socket frames with it when installed
+except ImportError:
+    orjson = None
+
+# Per-message decode on the live ingestion path: combined-stream frame -> kline record,
+# plus the TICK message the broadcast stage sends. Messages / second, single core.
+SYMBOLS = 200
+ROUNDS = 5
+
+def make_frames():
+    frames = []
+    for i in range(SYMBOLS * 50):
+        symbol = f"SYM{i % SYMBOLS}USDT"
+        t = 1769976000000 + (i // SYMBOLS) * 2000 // 60000 * 60000
+        event = {"e": "kline", "E": t + 2000, "s": symbol, "k": {
+            "t": t, "T": t + 59999, "s": symbol, "i": "1m", "f": i, "L": i + 10,
+            "o": "78636.81", "c": f"{78636.81 + i % 97 * 0.01:.2f}", "h": "78650.00", "l": "78630.55",
+            "v": f"{12.345 + i % 13:.8f}", "n": 10, "x": i % 30 == 29, "q": "970000.1", "V": "6.1",
+            "Q": "480000.2", "B": "0"
+        }}
+        frames.append(json.dumps({"stream": f"{symbol.lower()}@kline_1m", "data": event}))
+    return frames
+
+def before(event):
+    # KlineData validation, two datetimes, then a fresh TICK dict for every message
+    kline = event['k']
+    data_point = KlineData(
+        symbol=event['s'],
+        interval=kline['i'],
+        open_time=datetime.fromtimestamp(kline['t'] / 1000),
+        open_price=float(kline['o']),
+        high_price=float(kline['h']),
+        low_price=float(kline['l']),
+        close_price=float(kline['c']),
+        volume=float(kline['v']),
+        close_time=datetime.fromtimestamp(kline['T'] / 1000),
+        is_closed=kline['x']
+    )
+    tick = {
+        "type": "TICK",
+        "data": {
+            "symbol": data_point.symbol,
+            "price": data_point.close_price,
+            "volume": data_point.volume,
+            "time": data_point.close_time.isoformat()
+        }
+    }
+    return data_point, tick
+
+def after(event):
+    # The TICK message is built later, by the broadcast stage, for the ticks it keeps
+    return Kline.from_event(event)
+
+def rate(fn, items) -> float:
+    best = float("inf")
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        for item in items:
+            fn(item)
+        best = min(best, time.perf_counter() - started)
+    return len(items) / best
+
+def main():
+    frames = make_frames()
+    events = [json.loads(frame)["data"] for frame in frames]
+    loads = [("json", json.loads)] + ([("orjson", orjson.loads)] if orjson else [])
+
+    print(f"{len(frames)} kline frames, {SYMBOLS} symbols, best of {ROUNDS}\n")
+    print(f"{'stage':<44} {'msgs/s':>12} {'us/msg':>8}")
+    rows = [
+        ("decode: KlineData + TICK dict (before)", rate(before, events)),
+        ("decode: Kline.from_event (after)", rate(after, events)),
+        ("decode: Kline.from_event + tick_message()", rate(lambda e: after(e).tick_message(), events)),
+    ]
+    for name, fn in loads:
+        rows.append((f"frame: {name}.loads", rate(fn, frames)))
+    json_loads = loads[-1][1]
+    rows.append((f"frame + decode before ({loads[0][0]})", rate(lambda f: before(json.loads(f)["data"]), frames)))
+    rows.append((f"frame + decode after ({loads[-1][0]})", rate(lambda f: after(json_loads(f)["data"]), frames)))
+    for name, per_second in rows:
+        print(f"{name:<44} {per_second:>12,.0f} {1e6 / per_second:>8.2f}")
+    if not orjson:
+        print("\norjson is not installed: python-binance falls back to json for socket frames.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import sys
+import os
+import tempfile
+import time
+import numpy as np
+import torch
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
+
+from app.ml.artifacts import load_artifact
+from app.ml.runtime import InferenceRuntime, export_artifact, export_path
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), "../app/ml/models/lstm_v1.pth")
+SEQ_LENGTH = 60
+BATCH_SIZES = [1, 256, 1024] # one live tick, backtest mini-batches
+ITERATIONS = {1: 2000, 256: 50, 1024: 20}
+THREADS = [1, 4]
+
+def timed(runtime: InferenceRuntime, batch: np.ndarray, iterations: int) -> np.ndarray:
+    times = []
+    for _ in range(iterations):
+        t = time.perf_counter()
+        runtime.predict(batch)
+        times.append(time.perf_counter() - t)
+    return np.array(times)
+
+def main():
+    path = MODEL_PATH
+    if not os.path.exists(export_path(path)):
+        # Benchmark a temporary export rather than writing next to the shipped model
+        tmp_dir = tempfile.mkdtemp()
+        path = os.path.join(tmp_dir, os.path.basename(MODEL_PATH))
+        with open(MODEL_PATH, "rb") as src, open(path, "wb") as dst:
+            dst.write(src.read())
+    artifact = load_artifact(path)
+    if not os.path.exists(export_path(path)):
+        export_artifact(artifact)
+
+    rng = np.random.default_rng(0)
+    print(f"{'backend':>12} {'threads':>7} {'batch':>6} {'cold (ms)':>10} {'p50 (us)':>10} {'p99 (us)':>10} {'windows/s':>10}")
+    for threads in THREADS:
+        torch.set_num_threads(threads)
+        for backend, export_file in (("eager", None), ("torchscript", export_path(path))):
+            runtime = InferenceRuntime(artifact.model, export_file, artifact.fingerprint)
+            assert runtime.backend == backend
+            for batch_size in BATCH_SIZES:
+                batch = rng.random((batch_size, SEQ_LENGTH, runtime.input_dim), dtype=np.float32)
+                # First call before warm-up: what a live tick paid without it
+                cold = timed(runtime, batch, 1)[0]
+                runtime.warmup(SEQ_LENGTH, (batch_size,))
+                times = timed(runtime, batch, ITERATIONS[batch_size])
+                print(f"{backend:>12} {threads:>7} {batch_size:>6} {cold * 1e3:>10.2f} {np.median(times) * 1e6:>10.1f} "
+                      f"{np.percentile(times, 99) * 1e6:>10.1f} {batch_size / np.median(times):>10.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import sys
+import os
+import time
+import numpy as np
+import pandas as pd
+import torch
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
+
+from app.backtest.signals import DEFAULT_THRESHOLD
+from app.ml.features import FEATURE_COLUMNS
+from app.ml.inference import prepare_online_window
+from app.ml.networks import LSTMNetwork
+from app.ml.online_features import OnlineFeatureEngine
+from app.ml.streaming import StreamingLSTM
+
+# Same settings as LSTMStrategy
+SEQ_LENGTH = 60
+BUFFER_SIZE = 150
+THRESHOLD = DEFAULT_THRESHOLD
+RESYNC_INTERVALS = [1, 5, 15, 30, 60]
+MODEL_PATH = os.path.join(os.path.dirname(__file__), "../app/ml/models/lstm_v1.pth")
+
+def signal(predicted: float, close: float) -> int:
+    if predicted > close * THRESHOLD:
+        return 1
+    if predicted < close / THRESHOLD:
+        return -1
+    return 0
+
+def run_windowed(model, closes):
+    """Reference: full 60-step forward on every candle (the default on_tick path)."""
+    engine = OnlineFeatureEngine(history=BUFFER_SIZE)
+    preds, times = [], []
+    for close in closes:
+        engine.update(close)
+        t = time.perf_counter()
+        prepared = prepare_online_window(engine, BUFFER_SIZE, SEQ_LENGTH)
+        if prepared is None:
+            preds.append(np.nan)
+            continue
+        input_scaled, scale, min_ = prepared
+        with torch.no_grad():
+            prediction = model(torch.FloatTensor(input_scaled).unsqueeze(0)).item()
+        times.append(time.perf_counter() - t)
+        preds.append((prediction - min_[0]) / scale[0])
+    return np.array(preds), np.array(times)
+
+def run_streaming(model, closes, resync_every: int):
+    engine = OnlineFeatureEngine(history=BUFFER_SIZE)
+    stream = StreamingLSTM(model, resync_every=resync_every)
+    preds, times = [], []
+    for close in closes:
+        row = engine.update(close)
+        t = time.perf_counter()
+        if engine.count < BUFFER_SIZE:
+            preds.append(np.nan)
+            continue
+        if not stream.needs_sync and not np.isnan(row).any():
+            prediction = stream.step(row)
+        else:
+            prepared = prepare_online_window(engine, BUFFER_SIZE, SEQ_LENGTH)
+            if prepared is None:
+                preds.append(np.nan)
+                continue
+            prediction = stream.sync(*prepared)
+        times.append(time.perf_counter() - t)
+        preds.append(stream.invert(prediction))
+    return np.array(preds), np.array(times)
+
+def main():
+    torch.set_num_threads(1) # Per-candle latency as seen by one live strategy
+
+    # 1. Load Data
+    data_dir = os.path.join(os.path.dirname(__file__), "../data/historical")
+    files = sorted(f for f in os.listdir(data_dir) if f.endswith(".csv"))
+    if not files:
+        print("No historical data found! Run download_data.py first.")
+        return
+    closes = pd.read_csv(os.path.join(data_dir, files[0])).iloc[:, 4].astype(float).tolist()
+    print(f"Loaded {len(closes)} candles from {files[0]}")
+
+    # 2. Load Model
+    model = LSTMNetwork(len(FEATURE_COLUMNS), 64, 1, 2)
+    if os.path.exists(MODEL_PATH):
+        model.load_state_dict(torch.load(MODEL_PATH, map_location=torch.device('cpu')))
+    else:
+        print("Model file not found, using random weights")
+    model.eval()
+
+    # 3. Compare
+    reference, windowed_times = run_windowed(model, closes)
+    valid = ~np.isnan(reference)
+    ref_signals = [signal(p, c) for p, c in zip(reference[valid], np.array(closes)[valid])]
+    print(f"\nwindowed      p50 {np.median(windowed_times) * 1e6:8.1f}us  p99 {np.percentile(windowed_times, 99) * 1e6:8.1f}us")
+    print(f"{'resync':>6} {'p50 (us)':>10} {'p99 (us)':>10} {'speedup':>8} {'mean rel err':>13} {'max rel err':>12} {'signals agree':>14}")
+    for resync_every in RESYNC_INTERVALS:
+        predicted, times = run_streaming(model, closes, resync_every)
+        rel_err = np.abs(predicted[valid] - reference[valid]) / reference[valid]
+        signals = [signal(p, c) for p, c in zip(predicted[valid], np.array(closes)[valid])]
+        agree = np.mean(np.array(signals) == np.array(ref_signals)) * 100
+        print(f"{resync_every:>6} {np.median(times) * 1e6:>10.1f} {np.percentile(times, 99) * 1e6:>10.1f} "
+              f"{np.mean(windowed_times) / np.mean(times):>7.1f}x {rel_err.mean():>13.2e} {rel_err.max():>12.2e} {agree:>13.1f}%")
+
+if __name__ == "__main__":
+    main()
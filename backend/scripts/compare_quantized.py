@@ -0,0 +1,113 @@
+import sys
+import os
+import io
+import asyncio
+import contextlib
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+import torch
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
+
+from app.backtest.engine import BacktestEngine
+from app.backtest.signals import DEFAULT_THRESHOLD, threshold_signals
+from app.ml.artifacts import load_artifact
+from app.ml.inference import predict_series
+from app.ml.runtime import export_artifact, export_path, quantize_dynamic
+from app.strategy.implementations.lstm_strategy import LSTMStrategy
+
+# float32 vs dynamically quantized int8 LSTM: accuracy cost vs CPU savings, per data file
+MODEL_PATH = os.path.join(os.path.dirname(__file__), "../app/ml/models/lstm_v1.pth")
+SEQ_LENGTH = 60
+BUFFER_SIZE = 150
+THRESHOLD = DEFAULT_THRESHOLD
+HOLDOUT = 0.2 # Last fraction of each file (train_lstm's validation split)
+LATENCY_BATCHES = {1: 2000, 256: 50} # batch size -> iterations
+
+def held_out(df: pd.DataFrame) -> pd.DataFrame:
+    """Held-out tail plus the candles its first tick buffer needs."""
+    start = int(len(df) * (1 - HOLDOUT))
+    return df.iloc[max(start - BUFFER_SIZE + 1, 0):].reset_index(drop=True)
+
+def backtest(df: pd.DataFrame, model_path: str, symbol: str, interval: str, quantized: bool) -> dict:
+    config = {
+        "symbol": symbol, "interval": interval, "model_path": model_path, "seq_length": SEQ_LENGTH,
+        "threshold": THRESHOLD, "quantized": quantized, "preload": False, "prediction_cache": False,
+    }
+    engine = BacktestEngine(LSTMStrategy, config)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return asyncio.run(engine.run(df))
+
+def latency(runtime, batch_size: int, iterations: int):
+    batch = np.random.default_rng(0).random((batch_size, SEQ_LENGTH, runtime.input_dim), dtype=np.float32)
+    runtime.warmup(SEQ_LENGTH, (batch_size,))
+    times = []
+    for _ in range(iterations):
+        t = time.perf_counter()
+        runtime.predict(batch)
+        times.append(time.perf_counter() - t)
+    return np.median(times) * 1e6, np.percentile(times, 99) * 1e6
+
+def weight_bytes(module: torch.nn.Module) -> int:
+    """Serialized size of a module's weights (packed int8 weights included)."""
+    buffer = io.BytesIO()
+    torch.save(module.state_dict(), buffer)
+    return buffer.tell()
+
+def main():
+    torch.set_num_threads(1) # Per-strategy serving latency
+
+    # 1. Model + both exports (in a temp dir unless they already sit next to the model)
+    path = MODEL_PATH
+    if not (os.path.exists(export_path(path)) and os.path.exists(export_path(path, quantized=True))):
+        path = os.path.join(tempfile.mkdtemp(), os.path.basename(MODEL_PATH))
+        with open(MODEL_PATH, "rb") as src, open(path, "wb") as dst:
+            dst.write(src.read())
+        export_artifact(load_artifact(path))
+        export_artifact(load_artifact(path), quantized=True)
+    artifact = load_artifact(path)
+    runtimes = {False: artifact.get_runtime(), True: artifact.get_runtime(quantized=True)}
+    print(f"Backends: float32={runtimes[False].backend}, int8={runtimes[True].backend}")
+
+    # 2. Latency and memory
+    print(f"\n{'batch':>6} {'fp32 p50':>10} {'fp32 p99':>10} {'int8 p50':>10} {'int8 p99':>10} {'speedup':>8}  (us)")
+    for batch_size, iterations in LATENCY_BATCHES.items():
+        fp32, int8 = latency(runtimes[False], batch_size, iterations), latency(runtimes[True], batch_size, iterations)
+        print(f"{batch_size:>6} {fp32[0]:>10.1f} {fp32[1]:>10.1f} {int8[0]:>10.1f} {int8[1]:>10.1f} {fp32[0] / int8[0]:>7.2f}x")
+    fp32_bytes = weight_bytes(artifact.model)
+    int8_bytes = weight_bytes(quantize_dynamic(artifact.model))
+    print(f"\nweights: fp32 {fp32_bytes / 1024:.1f} KiB, int8 {int8_bytes / 1024:.1f} KiB "
+          f"({100 * (1 - int8_bytes / fp32_bytes):.0f}% smaller); exported graphs: "
+          f"fp32 {os.path.getsize(export_path(path)) / 1024:.1f} KiB, "
+          f"int8 {os.path.getsize(export_path(path, quantized=True)) / 1024:.1f} KiB")
+
+    # 3. Accuracy and signals on each file's held-out tail
+    data_dir = os.path.join(os.path.dirname(__file__), "../data/historical")
+    files = sorted(f for f in os.listdir(data_dir) if f.endswith(".csv"))
+    if not files:
+        print("No historical data found! Run download_data.py first.")
+        return
+    print(f"\n{'file':<36} {'bars':>5} {'mean rel err':>13} {'max rel err':>12} {'signals agree':>14} "
+          f"{'fp32 value':>11} {'int8 value':>11} {'trades':>9}")
+    for name in files:
+        df = held_out(pd.read_csv(os.path.join(data_dir, name)))
+        symbol, interval = name.split("_")[:2]
+        predictions = {
+            quantized: predict_series(runtime, df, artifact.seq_length or SEQ_LENGTH, BUFFER_SIZE, scaler=artifact.scaler)
+            for quantized, runtime in runtimes.items()
+        }
+        valid = ~np.isnan(predictions[False])
+        rel_err = np.abs(predictions[True][valid] - predictions[False][valid]) / predictions[False][valid]
+        close = df['close'].to_numpy(dtype=np.float64)[valid]
+        signals = {q: threshold_signals(p[valid], close, THRESHOLD) for q, p in predictions.items()}
+        agree = np.mean(signals[False] == signals[True]) * 100
+        results = {q: backtest(df, path, symbol, interval, q) for q in (False, True)}
+        print(f"{name:<36} {valid.sum():>5} {rel_err.mean():>13.2e} {rel_err.max():>12.2e} {agree:>13.1f}% "
+              f"{results[False]['final_value']:>11.2f} {results[True]['final_value']:>11.2f} "
+              f"{results[False]['num_trades']:>4}/{results[True]['num_trades']:<4}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import sys
+import os
+import pandas as pd
+import torch
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
+
+from app.backtest.signals import DEFAULT_THRESHOLD
+from app.ml.artifacts import load_artifact
+from app.ml.distillation import compare, distill, save_student, student_path
+
+# Distils the LSTM into a small MLP over the newest incremental feature rows.
+# Serve it with the strategy config {"student_path": ".../lstm_v1.student.pt"}.
+MODEL_PATH = os.path.join(os.path.dirname(__file__), "../app/ml/models/lstm_v1.pth")
+STUDENT_PATH = student_path(MODEL_PATH)
+LAGS = 4 # Feature rows the student sees
+HIDDEN_DIM = 32 # 0: linear model
+EPOCHS = 60
+THRESHOLD = DEFAULT_THRESHOLD
+
+def main():
+    torch.set_num_threads(1) # Per-strategy serving latency
+
+    data_dir = os.path.join(os.path.dirname(__file__), "../data/historical")
+    files = sorted(f for f in os.listdir(data_dir) if f.endswith(".csv"))
+    if not files:
+        print("No historical data found! Run download_data.py first.")
+        return
+
+    artifact = load_artifact(MODEL_PATH)
+    filepath = os.path.join(data_dir, files[0])
+    print(f"Distilling {MODEL_PATH} ({artifact.version}) on {filepath}")
+    student, report = distill(
+        artifact, pd.read_csv(filepath), lags=LAGS, hidden_dim=HIDDEN_DIM, epochs=EPOCHS, threshold=THRESHOLD
+    )
+    save_student(STUDENT_PATH, student)
+    print(f"Student saved to {STUDENT_PATH}")
+
+    # Held-out tail of the training file, then every other file in full
+    print(f"\n{'data':<36} {'bars':>5} {'agree':>7} {'active':>7} {'signals t/s':>12} {'MAE bps':>8} "
+          f"{'student p50/p99':>16} {'teacher p50/p99':>16}  (us)")
+    rows = [(f"{files[0]} (held out)", report)]
+    rows += [(name, compare(student, artifact, pd.read_csv(os.path.join(data_dir, name)), THRESHOLD))
+             for name in files[1:]]
+    for name, r in rows:
+        print(f"{name:<36} {r['bars']:>5} {100 * r['signal_agreement']:>6.1f}% {100 * r['active_agreement']:>6.1f}% "
+              f"{r['teacher_signals']:>5}/{r['student_signals']:<6} {r['mae_bps']:>8.2f} "
+              f"{r['student_p50_us']:>7.1f}/{r['student_p99_us']:<8.1f} {r['teacher_p50_us']:>7.1f}/{r['teacher_p99_us']:<8.1f}")
+
+if __name__ == "__main__":
+    main()
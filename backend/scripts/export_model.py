@@ -0,0 +1,21 @@
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
+
+from app.ml.artifacts import load_artifact
+from app.ml.runtime import export_artifact
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), "../app/ml/models/lstm_v1.pth")
+
+def export(path: str, quantize: bool = False):
+    """(Re-)export the inference graph of an existing bundle, e.g. one trained before exports existed."""
+    artifact = load_artifact(path)
+    print(f"Exported {artifact.version} to {export_artifact(artifact)}")
+    if quantize:
+        print(f"Exported {artifact.version} (int8) to {export_artifact(artifact, quantized=True)}")
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    export(args[0] if args else MODEL_PATH, quantize="--quantize" in sys.argv)
@@ -0,0 +1,147 @@
+import sys
+import os
+import asyncio
+import json
+import time
+import pandas as pd
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
+
+from app.core.config import settings
+from app.services.tick_journal import JournalReader, ReplayServer, TickJournal
+
+# Replays a tick journal (recorded with TICK_JOURNAL_DIR) through the live ingestion path:
+# ReplayServer stands in for Binance and MarketDataService.start_kline_streams consumes it,
+# with decode and strategies running on every stream, and (like the active pair live) risk
+# checks, TICK broadcasts and market_data writes on the first one.
+# Without a journal argument a synthetic one is built from the historical CSV.
+#
+#   python scripts/replay_ticks.py [journal.tkj] [--speed=N]   (N: 1 = real time, 0 = max)
+#
+# Risk checks, trades and market_data writes need the database (docker-compose); without it
+# they fail fast and show up as stage / writer errors.
+SPEED = 0.0
+STRATEGY = "lstm" # "lstm", "dummy" or "none"
+SYMBOLS = 20 # Synthetic journal: pseudo-symbols sharing the historical closes
+CANDLES = 300
+UPDATES_PER_CANDLE = 30 # Binance sends a partial kline every ~2 s
+SYNTHETIC_PATH = os.path.join(os.path.dirname(__file__), "../data/journals/synthetic.tkj")
+MODEL_PATH = os.path.join(os.path.dirname(__file__), "../app/ml/models/lstm_v1.pth")
+
+def synthesize(path: str):
+    """Journal of SYMBOLS x CANDLES 1m candles, each as UPDATES_PER_CANDLE partial updates."""
+    data_dir = os.path.join(os.path.dirname(__file__), "../data/historical")
+    files = sorted(f for f in os.listdir(data_dir) if f.endswith(".csv"))
+    df = pd.read_csv(os.path.join(data_dir, files[0])).tail(CANDLES)
+    if os.path.exists(path):
+        os.remove(path)
+    journal = TickJournal(path)
+    start_ms = 1769976000000
+    step_ms = 60000 // UPDATES_PER_CANDLE
+    for c, row in enumerate(df.itertuples()):
+        open_ms = start_ms + c * 60000
+        for u in range(UPDATES_PER_CANDLE):
+            part = (u + 1) / UPDATES_PER_CANDLE
+            close = row.open + (row.close - row.open) * part
+            for s in range(SYMBOLS):
+                symbol = f"S{s:03d}USDT"
+                event = {"e": "kline", "E": open_ms + (u + 1) * step_ms, "s": symbol, "k": {
+                    "t": open_ms, "T": open_ms + 59999, "s": symbol, "i": "1m",
+                    "o": f"{row.open:.2f}", "c": f"{close:.2f}", "h": f"{max(row.open, close):.2f}",
+                    "l": f"{min(row.open, close):.2f}", "v": f"{row.volume * part:.5f}",
+                    "x": u == UPDATES_PER_CANDLE - 1
+                }}
+                frame = json.dumps({"stream": f"{symbol.lower()}@kline_1m", "data": event}, separators=(",", ":"))
+                journal.append(frame, received_ns=(open_ms + (u + 1) * step_ms) * 1_000_000)
+    journal.close()
+    print(f"Synthetic journal: {journal.records} frames, {journal.bytes / 1e6:.1f} MB -> {path}")
+
+def register_strategies(keys):
+    from app.strategy.registry import strategy_registry
+    if STRATEGY == "lstm":
+        from app.strategy.implementations.lstm_strategy import LSTMStrategy as cls
+    elif STRATEGY == "dummy":
+        from app.strategy.implementations.dummy import DummyStrategy as cls
+    else:
+        return
+    strategy_registry.register_class(cls.__name__, cls)
+    for symbol, interval in keys:
+        strategy_registry.create_instance(cls.__name__, f"replay_{symbol}_{interval}", {
+            "symbol": symbol, "interval": interval, "model_path": MODEL_PATH, "seq_length": 60, "preload": False
+        })
+
+async def replay(path: str, speed: float):
+    from app.services.market_data import market_data_service
+    from app.services.market_writer import market_data_writer
+
+    reader = JournalReader(path)
+    server = ReplayServer(reader, speed)
+    await server.start()
+    keys = []
+    for name in server.streams:
+        symbol, _, interval = name.partition("@kline_")
+        keys.append((symbol.upper(), interval))
+    register_strategies(keys)
+    if not speed:
+        settings.INGEST_SOCKET_QUEUE_SIZE = 10 ** 9 # Queueing shows up as latency instead of a dropped connection
+    total = server.total
+    print(f"Replaying {total} frames of {len(keys)} streams at {'max' if not speed else f'{speed}x'} speed, strategy: {STRATEGY}")
+
+    async def process_kline(data):
+        pass
+
+    market_data_writer.start()
+    started = time.monotonic()
+    task = asyncio.create_task(market_data_service.start_kline_streams(keys, process_kline, url=server.url))
+    await server.finished.wait()
+    # Drained: every frame dispatched and every stage queue empty
+    while True:
+        mux = market_data_service.mux
+        dispatched = sum(s.messages for s in mux.stats.values()) if mux else 0
+        busy = any(stage.depth for stages in market_data_service.pipelines.values() for stage in stages.values())
+        if dispatched >= total and not busy:
+            break
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.05) # Handlers of the last items
+    elapsed = time.monotonic() - started
+    metrics = market_data_service.pipeline_metrics()
+
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    await market_data_writer.stop()
+    await server.stop()
+    report(metrics, total, elapsed)
+
+def report(metrics, total: int, elapsed: float):
+    print(f"\n{total} frames in {elapsed:.2f}s: {total / elapsed:,.0f} msgs/s end to end")
+    streams = metrics["streams"].values()
+    print(f"\n{'stage':<10} {'processed':>10} {'dropped':>8} {'coalesced':>10} {'errors':>7} "
+          f"{'lag p50':>8} {'lag p99':>8} {'lag max':>8}  (ms, worst stream)")
+    for name in ("decode", "risk", "strategy", "broadcast"):
+        stages = [s[name] for s in streams if name in s] # Risk runs on the displayed stream only
+        worst = lambda field, q: max((s[field][q] or 0.0) for s in stages)
+        print(f"{name:<10} {sum(s['processed'] for s in stages):>10} {sum(s['dropped'] for s in stages):>8} "
+              f"{sum(s['coalesced'] for s in stages):>10} {sum(s['errors'] for s in stages):>7} "
+              f"{worst('lag_ms', 'p50'):>8.2f} {worst('lag_ms', 'p99'):>8.2f} {worst('lag_ms', 'max'):>8.2f}")
+    signal = metrics["tick_to_signal_ms"]
+    if signal["p50"] is not None:
+        print(f"\ntick -> signal (closed candle received -> strategies decided): "
+              f"p50 {signal['p50']:.2f} ms, p99 {signal['p99']:.2f} ms, max {signal['max']:.2f} ms")
+    writer = metrics["market_data_writer"]
+    print(f"market_data writer: {writer['updates']} updates, {writer['flushes']} flushes, "
+          f"{writer['rows_written']} rows written, {writer['failures']} failed flushes")
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    speed = SPEED
+    for arg in sys.argv[1:]:
+        if arg.startswith("--speed="):
+            speed = float(arg.split("=", 1)[1])
+    path = args[0] if args else SYNTHETIC_PATH
+    if not args:
+        synthesize(path)
+    asyncio.run(replay(path, speed))
+
+if __name__ == "__main__":
+    main()
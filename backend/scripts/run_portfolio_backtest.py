@@ -0,0 +1,47 @@
+import sys
+import os
+import asyncio
+import pandas as pd
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
+
+from app.backtest.arrays import KlineArrays
+from app.backtest.portfolio import PortfolioBacktestEngine
+from app.strategy.implementations.lstm_strategy import LSTMStrategy
+
+INTERVAL = "15m"
+
+async def main():
+    # 1. Load every symbol downloaded for INTERVAL (files are <SYMBOL>_<interval>_<start>.csv)
+    data_dir = os.path.join(os.path.dirname(__file__), "../data/historical")
+    files = sorted(f for f in os.listdir(data_dir) if f.endswith(".csv") and f"_{INTERVAL}_" in f)
+    if not files:
+        print("No data found.")
+        return
+    
+    bars_by_symbol = {}
+    for f in files:
+        symbol = f.split("_")[0]
+        if symbol in bars_by_symbol:
+            continue # One file per symbol
+        print(f"Loading {symbol} from {f}")
+        bars_by_symbol[symbol] = KlineArrays.from_frame(pd.read_csv(os.path.join(data_dir, f)))
+    
+    # 2. Configure Strategy (symbol is set per instance by the engine)
+    config = {
+        "interval": INTERVAL,
+        "model_path": "app/ml/models/lstm_v1.pth",
+        "seq_length": 60,
+        "sl_percent": 2.0,
+        "tp_percent": 4.0
+    }
+    
+    # 3. Run all symbols in one pass with a shared cash balance
+    engine = PortfolioBacktestEngine(LSTMStrategy, config, initial_capital=10000.0)
+    report = await engine.run(bars_by_symbol)
+    for symbol, stats in report["symbols"].items():
+        print(f"  {symbol}: {stats['num_trades']} trades")
+
+if __name__ == "__main__":
+    asyncio.run(main())
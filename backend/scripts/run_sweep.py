@@ -0,0 +1,55 @@
+import sys
+import os
+import pandas as pd
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
+
+from app.backtest.arrays import KlineArrays
+from app.backtest.sweep import grid_space, random_space, sweep_backtest
+from app.strategy.implementations.lstm_strategy import LSTMStrategy
+
+# Parameter grid (every combination is backtested)
+GRID = {
+    "sl_percent": [1.0, 2.0, 3.0],
+    "tp_percent": [2.0, 4.0, 6.0],
+    "threshold": [1.0002, 1.0005, 1.001],
+}
+# Set to a number to sample that many random configurations instead of the full grid
+RANDOM_SAMPLES = None
+RANDOM_SPEC = {
+    "sl_percent": {"low": 0.5, "high": 5.0},
+    "tp_percent": {"low": 1.0, "high": 10.0},
+    "threshold": {"low": 1.0001, "high": 1.002},
+}
+RANK_BY = "sharpe"
+
+def main():
+    data_dir = os.path.join(os.path.dirname(__file__), "../data/historical")
+    files = [f for f in os.listdir(data_dir) if f.endswith(".csv")]
+    if not files:
+        print("No data found.")
+        return
+        
+    filepath = os.path.join(data_dir, files[0])
+    print(f"Loading data from {filepath}")
+    bars = KlineArrays.from_frame(pd.read_csv(filepath))
+    
+    config = {
+        "symbol": "BTCUSDT",
+        "interval": "15m",
+        "model_path": "app/ml/models/lstm_v1.pth",
+        "seq_length": 60
+    }
+    
+    if RANDOM_SAMPLES:
+        space = random_space(RANDOM_SPEC, RANDOM_SAMPLES, seed=42)
+    else:
+        space = grid_space(GRID)
+    print(f"Sweeping {len(space)} configurations...")
+    
+    table = sweep_backtest(LSTMStrategy, config, bars, space, rank_by=RANK_BY)
+    print(table.head(20).to_string(index=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import sys
+import os
+import pandas as pd
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
+
+from app.ml.search import DEFAULT_SEARCH_SPACE, DEFAULT_STUDY_DIR, run_search
+
+# Search budget
+N_TRIALS = 32
+MIN_EPOCHS = 1 # Rung 0 budget
+MAX_EPOCHS = 27 # Top rung budget
+ETA = 3 # Keep the best 1/ETA of each rung
+WORKERS = None # Defaults to one per core, torch threads split between them
+SEED = 0
+
+# Interrupted searches resume from here; delete it (or change STUDY_DIR) to start over
+STUDY_DIR = DEFAULT_STUDY_DIR
+SEARCH_SPACE = DEFAULT_SEARCH_SPACE
+
+def main():
+    data_dir = os.path.join(os.path.dirname(__file__), "../data/historical")
+    files = [f for f in os.listdir(data_dir) if f.endswith(".csv")]
+    if not files:
+        print("No historical data found! Run download_data.py first.")
+        return
+
+    filepath = os.path.join(data_dir, files[0])
+    print(f"Loading data from {filepath}")
+    table = run_search(
+        pd.read_csv(filepath), n_trials=N_TRIALS, space=SEARCH_SPACE,
+        min_epochs=MIN_EPOCHS, max_epochs=MAX_EPOCHS, eta=ETA,
+        workers=WORKERS, study_dir=STUDY_DIR, seed=SEED,
+    )
+    print(table.to_string(index=False))
+
+    finished = table[table["artifact"].notna()]
+    if len(finished):
+        best = finished.iloc[0]
+        print(f"\nBest trial {best['trial']}: val_loss {best['val_loss']:.6f}, bundle {best['artifact']}")
+        print("train_model.py constants: " + ", ".join(
+            f"{name.upper()} = {best[name]}" for name in SEARCH_SPACE))
+
+if __name__ == "__main__":
+    main()
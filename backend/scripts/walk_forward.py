@@ -0,0 +1,58 @@
+import sys
+import os
+import pandas as pd
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
+
+from app.backtest.arrays import KlineArrays
+from app.backtest.signals import DEFAULT_THRESHOLD
+from app.backtest.walk_forward import run_walk_forward
+
+# Fold layout (in bars)
+TRAIN_BARS = 1500
+TEST_BARS = 300
+STEP = None # Defaults to TEST_BARS
+ANCHORED = False # True = expanding training window
+
+# Training (same defaults as train_model.py)
+TRAIN_PARAMS = {
+    "seq_length": 60,
+    "hidden_dim": 64,
+    "num_layers": 2,
+    "epochs": 10,
+    "batch_size": 32,
+    "learning_rate": 0.001,
+}
+
+# Backtest risk settings for every test window
+BACKTEST_CONFIG = {
+    "sl_percent": 2.0,
+    "tp_percent": 4.0,
+    "threshold": DEFAULT_THRESHOLD,
+}
+
+def main():
+    data_dir = os.path.join(os.path.dirname(__file__), "../data/historical")
+    files = [f for f in os.listdir(data_dir) if f.endswith(".csv")]
+    if not files:
+        print("No data found.")
+        return
+        
+    filepath = os.path.join(data_dir, files[0])
+    print(f"Loading data from {filepath}")
+    bars = KlineArrays.from_frame(pd.read_csv(filepath))
+    
+    table = run_walk_forward(
+        bars, TRAIN_BARS, TEST_BARS, step=STEP, anchored=ANCHORED,
+        train_params=TRAIN_PARAMS, backtest_config=BACKTEST_CONFIG
+    )
+    print(table.to_string(index=False))
+    
+    # Out-of-sample summary (test windows are consecutive, so returns compound)
+    total = (1 + table["pnl_pct"] / 100).prod() - 1
+    print(f"\nOOS folds: {len(table)} | Compounded PnL: {total * 100:.2f}% | "
+          f"Mean Sharpe: {table['sharpe'].mean():.2f} | Worst Drawdown: {table['max_drawdown'].min():.2f}%")
+
+if __name__ == "__main__":
+    main()
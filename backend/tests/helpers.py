@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+
+# Synthetic market data shared by the test modules
+
+def random_closes(n: int, seed: int = 0) -> np.ndarray:
+    """Geometric random walk around 60000 (0.2% per bar)."""
+    rng = np.random.default_rng(seed)
+    return 60000 * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+
+def ohlcv_frame(close: np.ndarray, spread: float = 0.0) -> pd.DataFrame:
+    """OHLCV frame with open == close and high / low `spread` around it."""
+    return pd.DataFrame({
+        'close': close, 'open': close, 'high': close * (1 + spread),
+        'low': close * (1 - spread), 'volume': np.ones(len(close))
+    })
+
+def make_ohlcv(n: int = 400, seed: int = 0, spread: float = 0.0) -> pd.DataFrame:
+    return ohlcv_frame(random_closes(n, seed), spread)
+
+def make_klines(n: int = 800, seed: int = 0) -> list:
+    """Closed 1m candles in Binance list format (strings, as the REST API returns them)."""
+    start = 1700000000000
+    return [[start + i * 60000, str(c), str(c * 1.001), str(c * 0.999), str(c), "1.0", start + i * 60000 + 59999]
+            for i, c in enumerate(random_closes(n, seed))]
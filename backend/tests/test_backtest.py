@@ -0,0 +1,176 @@
+import sys
+import os
+import asyncio
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
+
+from app.backtest.engine import BacktestEngine
+from app.backtest.arrays import KlineArrays
+from app.backtest.metrics import StreamingMetrics
+from app.backtest.portfolio import PortfolioBacktestEngine
+from app.backtest.signals import threshold_signals
+from app.backtest.sweep import grid_space, random_space, run_sweep
+from app.backtest.walk_forward import make_folds
+from app.strategy.base import BaseStrategy
+from tests.helpers import random_closes
+
+def make_frame(n: int = 2000, seed: int = 0) -> pd.DataFrame:
+    close = random_closes(n, seed)
+    open_time = 1700000000000 + np.arange(n) * 60000
+    return pd.DataFrame({
+        0: open_time, 1: close, 2: close * 1.001, 3: close * 0.999,
+        4: close, 5: np.ones(n), 6: open_time + 59999
+    })
+
+class CrossStrategy(BaseStrategy):
+    """Buys above / sells below a fixed level. Signal only depends on the bar itself."""
+    LEVEL = 60000.0
+
+    async def on_tick(self, data):
+        if data.close_price > self.LEVEL * 1.01:
+            return {"action": "BUY", "symbol": data.symbol, "price": data.close_price, "reason": "CROSS"}
+        if data.close_price < self.LEVEL * 0.99:
+            return {"action": "SELL", "symbol": data.symbol, "price": data.close_price, "reason": "CROSS"}
+        return None
+
+    async def train(self, historical_data):
+        pass
+
+class VectorCrossStrategy(CrossStrategy):
+    def generate_signals(self, bars):
+        signals = np.zeros(len(bars), dtype=np.int8)
+        signals[bars.close > self.LEVEL * 1.01] = 1
+        signals[bars.close < self.LEVEL * 0.99] = -1
+        return signals
+
+    def describe_signal(self, index, action):
+        return "CROSS"
+
+def test_kline_arrays_from_csv_strings():
+    df = pd.DataFrame({
+        "open_time": ["2026-01-01 06:30:00"], "open": [1.0], "high": [2.0], "low": [0.5],
+        "close": [1.5], "volume": [10.0], "close_time": ["2026-01-01 06:44:59.999"]
+    })
+    bars = KlineArrays.from_frame(df)
+    assert bars.open_time[0] == 1767249000000
+    assert bars.close_time[0] == 1767249899999
+    kline = bars.kline(0, "BTCUSDT", "15m")
+    assert kline.close_time == pd.Timestamp("2026-01-01 06:44:59.999")
+    print("[OK] KlineArrays parses CSV date strings.")
+
+def test_vectorised_signals_match_on_tick():
+    df = make_frame()
+    config = {"symbol": "BTCUSDT", "interval": "1m", "sl_percent": 1.0, "tp_percent": 2.0, "record_equity": True}
+
+    tick_engine = BacktestEngine(CrossStrategy, config)
+    tick_report = asyncio.run(tick_engine.run(df))
+    vec_engine = BacktestEngine(VectorCrossStrategy, config)
+    vec_report = asyncio.run(vec_engine.run(df))
+
+    assert tick_report["num_trades"] > 0
+    assert tick_report["num_trades"] == vec_report["num_trades"]
+    assert np.isclose(tick_report["final_value"], vec_report["final_value"])
+    assert np.allclose(tick_engine.equity, vec_engine.equity)
+    assert len(tick_engine.equity) == len(df)
+    print(f"[OK] Columnar and on_tick paths agree ({tick_report['num_trades']} trades).")
+
+def test_sweep_matches_sequential_runs():
+    bars = KlineArrays.from_frame(make_frame(3000, seed=2))
+    # Stand-in for model output: next close plus noise
+    rng = np.random.default_rng(3)
+    predicted = np.roll(bars.close, -1) * (1 + rng.normal(0, 0.001, len(bars)))
+    space = grid_space({"sl_percent": [1.0, 2.0], "tp_percent": [2.0, 4.0], "threshold": [1.0005, 1.002]})
+    assert len(space) == 8
+    assert len(random_space({"threshold": {"low": 1.0, "high": 1.01}}, 5, seed=0)) == 5
+
+    table = run_sweep(bars.close, bars.close_time, predicted, space, workers=2, rank_by="pnl_pct")
+    assert list(table["rank"]) == list(range(1, 9))
+    assert table["pnl_pct"].is_monotonic_decreasing
+
+    for _, row in table.iterrows():
+        params = {k: row[k] for k in ("sl_percent", "tp_percent", "threshold")}
+        engine = BacktestEngine(None, params)
+        report = engine.simulate(bars.close, bars.close_time, threshold_signals(predicted, bars.close, params["threshold"]))
+        assert np.isclose(report["final_value"], row["final_value"])
+        assert report["num_trades"] == row["num_trades"]
+    print(f"[OK] Sweep of {len(space)} configurations matches sequential runs.")
+
+def test_streaming_metrics_match_batch():
+    rng = np.random.default_rng(4)
+    n = 50000
+    values = 10000 * np.exp(np.cumsum(rng.normal(0, 0.001, n)))
+    positions = (rng.random(n) > 0.5).astype(float)
+    metrics = StreamingMetrics(10000.0, max_points=100)
+    for i in range(n):
+        metrics.update(1700000000000 + i * 60000, values[i], values[i], positions[i])
+
+    cummax = np.maximum.accumulate(values)
+    ret = np.diff(values) / values[:-1]
+    assert np.isclose(metrics.max_drawdown, ((values - cummax) / cummax).min())
+    assert np.isclose(metrics.sharpe, ret.mean() / ret.std(ddof=1) * 525600 ** 0.5)
+    downside = np.sqrt(np.mean(np.minimum(ret, 0) ** 2))
+    assert np.isclose(metrics.sortino, ret.mean() / downside * 525600 ** 0.5)
+    assert np.isclose(metrics.exposure, positions.mean())
+
+    curve = metrics.curve()
+    assert 100 <= len(curve) <= 201
+    assert curve[-1]["value"] == values[-1]
+    print(f"[OK] Streaming metrics match batch computation ({len(curve)} curve points).")
+
+def test_portfolio_single_symbol_matches_engine():
+    df = make_frame(3000, seed=5)
+    bars = KlineArrays.from_frame(df)
+    config = {"symbol": "BTCUSDT", "interval": "1m", "sl_percent": 1.0, "tp_percent": 2.0}
+
+    single = asyncio.run(BacktestEngine(VectorCrossStrategy, config).run(df))
+    portfolio = asyncio.run(PortfolioBacktestEngine(VectorCrossStrategy, config).run({"BTCUSDT": bars}))
+
+    assert single["num_trades"] > 0
+    assert portfolio["num_trades"] == single["num_trades"]
+    assert np.isclose(portfolio["final_value"], single["final_value"])
+    assert np.isclose(portfolio["max_drawdown"], single["max_drawdown"])
+    # The basket price of a single symbol is its own close; only the last 10 trades are kept
+    assert np.allclose([p["price"] for p in portfolio["history"]], [p["price"] for p in single["history"]])
+    assert single["num_trades"] > 10 and len(single["trades"]) == len(portfolio["trades"]) == 10
+    assert [t["time"] for t in portfolio["trades"]] == [t["time"] for t in single["trades"]]
+    print("[OK] Single-symbol portfolio run matches BacktestEngine.")
+
+def test_portfolio_shares_cash_across_symbols():
+    symbols = {}
+    for i, seed in enumerate((6, 7, 8)):
+        bars = KlineArrays.from_frame(make_frame(1500, seed=seed))
+        # Drop a few bars so the symbols are misaligned
+        keep = np.ones(len(bars), dtype=bool)
+        keep[100 * (i + 1):100 * (i + 1) + 10] = False
+        symbols[f"SYM{i}USDT"] = KlineArrays(*(getattr(bars, f)[keep] for f in KlineArrays.__slots__))
+
+    config = {"interval": "1m", "sl_percent": 1.0, "tp_percent": 2.0}
+    engine = PortfolioBacktestEngine(VectorCrossStrategy, config)
+    report = asyncio.run(engine.run(symbols))
+
+    assert report["num_trades"] == sum(v["num_trades"] for v in report["symbols"].values())
+    assert all(v["num_trades"] > 0 for v in report["symbols"].values())
+    assert np.isfinite(report["final_value"])
+    assert all(np.isfinite(p["price"]) and p["price"] > 0 for p in report["history"])
+    print(f"[OK] Portfolio of {len(symbols)} symbols: {report['num_trades']} trades.")
+
+def test_walk_forward_folds():
+    folds = make_folds(1000, train_bars=400, test_bars=200)
+    assert [(f.train_start, f.train_end, f.test_start, f.test_end) for f in folds] == [
+        (0, 400, 400, 600), (200, 600, 600, 800), (400, 800, 800, 1000)
+    ]
+    anchored = make_folds(1000, train_bars=400, test_bars=200, anchored=True)
+    assert all(f.train_start == 0 for f in anchored)
+    assert make_folds(500, train_bars=400, test_bars=200) == []
+    print("[OK] Walk-forward folds are contiguous and non-overlapping.")
+
+if __name__ == "__main__":
+    test_kline_arrays_from_csv_strings()
+    test_vectorised_signals_match_on_tick()
+    test_sweep_matches_sequential_runs()
+    test_streaming_metrics_match_batch()
+    test_portfolio_single_symbol_matches_engine()
+    test_portfolio_shares_cash_across_symbols()
+    test_walk_forward_folds()
@@ -0,0 +1,132 @@
+import sys
+import os
+import asyncio
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
+
+from app.api.websockets import manager
+from app.schemas.market_data import BacktestJobResponse, BacktestResponse
+from app.services.backtest_jobs import BacktestJobManager
+
+def fake_history(n: int):
+    """Synthetic raw klines in Binance list format (fetch runs in the API process)."""
+    def fetch(symbol, interval, start_str):
+        start = 1700000000000
+        return [
+            [start + i * 60000, "100.0", "101.0", "99.0", str(100 + (i % 50) - 25), "1.0", start + i * 60000 + 59999]
+            for i in range(n)
+        ]
+    return fetch
+
+class RecordingSocket:
+    def __init__(self):
+        self.messages = []
+
+    async def send_json(self, message):
+        self.messages.append(message)
+
+REQUEST = {"symbol": "BTCUSDT", "interval": "1m", "start_str": "1 day ago UTC", "strategy_name": "DummyStrategy"}
+
+async def wait_for(job, statuses, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while job.status not in statuses:
+        assert time.monotonic() < deadline, f"job stuck in {job.status}"
+        await asyncio.sleep(0.05)
+
+def test_job_completes_and_reports_progress():
+    async def scenario():
+        socket = RecordingSocket()
+        manager.active_connections.append(socket)
+        jobs = BacktestJobManager(max_concurrent=1, max_pending=4, niceness=0, fetch_history=fake_history(50000))
+        try:
+            job = jobs.submit(REQUEST)
+            await wait_for(job, ("completed", "failed"))
+            assert job.status == "completed", job.error
+            assert job.result["num_trades"] > 0
+            assert job.to_dict(include_result=True)["result"] is job.result
+            record = BacktestJobResponse.model_validate(job.to_dict(include_result=True))
+            assert isinstance(record.result, BacktestResponse) and len(record.result.trades) <= 10
+        finally:
+            jobs.shutdown()
+            manager.active_connections.remove(socket)
+        updates = [m["data"] for m in socket.messages if m["type"] == "BACKTEST_JOB"]
+        assert updates[0]["status"] == "running" and updates[-1]["status"] == "completed"
+    asyncio.run(scenario())
+    print("[OK] Backtest job completes and broadcasts its status.")
+
+def test_jobs_queue_cancel_and_limits():
+    async def scenario():
+        jobs = BacktestJobManager(max_concurrent=1, max_pending=2, niceness=0, fetch_history=fake_history(500000))
+        try:
+            first = jobs.submit(REQUEST)
+            second = jobs.submit(REQUEST)
+            try:
+                jobs.submit(REQUEST)
+                assert False, "third job should be rejected"
+            except ValueError:
+                pass
+
+            # One slot: the second job waits until the first is done
+            await wait_for(first, ("running",))
+            assert second.status == "queued"
+            jobs.cancel(second.id)
+            await wait_for(second, ("cancelled",))
+
+            # Cancel the first one mid-simulation
+            deadline = time.monotonic() + 60
+            while first.stage != "simulating":
+                assert time.monotonic() < deadline
+                await asyncio.sleep(0.05)
+            jobs.cancel(first.id)
+            await wait_for(first, ("cancelled", "completed"))
+            assert first.status == "cancelled"
+        finally:
+            jobs.shutdown()
+    asyncio.run(scenario())
+    print("[OK] Backtest jobs queue, cancel and reject past the limit.")
+
+def test_sweep_runs_as_a_job():
+    async def scenario():
+        # Spawned workers read their settings from the environment: keep their prediction cache out of data/
+        os.environ["PREDICTION_CACHE_DIR"] = os.path.join(cache_dir, "prediction_cache")
+        jobs = BacktestJobManager(max_concurrent=1, max_pending=4, niceness=0, sweep_workers=2,
+                                  fetch_history=fake_history(3000))
+        space = [{"sl_percent": sl, "threshold": threshold} for sl in (1.0, 2.0) for threshold in (1.0002, 1.001)]
+        try:
+            job = jobs.submit({**REQUEST, "strategy_name": "LSTMStrategy", "rank_by": "pnl_pct", "workers": 64},
+                              space=space)
+            unsupported = jobs.submit(REQUEST, space=space) # DummyStrategy has no batch inference
+            await wait_for(job, ("completed", "failed"), timeout=180)
+            await wait_for(unsupported, ("completed", "failed"))
+        finally:
+            jobs.shutdown()
+            del os.environ["PREDICTION_CACHE_DIR"]
+        assert job.status == "completed", job.error
+        assert job.to_dict()["kind"] == "sweep" and job.result["num_runs"] == len(space)
+        pnl = [row["pnl_pct"] for row in job.result["results"]]
+        assert pnl == sorted(pnl, reverse=True)
+        assert unsupported.status == "failed" and "predict_batch" in unsupported.error
+    with tempfile.TemporaryDirectory() as cache_dir:
+        asyncio.run(scenario())
+    print("[OK] Parameter sweeps run as backtest jobs.")
+
+def test_job_model_in_openapi():
+    from fastapi import FastAPI
+    from app.api.endpoints import router
+
+    app = FastAPI()
+    app.include_router(router)
+    spec = app.openapi()
+    schemas = spec["components"]["schemas"]
+    assert {"BacktestJobResponse", "BacktestResponse", "SweepResponse"} <= set(schemas)
+    ok = spec["paths"]["/backtest/jobs/{job_id}"]["get"]["responses"]["200"]
+    assert ok["content"]["application/json"]["schema"]["$ref"].endswith("/BacktestJobResponse")
+    print("[OK] Backtest job and report models are documented in OpenAPI.")
+
+if __name__ == "__main__":
+    test_job_completes_and_reports_progress()
+    test_jobs_queue_cancel_and_limits()
+    test_sweep_runs_as_a_job()
+    test_job_model_in_openapi()
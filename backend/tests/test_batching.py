@@ -0,0 +1,96 @@
+import sys
+import os
+import asyncio
+import numpy as np
+import torch
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
+
+from app.ml.batching import InferenceBatcher
+from app.ml.features import FEATURE_COLUMNS
+from app.ml.networks import LSTMNetwork
+from app.ml.runtime import InferenceRuntime
+
+SEQ_LENGTH = 60
+
+def make_runtime(seed: int) -> InferenceRuntime:
+    torch.manual_seed(seed)
+    return InferenceRuntime(LSTMNetwork(len(FEATURE_COLUMNS), 16, 1, 2).eval())
+
+def test_concurrent_requests_share_forward_pass():
+    runtimes = [make_runtime(0), make_runtime(1)] # Two model versions
+    rng = np.random.default_rng(0)
+    windows = [rng.random((SEQ_LENGTH, len(FEATURE_COLUMNS)), dtype=np.float32) for _ in range(6)]
+    requests = [(runtimes[i % 2], window) for i, window in enumerate(windows)]
+    expected = [runtime.predict(window[None])[0] for runtime, window in requests]
+
+    batcher = InferenceBatcher(max_batch=64, max_wait_ms=5)
+    async def run():
+        return await asyncio.gather(*(batcher.predict(runtime, window) for runtime, window in requests))
+    results = asyncio.run(run())
+
+    for result, reference in zip(results, expected):
+        assert np.allclose(result, reference, rtol=1e-5, atol=1e-7)
+    metrics = batcher.metrics()
+    assert metrics["requests"] == 6
+    assert metrics["batches"] == 2 # One forward pass per model
+    assert metrics["max_batch_size"] == 3
+    assert metrics["queue_wait_ms"]["p50"] is not None and metrics["pending"] == 0
+    print("[OK] Concurrent requests are batched per model and get their own rows.")
+
+def test_full_batch_and_errors():
+    runtime = make_runtime(0)
+    window = np.zeros((SEQ_LENGTH, len(FEATURE_COLUMNS)), dtype=np.float32)
+    # A long deadline: a full batch must not wait for it
+    batcher = InferenceBatcher(max_batch=4, max_wait_ms=10_000)
+    async def full():
+        return await asyncio.wait_for(asyncio.gather(*(batcher.predict(runtime, window) for _ in range(4))), 5)
+    assert len(asyncio.run(full())) == 4
+    assert batcher.metrics()["batches"] == 1
+
+    # Same loop iteration only; a failing forward pass reaches every caller of that batch
+    batcher = InferenceBatcher(max_batch=64, max_wait_ms=0)
+    bad = np.zeros((SEQ_LENGTH, 3), dtype=np.float32) # Wrong feature count
+    async def failing():
+        return await asyncio.gather(*(batcher.predict(runtime, bad) for _ in range(3)), return_exceptions=True)
+    errors = asyncio.run(failing())
+    assert len(errors) == 3 and all(isinstance(e, Exception) for e in errors)
+    assert batcher.metrics()["batches"] == 1
+    print("[OK] Full batches run immediately and errors reach every caller.")
+
+class InputRecorder:
+    """Runtime stand-in keeping the batches it was handed (the input path only)."""
+    backend = "recorder"
+
+    def __init__(self):
+        self.model = self
+        self.batches = []
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        self.batches.append(batch)
+        return batch[:, -1, :1].copy()
+
+def test_batches_are_built_without_copies():
+    runtime = InputRecorder()
+    rng = np.random.default_rng(0)
+    windows = [rng.random((SEQ_LENGTH, len(FEATURE_COLUMNS)), dtype=np.float32) for _ in range(3)]
+    batcher = InferenceBatcher(max_batch=3, max_wait_ms=0)
+    async def run():
+        alone = await batcher.predict(runtime, windows[0])
+        rounds = [await asyncio.gather(*(batcher.predict(runtime, w) for w in windows)) for _ in range(2)]
+        return alone, rounds
+    alone, rounds = asyncio.run(run())
+
+    # A lone request is a view of the caller's window
+    assert np.shares_memory(runtime.batches[0], windows[0]) and alone[0] == windows[0][-1, 0]
+    # Larger batches reuse one preallocated array, with every window in its own row
+    assert runtime.batches[1].__array_interface__["data"][0] == runtime.batches[2].__array_interface__["data"][0]
+    assert not any(np.shares_memory(runtime.batches[1], w) for w in windows)
+    for result in rounds:
+        assert [r[0] for r in result] == [w[-1, 0] for w in windows]
+    print("[OK] Batch of one is a view, larger batches reuse a preallocated array.")
+
+if __name__ == "__main__":
+    test_concurrent_requests_share_forward_pass()
+    test_full_batch_and_errors()
+    test_batches_are_built_without_copies()
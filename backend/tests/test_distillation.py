@@ -0,0 +1,121 @@
+import sys
+import os
+import asyncio
+import tempfile
+import numpy as np
+import torch
+from sklearn.preprocessing import MinMaxScaler
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
+
+from app.ml.artifacts import load_artifact, save_artifact
+from app.ml.distillation import distill, load_student, save_student, teacher_predictions
+from app.ml.features import FeatureEngineer, FEATURE_COLUMNS
+from app.ml.networks import LSTMNetwork
+from app.ml.online_features import OnlineFeatureEngine
+from app.schemas.market_data import Kline
+from app.strategy.implementations.lstm_strategy import LSTMStrategy
+from tests.helpers import make_ohlcv
+
+SEQ_LENGTH = 30
+BUFFER_SIZE = 100
+
+def test_student_matches_live_path_and_roundtrips():
+    torch.manual_seed(0)
+    df = make_ohlcv(700, seed=3, spread=0.001)
+    features = FeatureEngineer.add_technical_indicators(df)[FEATURE_COLUMNS].values
+    with tempfile.TemporaryDirectory() as tmp:
+        bundle = os.path.join(tmp, "bundle.pt")
+        legacy = os.path.join(tmp, "legacy.pth")
+        model = LSTMNetwork(len(FEATURE_COLUMNS), 16, 1, 2).eval()
+        save_artifact(bundle, model, MinMaxScaler().fit(features), SEQ_LENGTH)
+        torch.save(model.state_dict(), legacy)
+
+        for path, history in ((bundle, 4), (legacy, BUFFER_SIZE - 49)):
+            artifact = load_artifact(path)
+            student, report = distill(artifact, df, lags=4, hidden_dim=8, epochs=3, buffer_size=BUFFER_SIZE,
+                                      seq_length=SEQ_LENGTH, log=lambda msg: None, latency_iterations=20)
+            assert student.history == history
+            assert 0.0 <= report["signal_agreement"] <= 1.0 and report["bars"] > 0
+            assert report["student_p50_us"] > 0 and report["teacher_p50_us"] > 0
+
+            # Backtest series == per-candle live path on the online feature engine
+            series = student.predict_series(df, BUFFER_SIZE)
+            assert np.isnan(series[:BUFFER_SIZE - 1]).all()
+            engine = OnlineFeatureEngine(history=BUFFER_SIZE)
+            for t, price in enumerate(df['close']):
+                engine.update(float(price))
+                if t >= BUFFER_SIZE - 1 and t % 25 == 0:
+                    live = student.predict_close(engine.last_rows(student.history))
+                    assert np.isclose(live, series[t], rtol=1e-9)
+
+            save_student(os.path.join(tmp, "student.pt"), student)
+            loaded = load_student(os.path.join(tmp, "student.pt"))
+            assert loaded.fingerprint == student.fingerprint and loaded.teacher == artifact.fingerprint
+            assert np.allclose(loaded.predict_series(df, BUFFER_SIZE), series, equal_nan=True)
+    print("[OK] Distilled student: batch and live paths agree, bundle round-trips.")
+
+def test_strategy_serves_student_and_monitors_teacher():
+    torch.manual_seed(0)
+    df = make_ohlcv(700, seed=3, spread=0.001)
+    features = FeatureEngineer.add_technical_indicators(df)[FEATURE_COLUMNS].values
+    buffer_size = 150 # LSTMStrategy's tick buffer
+    with tempfile.TemporaryDirectory() as tmp:
+        bundle = os.path.join(tmp, "bundle.pt")
+        save_artifact(bundle, LSTMNetwork(len(FEATURE_COLUMNS), 16, 1, 2).eval(),
+                      MinMaxScaler().fit(features), SEQ_LENGTH)
+        artifact = load_artifact(bundle)
+        student, _ = distill(artifact, df, lags=4, hidden_dim=8, epochs=3, buffer_size=buffer_size,
+                             seq_length=SEQ_LENGTH, log=lambda msg: None, latency_iterations=20)
+        save_student(os.path.join(tmp, "student.pt"), student)
+        strategy = LSTMStrategy("student", {
+            "symbol": "BTCUSDT", "model_path": bundle, "student_path": os.path.join(tmp, "student.pt"),
+            "preload": False, "batch_inference": False
+        })
+    assert strategy.student.fingerprint == student.fingerprint and strategy.runtime is not None
+    assert strategy.model_hash.endswith(f":student:{student.fingerprint}")
+
+    served = student.predict_series(df, buffer_size)
+    teacher = teacher_predictions(artifact, df, buffer_size, SEQ_LENGTH)
+    def candle(t: int) -> Kline:
+        open_ms = 1700000000000 + t * 60000
+        close = float(df['close'].iloc[t])
+        return Kline("BTCUSDT", "1m", open_ms, close, close, close, close, 1.0, open_ms + 59999, True)
+
+    async def scenario():
+        for t in range(buffer_size - 1):
+            await strategy.on_tick(candle(t))
+        assert strategy._teacher_task is None
+
+        # Two candles without yielding: the second is decided while the first teacher run is pending
+        t = buffer_size - 1
+        await strategy.on_tick(candle(t))
+        first = strategy._teacher_task
+        await strategy.on_tick(candle(t + 1))
+        assert strategy._teacher_task is first and not first.done()
+        await first
+        assert len(strategy.teacher_monitor) == 1
+
+        # One teacher run per candle once each has finished
+        compared = [t]
+        for t in range(buffer_size + 1, buffer_size + 60):
+            agreement = strategy.surrogate_stats()["signal_agreement"]
+            await strategy.on_tick(candle(t))
+            # The decision is the student's; agreement shown is the monitor's before this candle
+            assert np.isclose(strategy.last_indicators["predicted_price"], served[t], rtol=1e-9)
+            assert strategy.last_indicators["teacher_agreement"] == agreement
+            await strategy._teacher_task
+            compared.append(t)
+
+        stats = strategy.surrogate_stats()
+        assert stats["compared"] == len(compared) == len(strategy.teacher_monitor)
+        errors = [error for _, error in strategy.teacher_monitor]
+        expected = np.log(served[compared] / teacher[compared]) * 1e4
+        assert np.allclose(errors, expected, rtol=1e-4, atol=1e-3)
+        assert np.isclose(stats["mae_bps"], np.mean(np.abs(expected)), rtol=1e-4, atol=1e-3)
+    asyncio.run(scenario())
+    print("[OK] LSTMStrategy serves the student and monitors the teacher one candle at a time.")
+
+if __name__ == "__main__":
+    test_student_matches_live_path_and_roundtrips()
+    test_strategy_serves_student_and_monitors_teacher()
@@ -0,0 +1,259 @@
+import sys
+import os
+import tempfile
+import tracemalloc
+import numpy as np
+import pandas as pd
+import torch
+from sklearn.preprocessing import MinMaxScaler
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
+
+from app.ml.networks import LSTMNetwork
+from app.ml.features import FeatureEngineer, FEATURE_COLUMNS, INDICATOR_WARMUP
+from app.ml.inference import WindowBuffer, minmax_params, prepare_online_window, prepare_window, predict_series
+from app.ml.online_features import OnlineFeatureEngine
+from app.ml.artifacts import load_artifact, save_artifact
+from app.ml.runtime import InferenceRuntime, export_artifact, export_path
+import app.ml.runtime as runtime_module
+from app.ml.streaming import StreamingLSTM
+from tests.helpers import ohlcv_frame, random_closes
+
+SEQ_LENGTH = 60
+BUFFER_SIZE = 150
+
+def make_ohlcv(n: int = 400, seed: int = 1) -> pd.DataFrame:
+    close = random_closes(n, seed)
+    close[250:270] = close[250] # Flat stretch -> NaN RSI rows inside some buffers
+    return ohlcv_frame(close, spread=0.001)
+
+def tick_predictions(model, df: pd.DataFrame, scaler=None) -> np.ndarray:
+    """Reference: the per-candle on_tick pipeline, one buffer at a time."""
+    out = np.full(len(df), np.nan)
+    with torch.no_grad():
+        for t in range(BUFFER_SIZE - 1, len(df)):
+            buffer = df.iloc[t - BUFFER_SIZE + 1:t + 1].reset_index(drop=True)
+            prepared = prepare_window(buffer, SEQ_LENGTH, scaler)
+            if prepared is None:
+                continue
+            input_scaled, scale, min_, _ = prepared
+            pred = model(torch.FloatTensor(input_scaled).unsqueeze(0)).item()
+            out[t] = (pred - min_[0]) / scale[0]
+    return out
+
+def test_predict_series_matches_tick_path():
+    torch.manual_seed(0)
+    model = LSTMNetwork(5, 16, 1, 2)
+    model.eval()
+    df = make_ohlcv()
+
+    expected = tick_predictions(model, df)
+    batched = predict_series(model, df, SEQ_LENGTH, BUFFER_SIZE, batch_size=64)
+
+    assert np.array_equal(np.isnan(expected), np.isnan(batched))
+    assert np.isnan(batched[:BUFFER_SIZE - 1]).all()
+    assert np.allclose(expected, batched, rtol=1e-6, equal_nan=True)
+    print(f"[OK] Batched predictions match the tick path on {np.isfinite(batched).sum()} bars.")
+
+def test_predict_series_with_training_scaler():
+    torch.manual_seed(0)
+    model = LSTMNetwork(5, 16, 1, 2)
+    model.eval()
+    df = make_ohlcv()
+    features = FeatureEngineer.add_technical_indicators(df)[FEATURE_COLUMNS].to_numpy()
+    scaler = minmax_params(features) # Fit once on the whole history, as in training
+
+    expected = tick_predictions(model, df, scaler)
+    batched = predict_series(model, df, SEQ_LENGTH, BUFFER_SIZE, batch_size=64, scaler=scaler)
+    assert np.array_equal(np.isnan(expected), np.isnan(batched))
+    assert np.allclose(expected, batched, rtol=1e-6, equal_nan=True)
+
+    engine = OnlineFeatureEngine(history=BUFFER_SIZE)
+    for t, close in enumerate(df['close']):
+        engine.update(close)
+        prepared = prepare_online_window(engine, BUFFER_SIZE, SEQ_LENGTH, scaler)
+        if prepared is not None:
+            assert prepared[1] is scaler[0] # Fixed scaler, nothing fitted
+    print("[OK] Fixed training scaler gives the same batch and tick predictions.")
+
+def test_online_features_match_pandas():
+    df = make_ohlcv(n=20000)
+    df.loc[5000:5100, 'close'] = df['close'][5000] # Long flat stretch: zero std, NaN RSI
+    engine = OnlineFeatureEngine(history=BUFFER_SIZE)
+    online = np.array([engine.update(c).copy() for c in df['close']])
+
+    expected = FeatureEngineer.add_technical_indicators(df)[FEATURE_COLUMNS]
+    expected = expected.reindex(range(len(df))).to_numpy()
+    # Rows pandas keeps must match; rows it drops after the sma_50 warm-up must hold a NaN
+    kept = ~np.isnan(expected).any(axis=1)
+    dropped = ~kept & (np.arange(len(df)) >= INDICATOR_WARMUP)
+    assert np.allclose(online[kept], expected[kept], rtol=1e-9, atol=1e-9)
+    assert dropped[5050] and np.isnan(online[dropped]).any(axis=1).all()
+    assert np.array_equal(engine.last_rows(BUFFER_SIZE), online[-BUFFER_SIZE:])
+    assert np.array_equal(engine.latest(), online[-1])
+    print("[OK] Online indicators match the pandas batch version.")
+
+def test_prepare_online_window_matches_prepare_window():
+    df = make_ohlcv()
+    engine = OnlineFeatureEngine(history=BUFFER_SIZE)
+    for t, close in enumerate(df['close']):
+        engine.update(close)
+        online = prepare_online_window(engine, BUFFER_SIZE, SEQ_LENGTH)
+        if t < BUFFER_SIZE - 1:
+            assert online is None
+            continue
+        batch = prepare_window(df.iloc[t - BUFFER_SIZE + 1:t + 1].reset_index(drop=True), SEQ_LENGTH)
+        assert (online is None) == (batch is None)
+        if batch is not None:
+            for a, b in zip(online, batch[:3]):
+                assert np.allclose(a, b, rtol=1e-9, atol=1e-9)
+    print("[OK] Online tick windows match prepare_window.")
+
+def test_streaming_step_matches_longer_window():
+    torch.manual_seed(0)
+    model = LSTMNetwork(5, 16, 1, 2)
+    model.eval()
+    rows = np.random.default_rng(3).uniform(size=(SEQ_LENGTH + 5, 5))
+    scale, min_ = np.ones(5), np.zeros(5) # Identity scaler: steps see the same inputs as the window
+
+    stream = StreamingLSTM(model, resync_every=100)
+    stream.sync(rows[:SEQ_LENGTH], scale, min_)
+    for t in range(SEQ_LENGTH, len(rows)):
+        streamed = stream.step(rows[t])
+        with torch.no_grad():
+            full = model(torch.FloatTensor(rows[:t + 1]).unsqueeze(0)).item()
+        assert abs(streamed - full) < 1e-5
+    print("[OK] Streaming steps match the full forward pass.")
+
+def test_streaming_resync_every_candle_is_windowed():
+    torch.manual_seed(0)
+    model = LSTMNetwork(5, 16, 1, 2)
+    model.eval()
+    df = make_ohlcv()
+    expected = tick_predictions(model, df)
+    engine = OnlineFeatureEngine(history=BUFFER_SIZE)
+    stream = StreamingLSTM(model, resync_every=1)
+    for t, close in enumerate(df['close']):
+        engine.update(close)
+        prepared = prepare_online_window(engine, BUFFER_SIZE, SEQ_LENGTH)
+        if prepared is None:
+            continue
+        assert stream.needs_sync
+        predicted = stream.invert(stream.sync(*prepared))
+        assert np.isclose(predicted, expected[t], rtol=1e-6)
+    print("[OK] Streaming with resync_every=1 equals the windowed path.")
+
+def test_exported_runtime_matches_eager():
+    torch.manual_seed(0)
+    model = LSTMNetwork(len(FEATURE_COLUMNS), 16, 1, 2).eval()
+    df = make_ohlcv()
+    features = FeatureEngineer.add_technical_indicators(df)[FEATURE_COLUMNS].values
+    scaler = MinMaxScaler().fit(features)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bundle.pt")
+        save_artifact(path, model, scaler, SEQ_LENGTH)
+        assert load_artifact(path).runtime.backend == "eager" # Nothing exported yet
+
+        artifact = load_artifact(path)
+        assert export_artifact(artifact) == export_path(path)
+        runtime = load_artifact(path).runtime
+        assert runtime.backend == "torchscript"
+        runtime.warmup(SEQ_LENGTH)
+        expected = predict_series(model, df, SEQ_LENGTH, BUFFER_SIZE, batch_size=64, scaler=artifact.scaler)
+        predicted = predict_series(runtime, df, SEQ_LENGTH, BUFFER_SIZE, batch_size=64, scaler=artifact.scaler)
+        assert np.array_equal(np.isnan(predicted), np.isnan(expected))
+        assert np.allclose(predicted, expected, rtol=1e-6, equal_nan=True)
+
+        # Retrained bundle, stale export: the runtime must not use the old graph
+        torch.manual_seed(1)
+        save_artifact(path, LSTMNetwork(len(FEATURE_COLUMNS), 16, 1, 2), scaler, SEQ_LENGTH)
+        assert load_artifact(path).runtime.backend == "eager"
+    print("[OK] Exported runtime matches eager and ignores stale exports.")
+
+def test_quantized_runtime():
+    torch.manual_seed(0)
+    model = LSTMNetwork(len(FEATURE_COLUMNS), 16, 1, 2).eval()
+    df = make_ohlcv()
+    features = FeatureEngineer.add_technical_indicators(df)[FEATURE_COLUMNS].values
+    scaler = MinMaxScaler().fit(features)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bundle.pt")
+        save_artifact(path, model, scaler, SEQ_LENGTH)
+        artifact = load_artifact(path)
+        export_artifact(artifact) # float32 export only: int8 is quantized in memory
+        assert artifact.get_runtime(quantized=True).backend == "eager-int8"
+        assert artifact.get_runtime().backend == "torchscript"
+
+        assert export_artifact(artifact, quantized=True) == export_path(path, quantized=True)
+        artifact = load_artifact(path)
+        # The .int8.ts export is served as is: no quantization pass at load
+        quantize, calls = runtime_module.quantize_dynamic, []
+        runtime_module.quantize_dynamic = lambda m: calls.append(m) or quantize(m)
+        try:
+            runtime = artifact.get_runtime(quantized=True)
+        finally:
+            runtime_module.quantize_dynamic = quantize
+        assert runtime.backend == "torchscript-int8" and not calls
+        expected = predict_series(model, df, SEQ_LENGTH, BUFFER_SIZE, scaler=artifact.scaler)
+        quantized = predict_series(runtime, df, SEQ_LENGTH, BUFFER_SIZE, scaler=artifact.scaler)
+        in_memory = predict_series(InferenceRuntime(model, quantized=True), df, SEQ_LENGTH, BUFFER_SIZE,
+                                   scaler=artifact.scaler)
+        assert np.array_equal(np.isnan(quantized), np.isnan(expected))
+        assert np.allclose(quantized, expected, rtol=1e-2, equal_nan=True)
+        assert not np.allclose(quantized, expected, rtol=1e-9, equal_nan=True) # Really int8
+        assert np.allclose(in_memory, quantized, equal_nan=True)
+    print("[OK] int8 runtime stays close to float32 with and without an export.")
+
+def test_window_buffer_in_place():
+    df = make_ohlcv(600)
+    features = FeatureEngineer.add_technical_indicators(df)[FEATURE_COLUMNS].values
+    fixed = minmax_params(features)
+    for scaler in (None, fixed):
+        engine = OnlineFeatureEngine(history=BUFFER_SIZE)
+        buffer = WindowBuffer(SEQ_LENGTH, BUFFER_SIZE)
+        address = buffer.tensor.data_ptr()
+        for t, close in enumerate(df['close']):
+            engine.update(float(close))
+            expected = prepare_online_window(engine, BUFFER_SIZE, SEQ_LENGTH, scaler)
+            filled = buffer.fill(engine, scaler)
+            if expected is None:
+                assert filled is None
+                continue
+            # Same values as the float32 input the allocating path fed to torch (incl. NaN-row buffers)
+            assert np.array_equal(filled[0], expected[0].astype(np.float32))
+            assert np.array_equal(filled[1], expected[1]) and np.array_equal(filled[2], expected[2])
+        assert buffer.tensor.data_ptr() == address
+        assert torch.equal(buffer.tensor[0], torch.from_numpy(filled[0]))
+
+    # Steady state: no per-tick array buffers, i.e. traced memory does not grow with the window
+    def per_tick(seq_length: int, buffer_size: int) -> float:
+        engine = OnlineFeatureEngine(history=buffer_size)
+        buffer = WindowBuffer(seq_length, buffer_size)
+        closes = random_closes(600, seed=2).tolist() # No NaN rows
+        for close in closes[:buffer_size + 20]:
+            engine.update(close)
+            buffer.fill(engine)
+        peaks = []
+        tracemalloc.start()
+        for close in closes[buffer_size + 20:buffer_size + 120]:
+            engine.update(close)
+            base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            buffer.fill(engine)
+            peaks.append(tracemalloc.get_traced_memory()[1] - base)
+        tracemalloc.stop()
+        return float(np.median(peaks))
+    small, large = per_tick(30, 100), per_tick(240, 330)
+    assert large - small < 256 and large < 240 * len(FEATURE_COLUMNS) * 4
+    print("[OK] WindowBuffer fills the shared float32 tensor in place, identical to prepare_online_window.")
+
+if __name__ == "__main__":
+    test_predict_series_matches_tick_path()
+    test_predict_series_with_training_scaler()
+    test_online_features_match_pandas()
+    test_prepare_online_window_matches_prepare_window()
+    test_streaming_step_matches_longer_window()
+    test_streaming_resync_every_candle_is_windowed()
+    test_exported_runtime_matches_eager()
+    test_quantized_runtime()
+    test_window_buffer_in_place()
@@ -0,0 +1,99 @@
+import sys
+import os
+import asyncio
+from datetime import datetime
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
+
+from app.schemas.market_data import Kline, KlineData
+from app.services.market_writer import row_from_kline, upsert_statement
+from app.services.trade_executor import TradeExecutor
+
+EVENT = {"e": "kline", "E": 1769976061234, "s": "BTCUSDT", "k": {
+    "t": 1769976000000, "T": 1769976059999, "s": "BTCUSDT", "i": "1m", "f": 100, "L": 200,
+    "o": "78636.81", "c": "78640.10", "h": "78650.00", "l": "78630.55", "v": "12.34500000",
+    "n": 100, "x": False, "q": "970000.1", "V": "6.1", "Q": "480000.2", "B": "0"
+}}
+
+def test_kline_decode_matches_pydantic_path():
+    kline = Kline.from_event(EVENT)
+    k = EVENT['k']
+    # Previous per-message decode
+    expected = KlineData(
+        symbol=EVENT['s'], interval=k['i'],
+        open_time=datetime.fromtimestamp(k['t'] / 1000),
+        open_price=float(k['o']), high_price=float(k['h']), low_price=float(k['l']),
+        close_price=float(k['c']), volume=float(k['v']),
+        close_time=datetime.fromtimestamp(k['T'] / 1000), is_closed=k['x']
+    )
+    assert kline.to_model() == expected
+    for field in KlineData.model_fields:
+        assert getattr(kline, field) == getattr(expected, field), field
+    assert kline.tick_message() == {"type": "TICK", "data": {
+        "symbol": "BTCUSDT", "price": 78640.10, "volume": 12.345, "time": expected.close_time.isoformat()
+    }}
+    assert not hasattr(kline, "__dict__") and kline.close_time_ms == 1769976059999
+    print("[OK] Kline.from_event matches the KlineData decode, TICK message unchanged.")
+
+def legacy_tick_message(data_point: KlineData):
+    # TICK payload as the ingestion callback built it from KlineData
+    return {
+        "type": "TICK",
+        "data": {
+            "symbol": data_point.symbol,
+            "price": data_point.close_price,
+            "volume": data_point.volume,
+            "time": data_point.close_time.isoformat()
+        }
+    }
+
+def test_times_and_tick_message_field_by_field():
+    # Whole seconds (isoformat drops the microseconds), .999 and .001 ms remainders
+    for open_ms, close_ms, closed in ((1769976000000, 1769976060000, True),
+                                      (1769976000000, 1769976059999, False),
+                                      (1700000000001, 1700000059999, True)):
+        event = {**EVENT, "k": {**EVENT["k"], "t": open_ms, "T": close_ms, "x": closed}}
+        kline = Kline.from_event(event)
+        assert kline.open_time == datetime.fromtimestamp(open_ms / 1000)
+        assert kline.close_time == datetime.fromtimestamp(close_ms / 1000)
+        new, old = kline.tick_message(), legacy_tick_message(kline.to_model())
+        assert new["type"] == old["type"] and new["data"].keys() == old["data"].keys()
+        for field, value in old["data"].items():
+            assert new["data"][field] == value and type(new["data"][field]) is type(value), field
+        assert new["data"]["time"] == datetime.fromtimestamp(close_ms / 1000).isoformat()
+    print("[OK] Kline times match datetime.fromtimestamp, TICK payload matches field by field.")
+
+def test_kline_feeds_writer_rows_and_risk_check():
+    kline = Kline.from_event({**EVENT, "k": {**EVENT["k"], "x": True}})
+
+    # market_data row: same values as from KlineData, and a valid upsert statement
+    row = row_from_kline(kline)
+    assert row == row_from_kline(kline.to_model())
+    assert isinstance(row["time"], datetime) and row["time"] == kline.close_time
+    from sqlalchemy.dialects import postgresql
+    params = upsert_statement([row]).compile(dialect=postgresql.dialect()).params
+    assert params["time_m0"] == kline.close_time and params["close_m0"] == kline.close_price
+
+    # Risk stage call with the Kline fields: the closed candle's tick is recorded when SL/TP fires
+    calls = []
+    async def check(current_price, symbol):
+        calls.append((current_price, symbol))
+        return {"action": "SELL", "reason": "STOP_LOSS"}
+    internal = TradeExecutor._check_risk_management
+    TradeExecutor._check_risk_management = staticmethod(check)
+    TradeExecutor._lock, TradeExecutor._risk_ticks = None, {}
+    try:
+        trade = asyncio.run(TradeExecutor.check_risk_management(
+            kline.close_price, kline.symbol, kline.close_time_ms if kline.is_closed else None
+        ))
+    finally:
+        TradeExecutor._check_risk_management = internal
+    assert trade and calls == [(78640.10, "BTCUSDT")]
+    assert TradeExecutor._risk_ticks == {"BTCUSDT": 1769976059999}
+    TradeExecutor._lock, TradeExecutor._risk_ticks = None, {}
+    print("[OK] Kline is accepted by row_from_kline / upsert_statement and the risk check.")
+
+if __name__ == "__main__":
+    test_kline_decode_matches_pydantic_path()
+    test_times_and_tick_message_field_by_field()
+    test_kline_feeds_writer_rows_and_risk_check()
@@ -0,0 +1,105 @@
+import sys
+import os
+import asyncio
+from sqlalchemy.dialects import postgresql
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
+
+from app.schemas.market_data import Kline
+from app.services.market_writer import MarketDataWriter, upsert_statement
+
+START_MS = 1769976000000
+
+def kline(symbol: str, minute: int, second: int, price: float) -> Kline:
+    open_time = START_MS + minute * 60000
+    return Kline(symbol, "1m", open_time, 100.0, max(100.0, price), min(100.0, price), price,
+                 float(second), open_time + 59999, second == 58)
+
+def test_coalesces_partial_candles_into_one_upsert():
+    async def run():
+        writes = []
+        async def write(rows):
+            writes.append(rows)
+
+        writer = MarketDataWriter(write, flush_interval=3600)
+        # Two symbols, one minute of updates every 2 s (the last one closes the candle)
+        for second in range(0, 60, 2):
+            for symbol in ("BTCUSDT", "ETHUSDT"):
+                writer.add(kline(symbol, 0, second, 100.0 + second))
+        assert await writer.flush() == 2 and await writer.flush() == 0
+        assert len(writes) == 1
+        assert sorted((r["symbol"], r["close"], r["volume"]) for r in writes[0]) == [
+            ("BTCUSDT", 158.0, 58.0), ("ETHUSDT", 158.0, 58.0)
+        ]
+        metrics = writer.metrics()
+        assert metrics["updates"] == 60 and metrics["coalesced"] == 58 and metrics["updates_per_flush"] == 60
+
+        # The statement is one multi-row upsert
+        sql = str(upsert_statement(writes[0]).compile(dialect=postgresql.dialect()))
+        assert sql.count("%(symbol_m") == 2 and "ON CONFLICT (time, symbol) DO UPDATE" in sql
+
+        # Background flushing: a closed candle flushes right away, otherwise the interval
+        writer.start()
+        writer.add(kline("BTCUSDT", 1, 10, 101.0))
+        await asyncio.sleep(0.05)
+        assert len(writes) == 1
+        writer.add(kline("BTCUSDT", 1, 58, 102.0))
+        await asyncio.sleep(0.05)
+        assert len(writes) == 2 and [r["close"] for r in writes[1]] == [102.0]
+        writer.add(kline("BTCUSDT", 2, 0, 103.0))
+        await writer.stop() # Final flush
+        assert len(writes) == 3 and writer.metrics()["buffered"] == 0
+    asyncio.run(run())
+    print("[OK] market_data writer: one upsert per flush with the latest update per candle.")
+
+def test_retries_after_db_outage():
+    async def run():
+        writes, down = [], [True]
+        async def write(rows):
+            if down[0]:
+                raise ConnectionError("database is down")
+            writes.append({(r["symbol"], r["time"]): r["close"] for r in rows})
+
+        writer = MarketDataWriter(write, flush_interval=3600, max_retry_rows=3)
+        for minute in range(4):
+            writer.add(kline("BTCUSDT", minute, 58, 100.0 + minute))
+        assert await writer.flush() == 0
+        # Bounded: the oldest candle is dropped
+        assert writer.metrics()["retry_pending"] == 3 and writer.dropped == 1 and writer.failures == 1
+        assert writer._delay() == 30.0 # Backing off
+
+        writer.add(kline("BTCUSDT", 3, 58, 200.0)) # Newer update of a failed row
+        writer.add(kline("BTCUSDT", 4, 58, 104.0))
+        down[0] = False
+        assert await writer.flush() == 4
+        closes = sorted(writes[0].values())
+        assert closes == [101.0, 102.0, 104.0, 200.0]
+        assert writer.metrics()["retry_pending"] == 0 and writer._delay() == 3600
+    asyncio.run(run())
+    print("[OK] market_data writer: failed rows are retried, bounded, and newer updates win.")
+
+def test_candle_closes_do_not_bypass_backoff():
+    async def run():
+        async def write(rows):
+            raise ConnectionError("database is down")
+
+        writer = MarketDataWriter(write, flush_interval=0.05, max_backoff=1.0)
+        writer.start()
+        writer.add(kline("BTCUSDT", 0, 58, 100.0)) # Closed: immediate flush, which fails
+        await asyncio.sleep(0.02)
+        assert writer.failures == 1
+        for minute in range(1, 6): # Closes during the 0.1 s backoff wait
+            writer.add(kline("BTCUSDT", minute, 58, 100.0))
+            await asyncio.sleep(0.01)
+        assert writer.failures == 1
+        await asyncio.sleep(0.1)
+        assert writer.failures == 2 and writer.metrics()["retry_pending"] == 6
+        writer._task.cancel()
+        await asyncio.gather(writer._task, return_exceptions=True)
+    asyncio.run(run())
+    print("[OK] market_data writer: candle closes do not bypass the retry backoff.")
+
+if __name__ == "__main__":
+    test_coalesces_partial_candles_into_one_upsert()
+    test_retries_after_db_outage()
+    test_candle_closes_do_not_bypass_backoff()
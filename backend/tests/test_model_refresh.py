@@ -0,0 +1,115 @@
+import sys
+import os
+import asyncio
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+import torch
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
+
+from app.ml.artifacts import load_artifact, save_artifact
+from app.ml.training import train_lstm
+from app.services.model_refresh import ModelRefresher
+from tests.helpers import make_klines
+
+class LiveStrategy:
+    """The part of LSTMStrategy the refresher drives: an artifact plus warm_up / use_artifact."""
+    def __init__(self, artifact):
+        self.strategy_id = "live"
+        self.symbol = "BTCUSDT"
+        self.config = {"interval": "1m"}
+        self.artifact = artifact
+        self.warmed = []
+
+    def warm_up(self, artifact):
+        self.warmed.append(artifact.version)
+
+    def use_artifact(self, artifact):
+        assert self.warmed[-1] == artifact.version # Warmed before it goes live
+        self.artifact = artifact
+
+def make_bundle(tmp: str) -> str:
+    frame = pd.DataFrame([row[:6] for row in make_klines(seed=1)], columns=["t", "open", "high", "low", "close", "volume"]).astype(float)
+    model, scaler, metrics = train_lstm(frame, seq_length=30, hidden_dim=8, epochs=1, seed=0, log=lambda msg: None)
+    path = os.path.join(tmp, "lstm_test.pth")
+    save_artifact(path, model, scaler, 30, metrics, version="base")
+    return path
+
+def test_refresh_swaps_accepted_model_without_blocking():
+    async def scenario(tmp):
+        strategy = LiveStrategy(load_artifact(make_bundle(tmp)))
+        refresher = ModelRefresher(interval_minutes=0, epochs=2, learning_rate=0.001, max_loss_ratio=10.0,
+                                   out_dir=os.path.join(tmp, "models"), niceness=0,
+                                   fetch_recent=lambda symbol, interval, limit: make_klines())
+
+        # A tick loop keeps running on the event loop while the worker trains
+        gaps, running = [], True
+        async def ticker():
+            last = time.monotonic()
+            while running:
+                await asyncio.sleep(0.01)
+                now = time.monotonic()
+                gaps.append(now - last)
+                last = now
+        tick_task = asyncio.create_task(ticker())
+        try:
+            attempt = await refresher.refresh(strategy)
+        finally:
+            running = False
+            await tick_task
+            refresher.shutdown()
+
+        assert attempt["status"] == "swapped", attempt
+        assert strategy.artifact.version == attempt["version"] and strategy.artifact.path == attempt["path"]
+        assert strategy.artifact.scale is not None and np.allclose(strategy.artifact.scale, load_artifact(
+            os.path.join(tmp, "lstm_test.pth")).scale) # Input scale kept
+        assert len(gaps) > 10 and max(gaps) < 0.5, max(gaps)
+        assert refresher.status()["history"][0] is attempt
+
+        # A gate no candidate can pass: the live model stays
+        strict = ModelRefresher(interval_minutes=0, epochs=1, max_loss_ratio=0.0,
+                                out_dir=os.path.join(tmp, "models"), niceness=0)
+        try:
+            rejected = await strict.refresh(strategy, make_klines(seed=2))
+        finally:
+            strict.shutdown()
+        assert rejected["status"] == "rejected" and rejected["path"] is None
+        assert strategy.artifact.version == attempt["version"]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(scenario(tmp))
+    print("[OK] Fine-tuned model is gated and swapped in while ticks keep flowing.")
+
+def test_legacy_weights_gated_as_served():
+    async def scenario(tmp):
+        from app.services.model_refresh import _live_loss
+
+        bundle = load_artifact(make_bundle(tmp))
+        legacy_path = os.path.join(tmp, "lstm_legacy.pth")
+        torch.save(bundle.model.state_dict(), legacy_path) # Weights only: scaled per window live
+        strategy = LiveStrategy(load_artifact(legacy_path))
+        refresher = ModelRefresher(interval_minutes=0, epochs=1, max_loss_ratio=10.0,
+                                   out_dir=os.path.join(tmp, "models"), niceness=0)
+        try:
+            attempt = await refresher.refresh(strategy, make_klines(seed=3))
+        finally:
+            refresher.shutdown()
+
+        # The base is scored with the per-window scaling it runs with, the candidate with its
+        # new fixed scaler; the short fine-tune loses badly in price terms and is kept out
+        df = pd.DataFrame([row[:6] for row in make_klines(seed=3)],
+                          columns=["open_time", "open", "high", "low", "close", "volume"]).astype(float)
+        assert np.isclose(attempt["base_loss"], _live_loss(strategy.artifact.model, df, 30, 150, None, 0.8))
+        assert attempt["scaling"] == "per-window -> fixed"
+        assert attempt["status"] == "rejected" and attempt["candidate_loss"] > attempt["base_loss"] * 10
+        assert strategy.artifact.version == "legacy"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(scenario(tmp))
+    print("[OK] Legacy weights are gated as served: per-window base vs fixed-scaler candidate.")
+
+if __name__ == "__main__":
+    test_refresh_swaps_accepted_model_without_blocking()
+    test_legacy_weights_gated_as_served()
@@ -0,0 +1,243 @@
+import sys
+import os
+import asyncio
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
+
+from app.services.pipeline import BLOCK, COALESCE, DROP_NEWEST, DROP_OLDEST, Stage
+
+def test_overflow_policies():
+    async def run():
+        release = asyncio.Event()
+        seen = []
+        async def handler(item):
+            await release.wait()
+            seen.append(item)
+
+        # Coalesce: one queued entry per key, keeping its position, with the newest value
+        stage = Stage("persist", handler, maxsize=8, policy=COALESCE, key=lambda item: item[0])
+        stage.start()
+        stage.offer(("a", 0))
+        await asyncio.sleep(0) # "a", 0 is now in the handler
+        for i in range(1, 6):
+            stage.offer(("a", i))
+            stage.offer(("b", i))
+        release.set()
+        await asyncio.sleep(0.01)
+        assert seen == [("a", 0), ("a", 5), ("b", 5)] and stage.coalesced == 8
+        await stage.stop()
+
+        # Drop oldest / newest
+        for policy, expected in ((DROP_OLDEST, [0, 7, 8, 9]), (DROP_NEWEST, [0, 1, 2, 3])):
+            release.clear()
+            seen.clear()
+            stage = Stage("ui", handler, maxsize=3, policy=policy)
+            stage.start()
+            stage.offer(0)
+            await asyncio.sleep(0)
+            for i in range(1, 10):
+                stage.offer(i)
+            release.set()
+            await asyncio.sleep(0.01)
+            assert seen == expected and stage.dropped == 6, (policy, seen)
+            assert stage.metrics()["processed"] == 4
+            await stage.stop()
+
+        # Block: put() waits for room
+        release.clear()
+        stage = Stage("decode", handler, maxsize=2, policy=BLOCK)
+        stage.start()
+        for i in range(3): # One in the handler, two queued
+            await stage.put(i)
+            await asyncio.sleep(0)
+        waiting = asyncio.create_task(stage.put(3))
+        await asyncio.sleep(0.01)
+        assert not waiting.done()
+        release.set()
+        await asyncio.wait_for(waiting, 1)
+        await stage.stop()
+    asyncio.run(run())
+    print("[OK] Stage overflow policies: coalesce, drop oldest / newest, block.")
+
+def test_slow_stage_does_not_delay_receive_and_risk_sees_latest():
+    async def run():
+        persisted, checked = [], []
+        async def persist(tick):
+            await asyncio.sleep(0.05) # Slow DB commit
+            persisted.append(tick)
+        async def risk(tick):
+            await asyncio.sleep(0.005)
+            checked.append(tick["price"])
+        async def broadcast(tick):
+            if tick["price"] < 3:
+                raise RuntimeError("browser went away")
+
+        stages = {
+            "persist": Stage("persist", persist, 4, COALESCE, key=lambda t: t["candle"]),
+            "risk": Stage("risk", risk, 1, COALESCE, key=lambda t: t["symbol"]),
+            "broadcast": Stage("broadcast", broadcast, 16, DROP_OLDEST),
+        }
+        downstream = list(stages.values())
+        async def decode(tick):
+            for stage in downstream:
+                stage.offer(tick)
+        stages["decode"] = Stage("decode", decode, 64, BLOCK)
+        for stage in stages.values():
+            stage.start()
+
+        # Receive loop: 200 updates of 20 candles, 1 ms apart
+        started = time.monotonic()
+        for i in range(200):
+            await stages["decode"].put({"symbol": "BTCUSDT", "candle": i // 10, "price": float(i)})
+            await asyncio.sleep(0.001)
+        receive_time = time.monotonic() - started
+        await asyncio.sleep(0.3)
+
+        assert receive_time < 1.0, receive_time # Not paced by 20+ persist commits of 50 ms
+        assert checked[-1] == 199.0 and len(checked) < 200 # Freshest price, stale ones skipped
+        candles = [t["candle"] for t in persisted] # In order (a candle written while updated is written again), final value last
+        assert persisted[-1]["price"] == 199.0 and candles == sorted(candles) and len(candles) < 40
+        metrics = {name: stage.metrics() for name, stage in stages.items()}
+        assert metrics["persist"]["coalesced"] > 0
+        assert metrics["broadcast"]["errors"] == 3 and metrics["broadcast"]["processed"] + metrics["broadcast"]["dropped"] == 200 # Errors don't stop the stage
+        assert metrics["risk"]["lag_ms"]["max"] is not None
+        for stage in stages.values():
+            await stage.stop()
+    asyncio.run(run())
+    print("[OK] A slow stage does not hold up receiving; risk always checks the latest price.")
+
+class PaperWallet:
+    """
+    TradeExecutor's wallet without the database: each decision reads the position, waits
+    (the TradeLog round-trips), then writes, like _check_risk_management / _execute_signal.
+    """
+    def __init__(self, position: float, entry: float):
+        self.position, self.entry = position, entry
+        self.trades = []
+        self.busy = self.overlaps = 0
+
+    async def execute_signal(self, signal):
+        self.busy += 1
+        self.overlaps += self.busy > 1
+        position = self.position
+        await asyncio.sleep(0.01)
+        quantity = 0.0
+        if signal["action"] == "SELL" and position >= 0:
+            quantity = position or 1.0 # Close the long, or open a short when flat
+        self.position = position - quantity
+        if quantity:
+            self.trades.append((signal["action"], quantity, signal["reason"]))
+        self.busy -= 1
+        return ("trade", signal["reason"]) if quantity else None
+
+    async def check_risk(self, price, symbol):
+        await asyncio.sleep(0.005)
+        if self.position > 0 and price <= self.entry * 0.98:
+            return await self.execute_signal({"action": "SELL", "symbol": symbol, "price": price, "reason": "STOP_LOSS"})
+        return None
+
+def test_risk_and_strategy_stages_share_the_wallet():
+    from app.services.market_data import MarketDataService
+    from app.services.trade_executor import TradeExecutor
+    from app.strategy.base import BaseStrategy
+    from app.strategy.registry import strategy_registry
+
+    class AlwaysSell(BaseStrategy):
+        async def on_tick(self, data):
+            return {"action": "SELL", "symbol": data.symbol, "price": data.close_price, "reason": "STRATEGY"}
+        async def train(self, historical_data):
+            pass
+
+    def closed_candle(minute: int, price: float):
+        t = 1769976000000 + minute * 60000
+        return {"e": "kline", "s": "PAPERUSDT", "k": {"t": t, "T": t + 59999, "i": "1m", "o": "100", "h": "100",
+                "l": str(price), "c": str(price), "v": "1", "x": True}}
+
+    async def run():
+        wallet = PaperWallet(position=1.0, entry=100.0)
+        internals = TradeExecutor._check_risk_management, TradeExecutor._execute_signal
+        TradeExecutor._check_risk_management = staticmethod(wallet.check_risk)
+        TradeExecutor._execute_signal = staticmethod(wallet.execute_signal)
+        TradeExecutor._lock, TradeExecutor._risk_ticks = None, {}
+        strategy_registry.register_class("AlwaysSell", AlwaysSell)
+        strategy_registry.create_instance("AlwaysSell", "paper_sell", {"symbol": "PAPERUSDT"})
+        async def callback(data_point):
+            pass
+        stages = MarketDataService()._build_pipeline("PAPERUSDT", "1m", callback, ("PAPERUSDT", "1m"))
+        for stage in stages.values():
+            stage.start()
+        try:
+            # Stop loss and a strategy SELL on the same closed candle: one close, no flip to short
+            await stages["decode"].put(closed_candle(0, 97.0))
+            await asyncio.sleep(0.2)
+            assert wallet.trades == [("SELL", 1.0, "STOP_LOSS")] and wallet.position == 0.0
+            # Next candle, risk does not fire: the signal executes (opens a short)
+            await stages["decode"].put(closed_candle(1, 96.0))
+            await asyncio.sleep(0.2)
+            assert wallet.trades[1:] == [("SELL", 1.0, "STRATEGY")] and wallet.position == -1.0
+            assert wallet.overlaps == 0
+        finally:
+            for stage in stages.values():
+                await stage.stop()
+            strategy_registry._strategies.pop("paper_sell", None)
+            TradeExecutor._check_risk_management, TradeExecutor._execute_signal = (staticmethod(f) for f in internals)
+    asyncio.run(run())
+    print("[OK] Risk and strategy stages act on the wallet one at a time; SL/TP drops the candle's signals.")
+
+def test_extra_streams_only_feed_strategies():
+    from app.services.market_data import MarketDataService
+    from app.services.market_writer import market_data_writer
+    from app.strategy.base import BaseStrategy
+    from app.strategy.registry import strategy_registry
+
+    class Recorder(BaseStrategy):
+        async def on_tick(self, data):
+            self.seen = getattr(self, "seen", []) + [data.interval]
+        async def train(self, historical_data):
+            pass
+
+    def candle(interval: str, closed: bool):
+        t = 1769976000000
+        return {"e": "kline", "s": "PAPERUSDT", "k": {"t": t, "T": t + 899999, "i": interval, "o": "100", "h": "100",
+                "l": "100", "c": "100", "v": "1", "x": closed}}
+
+    async def run():
+        strategy_registry.register_class("Recorder", Recorder)
+        strategy = strategy_registry.create_instance("Recorder", "paper_15m", {"symbol": "PAPERUSDT", "interval": "15m"})
+        async def callback(data_point):
+            received.append(data_point.interval)
+        received = []
+        service = MarketDataService()
+        pipelines = {interval: service._build_pipeline("PAPERUSDT", interval, callback, ("PAPERUSDT", "1m"))
+                     for interval in ("1m", "15m")}
+        assert "risk" in pipelines["1m"] and "risk" not in pipelines["15m"]
+        for stages in pipelines.values():
+            for stage in stages.values():
+                stage.start()
+        updates = market_data_writer.updates
+        try:
+            await pipelines["15m"]["decode"].put(candle("15m", False))
+            await pipelines["15m"]["decode"].put(candle("15m", True))
+            await asyncio.sleep(0.05)
+            # Same symbol and close time as a 1m candle: neither written nor broadcast, only traded on
+            assert strategy.seen == ["15m"] and received == [] and market_data_writer.updates == updates
+            assert pipelines["15m"]["broadcast"].metrics()["processed"] == 0
+            await pipelines["1m"]["decode"].put(candle("1m", False))
+            await asyncio.sleep(0.05)
+            assert received == ["1m"] and market_data_writer.updates == updates + 1
+            assert pipelines["1m"]["broadcast"].metrics()["processed"] == 1
+        finally:
+            for stages in pipelines.values():
+                for stage in stages.values():
+                    await stage.stop()
+            strategy_registry._strategies.pop("paper_15m", None)
+            market_data_writer._buffer.clear()
+    asyncio.run(run())
+    print("[OK] Only the displayed stream is persisted and broadcast; extra streams feed strategies.")
+
+if __name__ == "__main__":
+    test_overflow_policies()
+    test_slow_stage_does_not_delay_receive_and_risk_sees_latest()
+    test_risk_and_strategy_stages_share_the_wallet()
+    test_extra_streams_only_feed_strategies()
@@ -0,0 +1,142 @@
+import sys
+import os
+import tempfile
+import threading
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
+
+from app.backtest.arrays import KlineArrays
+from app.backtest.signals import threshold_signals
+from app.ml.prediction_cache import PredictionCache
+
+LOOKBACK = 5
+
+def make_bars(n: int, seed: int = 0) -> KlineArrays:
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    open_time = 1700000000000 + np.arange(n) * 60000
+    return KlineArrays(open_time, close, close, close, close, np.ones(n), open_time + 59999)
+
+class CountingModel:
+    """Prediction = mean close of the last LOOKBACK + 1 bars (NaN before that)."""
+    def __init__(self):
+        self.rows_seen = 0
+
+    def __call__(self, bars: KlineArrays) -> np.ndarray:
+        self.rows_seen += len(bars)
+        out = np.full(len(bars), np.nan)
+        for i in range(LOOKBACK, len(bars)):
+            out[i] = bars.close[i - LOOKBACK:i + 1].mean()
+        return out
+
+def test_cache_hit_append_and_rebuild():
+    with tempfile.TemporaryDirectory() as root:
+        cache = PredictionCache(root, max_bytes=10 ** 9)
+        model = CountingModel()
+        bars = make_bars(300)
+
+        first = cache.predictions("k", bars.slice(0, 200), model, LOOKBACK)
+        assert model.rows_seen == 200
+
+        # Shorter or equal range: served from the memory-mapped entry
+        again = cache.predictions("k", bars.slice(0, 150), model, LOOKBACK)
+        assert model.rows_seen == 200
+        assert np.array_equal(again, first[:150], equal_nan=True)
+
+        # Longer range: only the new bars (plus their lookback) are computed
+        full = cache.predictions("k", bars, model, LOOKBACK)
+        assert model.rows_seen == 200 + 100 + LOOKBACK
+        assert np.allclose(full, model(bars), equal_nan=True)
+
+        # Changed candles under the same key: the entry is rebuilt
+        changed = make_bars(300, seed=1)
+        model.rows_seen = 0
+        cache.predictions("k", changed, model, LOOKBACK)
+        assert model.rows_seen == 300
+
+        full = cache.predictions("k", changed, model, LOOKBACK)
+        signals = cache.signals("k", 1.001, full, changed, LOOKBACK)
+        assert signals.dtype == np.int8 and len(signals) == 300
+        assert np.array_equal(signals, threshold_signals(full, changed.close, 1.001))
+        assert np.array_equal(cache.signals("k", 1.001, full, changed, LOOKBACK), signals)
+        print("[OK] Prediction cache hit / append / rebuild.")
+
+def test_cache_evicts_least_recently_used():
+    with tempfile.TemporaryDirectory() as root:
+        bars = make_bars(1000)
+        # Each entry is 1000 rows x 24 bytes + meta; room for two entries
+        cache = PredictionCache(root, max_bytes=2 * 1000 * 24 + 1000)
+        model = CountingModel()
+        cache.predictions("a", bars, model, LOOKBACK)
+        cache.predictions("b", bars, model, LOOKBACK)
+        cache.predictions("a", bars, model, LOOKBACK) # "a" is now more recent than "b"
+        cache.predictions("c", bars, model, LOOKBACK)
+        assert sorted(d for d in os.listdir(root) if os.path.isdir(os.path.join(root, d))) == ["a", "c"]
+        print("[OK] Prediction cache evicts least recently used entries.")
+
+def test_partial_bar_moving_start_and_changed_candle():
+    with tempfile.TemporaryDirectory() as root:
+        cache = PredictionCache(root, max_bytes=10 ** 9)
+        model = CountingModel()
+        bars = make_bars(300)
+
+        # Bar 199 is still forming when the first run happens: it is predicted, not stored
+        forming = make_bars(300)
+        forming.close[199] += 3.0
+        now_ms = int(bars.close_time[198]) + 1
+        first = cache.predictions("k", forming.slice(0, 200), model, LOOKBACK, now_ms=now_ms)
+        assert np.allclose(first, model(forming.slice(0, 200)), equal_nan=True)
+
+        # Once it closed, a longer range only computes from bar 199 on
+        model.rows_seen = 0
+        full = cache.predictions("k", bars, model, LOOKBACK)
+        assert model.rows_seen == 300 - 199 + LOOKBACK
+        assert np.allclose(full, model(bars), equal_nan=True)
+
+        # A relative start moves forward every run: served from inside the same entry
+        model.rows_seen = 0
+        later = cache.predictions("k", bars.slice(50, 300), model, LOOKBACK)
+        assert model.rows_seen == 0
+        assert np.allclose(later, model(bars.slice(50, 300)), equal_nan=True)
+        signals = cache.signals("k", 1.001, later, bars.slice(50, 300), LOOKBACK)
+        assert np.array_equal(signals, threshold_signals(later, bars.close[50:], 1.001))
+
+        # A candle corrected mid-entry: recomputed from the first differing bar only
+        corrected = make_bars(300)
+        corrected.close[250] += 1.0
+        model.rows_seen = 0
+        again = cache.predictions("k", corrected, model, LOOKBACK)
+        assert model.rows_seen == 300 - 250 + LOOKBACK
+        assert np.allclose(again, model(corrected), equal_nan=True)
+        print("[OK] Prediction cache: partial bar not stored, moving start served, corrected candle recomputed.")
+
+def test_concurrent_writers_and_readers():
+    with tempfile.TemporaryDirectory() as root:
+        series = [make_bars(400, seed) for seed in range(3)]
+        errors = []
+
+        def worker(i: int):
+            cache = PredictionCache(root, max_bytes=10 ** 9)
+            model = CountingModel()
+            try:
+                for j in range(30):
+                    bars = series[(i + j) % 3].slice((j * 7) % 50, 200 + (i * 31 + j * 13) % 200)
+                    predicted = cache.predictions("k", bars, model, LOOKBACK)
+                    assert np.allclose(predicted, model(bars), equal_nan=True)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert not errors, errors
+        print("[OK] Prediction cache: concurrent rebuilds, appends and reads stay consistent.")
+
+if __name__ == "__main__":
+    test_cache_hit_append_and_rebuild()
+    test_cache_evicts_least_recently_used()
+    test_partial_bar_moving_start_and_changed_candle()
+    test_concurrent_writers_and_readers()
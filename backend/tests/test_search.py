@@ -0,0 +1,64 @@
+import sys
+import os
+import json
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
+
+from app.ml.artifacts import load_artifact
+from app.ml.search import ASHAScheduler, run_search, sample_config
+from tests.helpers import make_ohlcv
+
+SPACE = {
+    "seq_length": [20, 30],
+    "hidden_dim": [8, 16],
+    "num_layers": [2],
+    "learning_rate": ("log", 1e-3, 1e-2),
+    "batch_size": [64],
+}
+
+def test_asha_promotes_top_fraction():
+    scheduler = ASHAScheduler(min_epochs=1, max_epochs=9, eta=3)
+    assert scheduler.budgets == [1, 3, 9]
+    for trial, loss in enumerate([0.5, 0.1, 0.4]):
+        scheduler.report(trial, 0, loss)
+    assert scheduler.promotable(running=set()) == (1, 1) # Best of 3 -> 1 promotion
+    assert scheduler.promotable(running={1}) is None
+    scheduler.report(1, 1, 0.05)
+    assert scheduler.promotable(running=set()) is None # Trial 1 already promoted, rung 1 too small
+    for trial, loss in enumerate([0.3, 0.2, 0.6], start=3):
+        scheduler.report(trial, 0, loss)
+    assert scheduler.promotable(running=set()) == (4, 1) # Top 2 of 6 now: trials 1 and 4
+    assert sample_config(SPACE, 0, 7) == sample_config(SPACE, 0, 7)
+    print("[OK] ASHA promotes the best 1/eta of each rung.")
+
+def test_search_runs_and_resumes():
+    df = make_ohlcv(500)
+    kwargs = dict(n_trials=4, space=SPACE, min_epochs=1, max_epochs=2, eta=2, workers=2, log=lambda msg: None)
+    with tempfile.TemporaryDirectory() as tmp:
+        table = run_search(df, study_dir=tmp, **kwargs)
+        assert sorted(table["trial"]) == [0, 1, 2, 3]
+        best = table.iloc[0]
+        assert best["rung"] == 1 and best["artifact"] is not None
+        assert load_artifact(best["artifact"]).seq_length == best["seq_length"]
+        # Only trials among the best half of rung 0 were trained further
+        records = [json.loads(line) for line in open(os.path.join(tmp, "trials.jsonl"))]
+        rung0 = sorted((r for r in records if r["rung"] == 0), key=lambda r: r["val_loss"])
+        promoted = {r["trial"] for r in records if r["rung"] == 1}
+        assert promoted and promoted <= {r["trial"] for r in rung0[:len(rung0) // 2 + 1]}
+
+        # Re-running the same study retrains nothing
+        again = run_search(df, study_dir=tmp, **kwargs)
+        assert len(open(os.path.join(tmp, "trials.jsonl")).readlines()) == len(records)
+        assert again["val_loss"].tolist() == table["val_loss"].tolist()
+
+        try:
+            run_search(df, study_dir=tmp, **{**kwargs, "max_epochs": 4})
+            assert False, "changed budgets must not reuse the study"
+        except ValueError:
+            pass
+    print("[OK] Search trains in parallel, prunes and resumes from the study store.")
+
+if __name__ == "__main__":
+    test_asha_promotes_top_fraction()
+    test_search_runs_and_resumes()
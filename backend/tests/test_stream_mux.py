@@ -0,0 +1,85 @@
+import sys
+import os
+import asyncio
+import json
+from urllib.parse import parse_qs, urlparse
+from websockets.asyncio.server import serve
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
+
+from app.services.stream_mux import StreamMultiplexer, kline_stream, parse_streams
+from app.strategy.implementations.dummy import DummyStrategy
+from app.strategy.registry import StrategyRegistry
+
+MESSAGES = 20
+
+def kline_event(stream: str, i: int) -> dict:
+    symbol, _, interval = stream.partition("@kline_")
+    t = 1769976000000 + i * 60000
+    return {"e": "kline", "s": symbol.upper(), "k": {
+        "t": t, "T": t + 59999, "i": interval, "o": "100.0", "h": "101.0", "l": "99.0",
+        "c": str(100.0 + i), "v": "1.5", "x": True
+    }}
+
+async def fake_binance(conn):
+    """Combined-stream endpoint: /stream?streams=a/b/c sends MESSAGES events per stream, interleaved."""
+    streams = parse_qs(urlparse(conn.request.path).query)["streams"][0].split("/")
+    fake_binance.connections.append(streams)
+    for i in range(MESSAGES):
+        for stream in streams:
+            await conn.send(json.dumps({"stream": stream, "data": kline_event(stream, i)}))
+    await conn.send(json.dumps({"stream": "dogeusdt@kline_1m", "data": {}})) # Not subscribed
+    await conn.wait_closed()
+
+def test_combined_streams_routed_per_key():
+    keys = parse_streams("BTCUSDT@1m, ETHUSDT@1m, BTCUSDT@5m,solusdt@1m,XRPUSDT")
+    assert keys[2] == ("BTCUSDT", "5m") and keys[3] == ("SOLUSDT", "1m") and keys[4] == ("XRPUSDT", "1m")
+
+    async def run():
+        fake_binance.connections = []
+        received = {key: [] for key in keys}
+        async with serve(fake_binance, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            mux = StreamMultiplexer(f"ws://127.0.0.1:{port}/", streams_per_connection=2)
+            for symbol, interval in keys:
+                async def handler(data, key=(symbol, interval)):
+                    received[key].append(data)
+                mux.subscribe(symbol, interval, handler)
+            assert [len(c) for c in mux.connections()] == [2, 2, 1]
+
+            task = asyncio.create_task(mux.run())
+            for _ in range(200):
+                await asyncio.sleep(0.025)
+                if mux.unrouted == 3 and all(len(r) == MESSAGES for r in received.values()):
+                    break
+            metrics = mux.metrics()
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        assert sorted(map(sorted, fake_binance.connections)) == sorted(map(sorted, mux.connections()))
+        for (symbol, interval), events in received.items():
+            # Only this key's events, in order
+            assert len(events) == MESSAGES
+            assert all(e["s"] == symbol and e["k"]["i"] == interval for e in events)
+            assert [float(e["k"]["c"]) for e in events] == [100.0 + i for i in range(MESSAGES)]
+            stats = metrics["streams"][kline_stream(symbol, interval)]
+            assert stats["messages"] == MESSAGES and stats["per_minute"] == MESSAGES
+        assert metrics["unrouted"] == 3 and [c["errors"] for c in metrics["connections"]] == [0, 0, 0]
+    asyncio.run(run())
+    print("[OK] Combined streams: 5 keys over 3 connections, each handler sees only its key.")
+
+def test_strategies_see_their_own_streams():
+    registry = StrategyRegistry()
+    registry.register_class("DummyStrategy", DummyStrategy)
+    registry.create_instance("DummyStrategy", "btc_1m", {"symbol": "BTCUSDT"})
+    registry.create_instance("DummyStrategy", "btc_5m", {"symbol": "BTCUSDT", "interval": "5m"})
+    registry.create_instance("DummyStrategy", "any", {})
+    assert [i for i, _ in registry.instances_for("BTCUSDT", "1m")] == ["btc_1m", "any"]
+    assert [i for i, _ in registry.instances_for("BTCUSDT", "5m")] == ["btc_5m", "any"]
+    assert [i for i, _ in registry.instances_for("ETHUSDT", "1m")] == ["any"]
+    assert registry.stream_keys() == {("BTCUSDT", "1m"), ("BTCUSDT", "5m")}
+    print("[OK] Strategy registry routes streams by symbol / interval.")
+
+if __name__ == "__main__":
+    test_combined_streams_routed_per_key()
+    test_strategies_see_their_own_streams()
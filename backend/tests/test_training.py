@@ -0,0 +1,134 @@
+import sys
+import os
+import tempfile
+import time
+import numpy as np
+import torch
+from torch.utils.data import DataLoader
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
+
+from app.ml.artifacts import ModelCache, load_artifact, save_artifact
+from app.ml.datasets import SequenceDataset
+from app.ml.features import FeatureEngineer
+from app.ml.training import train_lstm
+from tests.helpers import make_ohlcv
+
+def legacy_sequences(data, seq_length, predict_window=1):
+    """The original loop-and-stack create_sequences."""
+    xs, ys = [], []
+    for i in range(len(data) - seq_length - predict_window):
+        xs.append(data[i:(i + seq_length)])
+        ys.append(data[i + seq_length][0])
+    return np.array(xs), np.array(ys)
+
+def test_sequence_views_match_legacy_loop():
+    data = np.random.default_rng(0).normal(size=(300, 5))
+    X, y = FeatureEngineer.create_sequences(data, 60)
+    X_ref, y_ref = legacy_sequences(data, 60)
+    assert np.array_equal(X, X_ref) and np.array_equal(y, y_ref)
+    assert np.shares_memory(X, data) # View, not a copy
+
+    X, y = FeatureEngineer.sequence_views(data, 60, horizon=3, stride=7)
+    assert X.shape == (len(range(0, 300 - 60 - 3 + 1, 7)), 60, 5) and y.shape == (len(X), 3)
+    assert np.array_equal(X[2], data[14:74]) and np.array_equal(y[2], data[74:77, 0])
+    print("[OK] Strided sequence views match the legacy loop.")
+
+def test_sequence_dataset_serves_views():
+    data = np.random.default_rng(1).normal(size=(500, 5)).astype(np.float32)
+    dataset = SequenceDataset(data, 60, horizon=2, stride=3)
+    assert np.shares_memory(dataset.features.numpy(), data)
+
+    X, y = FeatureEngineer.sequence_views(data, 60, horizon=2, stride=3)
+    assert len(dataset) == len(X)
+    for i in (0, 17, len(dataset) - 1):
+        x_i, y_i = dataset[i]
+        assert np.array_equal(x_i.numpy(), X[i]) and np.array_equal(y_i.numpy(), y[i])
+
+    batch_X, batch_y = next(iter(DataLoader(dataset, batch_size=16, shuffle=True)))
+    assert tuple(batch_X.shape) == (16, 60, 5) and tuple(batch_y.shape) == (16, 2)
+    print("[OK] SequenceDataset serves windows by index without copies.")
+
+def test_train_lstm_smoke():
+    df = make_ohlcv(seed=2)
+    model, _, metrics = train_lstm(df, seq_length=30, hidden_dim=8, epochs=1, seed=0, log=lambda msg: None)
+    assert metrics["samples"] == 400 - 49 - 30 # Rows after the indicator warm-up, one target each
+    assert np.isfinite(metrics["train_loss"]) and np.isfinite(metrics["val_loss"])
+    print("[OK] train_lstm runs on the sequence dataset.")
+
+def test_train_lstm_early_stopping_and_resume():
+    df = make_ohlcv(seed=2)
+    # No learning: validation never improves after the first epoch
+    _, _, metrics = train_lstm(df, seq_length=30, hidden_dim=8, epochs=10, learning_rate=0.0,
+                               patience=1, seed=0, log=lambda msg: None)
+    assert metrics["epochs"] == 2 and metrics["samples_per_sec"] > 0
+
+    kwargs = dict(seq_length=30, hidden_dim=8, epochs=3, batch_size=16, accumulation_steps=2, bf16=True, seed=0)
+    expected, _, expected_metrics = train_lstm(df, log=lambda msg: None, **kwargs)
+
+    class Interrupted(Exception):
+        pass
+
+    def interrupt(msg):
+        if msg.startswith("Epoch 2/"):
+            raise Interrupted()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        checkpoint = os.path.join(tmp, "train.ckpt")
+        try:
+            train_lstm(df, log=interrupt, checkpoint_path=checkpoint, **kwargs)
+        except Interrupted:
+            pass
+        assert os.path.exists(checkpoint) # Epoch 1 saved
+
+        messages = []
+        model, _, metrics = train_lstm(df, log=messages.append, checkpoint_path=checkpoint, **kwargs)
+        assert messages[0].startswith("Resuming") and not os.path.exists(checkpoint)
+    assert metrics["epochs"] == 3 and metrics["val_loss"] == expected_metrics["val_loss"]
+    for name, value in expected.state_dict().items():
+        assert torch.equal(model.state_dict()[name], value)
+    print("[OK] Early stopping; an interrupted run resumes to the same weights.")
+
+def test_artifact_roundtrip_and_legacy_weights():
+    model, scaler, metrics = train_lstm(make_ohlcv(seed=2), seq_length=30, hidden_dim=8, epochs=1, seed=0, log=lambda msg: None)
+    x = torch.rand(4, 30, 5)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bundle.pt")
+        save_artifact(path, model, scaler, 30, metrics, version="test")
+        artifact = load_artifact(path)
+        assert artifact.architecture == {"input_dim": 5, "hidden_dim": 8, "output_dim": 1, "num_layers": 2}
+        assert artifact.seq_length == 30 and artifact.version == "test"
+        assert np.array_equal(artifact.scale, scaler.scale_) and np.array_equal(artifact.min_, scaler.min_)
+        assert artifact.metrics["samples"] == metrics["samples"]
+        with torch.no_grad():
+            assert torch.equal(artifact.model(x), model(x))
+
+        # Bare state_dict (lstm_v1.pth style): architecture inferred, no scaler
+        legacy_path = os.path.join(tmp, "legacy.pth")
+        torch.save(model.state_dict(), legacy_path)
+        legacy = load_artifact(legacy_path)
+        assert legacy.architecture == artifact.architecture and legacy.scaler is None
+        assert legacy.fingerprint != artifact.fingerprint
+    print("[OK] Model bundle round-trips; legacy weights still load.")
+
+def test_model_cache_shares_and_reloads():
+    model, scaler, _ = train_lstm(make_ohlcv(seed=2), seq_length=30, hidden_dim=8, epochs=1, seed=0, log=lambda msg: None)
+    cache = ModelCache()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bundle.pt")
+        save_artifact(path, model, scaler, 30)
+        first = cache.get(path)
+        assert cache.get(path) is first # Loaded once, shared
+
+        time.sleep(0.01)
+        save_artifact(path, model, scaler, 30) # Retrained file on disk
+        assert cache.get(path) is not first
+    print("[OK] Model cache shares artifacts and reloads rewritten files.")
+
+if __name__ == "__main__":
+    test_sequence_views_match_legacy_loop()
+    test_sequence_dataset_serves_views()
+    test_train_lstm_smoke()
+    test_train_lstm_early_stopping_and_resume()
+    test_artifact_roundtrip_and_legacy_weights()
+    test_model_cache_shares_and_reloads()